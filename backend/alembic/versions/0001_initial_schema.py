@@ -0,0 +1,172 @@
+"""initial schema
+
+The original schema: the tables Base.metadata.create_all made before any
+of the later features existed. Databases without an alembic_version table
+are stamped at this revision by app.migrate instead of running it, so the
+revisions after it create everything added since.
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 08:00:08.886589
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Enum types are shared between tables, so they are created and dropped once
+# here rather than with each table (PostgreSQL keeps them as named types)
+enum_metadata = sa.MetaData()
+RISK_LEVEL = sa.Enum('LOW', 'MEDIUM', 'HIGH', name='risklevel', metadata=enum_metadata)
+EXPENSE_CATEGORY = sa.Enum('TRAVEL', 'MEALS', 'ACCOMMODATION', 'OFFICE_SUPPLIES', 'ENTERTAINMENT', 'TRANSPORTATION', 'UTILITIES', 'SOFTWARE', 'TRAINING', 'OTHER', name='expensecategory', metadata=enum_metadata)
+EXPENSE_STATUS = sa.Enum('PENDING', 'APPROVED', 'REJECTED', name='expensestatus', metadata=enum_metadata)
+USER_ROLE = sa.Enum('ADMIN', 'MANAGER', 'EMPLOYEE', name='userrole', metadata=enum_metadata)
+APPROVAL_TYPE = sa.Enum('SEQUENTIAL', 'PERCENTAGE', 'SPECIFIC_APPROVER', 'HYBRID', name='approvaltype', metadata=enum_metadata)
+APPROVAL_STATUS = sa.Enum('PENDING', 'APPROVED', 'REJECTED', name='approvalstatus', metadata=enum_metadata)
+ENUMS = (RISK_LEVEL, EXPENSE_CATEGORY, EXPENSE_STATUS, USER_ROLE, APPROVAL_TYPE, APPROVAL_STATUS)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    for enum in ENUMS:
+        enum.create(bind, checkfirst=True)
+
+    op.create_table('companies',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('country', sa.String(), nullable=False),
+    sa.Column('currency', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('companies', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_companies_id'), ['id'], unique=False)
+
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('hashed_password', sa.String(), nullable=False),
+    sa.Column('full_name', sa.String(), nullable=False),
+    sa.Column('role', USER_ROLE, nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('manager_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.ForeignKeyConstraint(['manager_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_email'), ['email'], unique=True)
+        batch_op.create_index(batch_op.f('ix_users_id'), ['id'], unique=False)
+
+    op.create_table('approval_workflows',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('approval_type', APPROVAL_TYPE, nullable=False),
+    sa.Column('min_amount', sa.Float(), nullable=True),
+    sa.Column('max_amount', sa.Float(), nullable=True),
+    sa.Column('percentage_required', sa.Float(), nullable=True),
+    sa.Column('specific_approver_id', sa.Integer(), nullable=True),
+    sa.Column('steps', sa.Text(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.ForeignKeyConstraint(['specific_approver_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('approval_workflows', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_approval_workflows_id'), ['id'], unique=False)
+
+    op.create_table('expenses',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('currency', sa.String(), nullable=False),
+    sa.Column('converted_amount', sa.Float(), nullable=True),
+    sa.Column('category', EXPENSE_CATEGORY, nullable=False),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('expense_date', sa.DateTime(), nullable=False),
+    sa.Column('receipt_url', sa.String(), nullable=True),
+    sa.Column('vendor', sa.String(), nullable=True),
+    sa.Column('status', EXPENSE_STATUS, nullable=True),
+    sa.Column('ai_suggested_category', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_expenses_id'), ['id'], unique=False)
+
+    op.create_table('approvals',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('expense_id', sa.Integer(), nullable=False),
+    sa.Column('approver_id', sa.Integer(), nullable=False),
+    sa.Column('workflow_step', sa.Integer(), nullable=False),
+    sa.Column('status', APPROVAL_STATUS, nullable=True),
+    sa.Column('comments', sa.Text(), nullable=True),
+    sa.Column('approved_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['approver_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['expense_id'], ['expenses.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('approvals', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_approvals_id'), ['id'], unique=False)
+
+    op.create_table('risk_scores',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('expense_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('risk_level', RISK_LEVEL, nullable=False),
+    sa.Column('factors', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['expense_id'], ['expenses.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('risk_scores', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_risk_scores_id'), ['id'], unique=False)
+
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('risk_scores', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_risk_scores_id'))
+
+    op.drop_table('risk_scores')
+    with op.batch_alter_table('approvals', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_approvals_id'))
+
+    op.drop_table('approvals')
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_expenses_id'))
+
+    op.drop_table('expenses')
+    with op.batch_alter_table('approval_workflows', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_approval_workflows_id'))
+
+    op.drop_table('approval_workflows')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_id'))
+        batch_op.drop_index(batch_op.f('ix_users_email'))
+
+    op.drop_table('users')
+    with op.batch_alter_table('companies', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_companies_id'))
+
+    op.drop_table('companies')
+
+    bind = op.get_bind()
+    for enum in ENUMS:
+        enum.drop(bind, checkfirst=True)
@@ -0,0 +1,84 @@
+"""enrichment pipeline
+
+Background OCR and classification: the enrichment job queue and the OCR
+columns on expenses. Expenses that predate the pipeline were enriched
+synchronously when submitted, so they are marked completed.
+
+Databases that ran Base.metadata.create_all after the pipeline shipped
+already have some of this, so each object is only created if missing.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:02:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Bound to its own metadata so it is created once here, not with each table
+enum_metadata = sa.MetaData()
+ENRICHMENT_STATUS = sa.Enum('PENDING', 'PROCESSING', 'COMPLETED', 'FAILED', name='enrichmentstatus', metadata=enum_metadata)
+
+
+def expense_columns():
+    return [
+        sa.Column('enrichment_status', ENRICHMENT_STATUS, nullable=True),
+        sa.Column('ocr_text', sa.Text(), nullable=True),
+        sa.Column('ocr_amount', sa.Float(), nullable=True),
+        sa.Column('ocr_date', sa.String(), nullable=True),
+    ]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    ENRICHMENT_STATUS.create(bind, checkfirst=True)
+
+    existing = {column['name'] for column in inspector.get_columns('expenses')}
+    missing = [column for column in expense_columns() if column.name not in existing]
+    if missing:
+        with op.batch_alter_table('expenses', schema=None) as batch_op:
+            for column in missing:
+                batch_op.add_column(column)
+    op.execute("UPDATE expenses SET enrichment_status = 'COMPLETED' WHERE enrichment_status IS NULL")
+
+    if 'enrichment_jobs' not in inspector.get_table_names():
+        op.create_table('enrichment_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('expense_id', sa.Integer(), nullable=False),
+        sa.Column('status', ENRICHMENT_STATUS, nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['expense_id'], ['expenses.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('enrichment_jobs', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_enrichment_jobs_expense_id'), ['expense_id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_enrichment_jobs_id'), ['id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_enrichment_jobs_status'), ['status'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('enrichment_jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_enrichment_jobs_status'))
+        batch_op.drop_index(batch_op.f('ix_enrichment_jobs_id'))
+        batch_op.drop_index(batch_op.f('ix_enrichment_jobs_expense_id'))
+
+    op.drop_table('enrichment_jobs')
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        for column in reversed(expense_columns()):
+            batch_op.drop_column(column.name)
+
+    ENRICHMENT_STATUS.drop(op.get_bind(), checkfirst=True)
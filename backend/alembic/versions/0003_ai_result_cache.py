@@ -0,0 +1,45 @@
+"""ai result cache
+
+Memoized OCR and classification results, shared across workers.
+
+Databases that ran Base.metadata.create_all after the cache shipped
+already have the table.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 10:16:37.925810
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if 'ai_result_cache' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table('ai_result_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('namespace', sa.String(), nullable=False),
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('value', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('namespace', 'key', name='uq_ai_result_cache_namespace_key')
+        )
+        with op.batch_alter_table('ai_result_cache', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_ai_result_cache_id'), ['id'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('ai_result_cache', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ai_result_cache_id'))
+
+    op.drop_table('ai_result_cache')
@@ -0,0 +1,101 @@
+"""dashboard rollups
+
+Per-company spend, vendor and risk totals behind the analytics dashboard,
+rebuilt here from the expenses and risk scores already in the database.
+Expenses scored more than once keep only their newest score first, so the
+risk totals count each expense once.
+
+Databases that ran Base.metadata.create_all after the rollups shipped
+already have the tables; they are rebuilt all the same.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 10:24:09.671352
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Created by 0001; bound to their own metadata so the tables don't create them again
+enum_metadata = sa.MetaData()
+RISK_LEVEL = sa.Enum('LOW', 'MEDIUM', 'HIGH', name='risklevel', metadata=enum_metadata)
+EXPENSE_CATEGORY = sa.Enum('TRAVEL', 'MEALS', 'ACCOMMODATION', 'OFFICE_SUPPLIES', 'ENTERTAINMENT', 'TRANSPORTATION', 'UTILITIES', 'SOFTWARE', 'TRAINING', 'OTHER', name='expensecategory', metadata=enum_metadata)
+EXPENSE_STATUS = sa.Enum('PENDING', 'APPROVED', 'REJECTED', name='expensestatus', metadata=enum_metadata)
+
+
+def upgrade() -> None:
+    from app.services.rollup_service import RollupService
+
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    if 'spend_rollups' not in tables:
+        op.create_table('spend_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('month', sa.Integer(), nullable=False),
+        sa.Column('category', EXPENSE_CATEGORY, nullable=False),
+        sa.Column('status', EXPENSE_STATUS, nullable=False),
+        sa.Column('total_amount', sa.Float(), nullable=False),
+        sa.Column('expense_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('company_id', 'year', 'month', 'category', 'status', name='uq_spend_rollups_bucket')
+        )
+        with op.batch_alter_table('spend_rollups', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_spend_rollups_id'), ['id'], unique=False)
+    if 'vendor_rollups' not in tables:
+        op.create_table('vendor_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('vendor', sa.String(), nullable=False),
+        sa.Column('total_amount', sa.Float(), nullable=False),
+        sa.Column('expense_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('company_id', 'vendor', name='uq_vendor_rollups_bucket')
+        )
+        with op.batch_alter_table('vendor_rollups', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_vendor_rollups_id'), ['id'], unique=False)
+    if 'risk_rollups' not in tables:
+        op.create_table('risk_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('risk_level', RISK_LEVEL, nullable=False),
+        sa.Column('expense_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('company_id', 'risk_level', name='uq_risk_rollups_bucket')
+        )
+        with op.batch_alter_table('risk_rollups', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_risk_rollups_id'), ['id'], unique=False)
+
+    # Keep the newest score where an expense was scored more than once
+    op.execute(
+        "DELETE FROM risk_scores WHERE id NOT IN "
+        "(SELECT MAX(id) FROM risk_scores GROUP BY expense_id)"
+    )
+
+    session = Session(bind=op.get_bind())
+    try:
+        RollupService.rebuild(session)
+        session.flush()
+    finally:
+        session.close()
+
+
+def downgrade() -> None:
+    for table in ('risk_rollups', 'vendor_rollups', 'spend_rollups'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table}_id'))
+
+        op.drop_table(table)
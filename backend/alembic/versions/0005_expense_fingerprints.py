@@ -0,0 +1,64 @@
+"""expense fingerprints
+
+Bucketed near-duplicate index behind the risk duplicate factor, filled in
+here for the expenses already in the database.
+
+Databases that ran Base.metadata.create_all after the index shipped
+already have the table; only the expenses missing from it are added.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 10:31:52.204417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    from app.services.duplicate_index import DuplicateIndex
+
+    if 'expense_fingerprints' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table('expense_fingerprints',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('expense_id', sa.Integer(), nullable=False),
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('amount_bucket', sa.Integer(), nullable=False),
+        sa.Column('day_bucket', sa.Integer(), nullable=False),
+        sa.Column('vendor_key', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+        sa.ForeignKeyConstraint(['expense_id'], ['expenses.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('expense_id')
+        )
+        with op.batch_alter_table('expense_fingerprints', schema=None) as batch_op:
+            batch_op.create_index('ix_expense_fingerprints_bucket', ['company_id', 'amount_bucket', 'day_bucket'], unique=False)
+            batch_op.create_index(batch_op.f('ix_expense_fingerprints_id'), ['id'], unique=False)
+
+    session = Session(bind=op.get_bind())
+    try:
+        DuplicateIndex.backfill(session)
+        session.flush()
+    finally:
+        session.close()
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('expense_fingerprints', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_expense_fingerprints_id'))
+        batch_op.drop_index('ix_expense_fingerprints_bucket')
+
+    op.drop_table('expense_fingerprints')
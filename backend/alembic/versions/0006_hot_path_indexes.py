@@ -0,0 +1,60 @@
+"""hot path indexes
+
+Composite indexes behind the role-scoped expense listings, the approval
+inbox, the user directory and the dashboard status counts, and one risk
+score per expense.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 08:00:55.886650
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('approvals', schema=None) as batch_op:
+        batch_op.create_index('ix_approvals_approver_id_status', ['approver_id', 'status'], unique=False)
+        batch_op.create_index(batch_op.f('ix_approvals_expense_id'), ['expense_id'], unique=False)
+
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.create_index('ix_expenses_company_id_created_at', ['company_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_expenses_company_id_status', ['company_id', 'status'], unique=False)
+        batch_op.create_index('ix_expenses_user_id_created_at', ['user_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_company_id'), ['company_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_users_manager_id'), ['manager_id'], unique=False)
+
+    # 0004 already removed duplicate scores before rebuilding the risk rollups
+    with op.batch_alter_table('risk_scores', schema=None) as batch_op:
+        batch_op.create_index('uq_risk_scores_expense_id', ['expense_id'], unique=True)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_manager_id'))
+        batch_op.drop_index(batch_op.f('ix_users_company_id'))
+
+    with op.batch_alter_table('risk_scores', schema=None) as batch_op:
+        batch_op.drop_index('uq_risk_scores_expense_id')
+
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.drop_index('ix_expenses_user_id_created_at')
+        batch_op.drop_index('ix_expenses_company_id_status')
+        batch_op.drop_index('ix_expenses_company_id_created_at')
+
+    with op.batch_alter_table('approvals', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_approvals_expense_id'))
+        batch_op.drop_index('ix_approvals_approver_id_status')
+
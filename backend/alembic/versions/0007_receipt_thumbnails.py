@@ -0,0 +1,30 @@
+"""receipt thumbnails
+
+Thumbnail generated for each receipt by the enrichment pipeline.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 08:11:30.486227
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('receipt_thumbnail_url', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.drop_column('receipt_thumbnail_url')
@@ -0,0 +1,50 @@
+"""expense workflows
+
+The approval workflow each expense was routed through and the step it is
+waiting on, and an index for loading a company's active workflows.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 09:02:14.530718
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('approval_workflows', schema=None) as batch_op:
+        batch_op.create_index('ix_approval_workflows_company_id_is_active', ['company_id', 'is_active'], unique=False)
+
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('workflow_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('current_step', sa.Integer(), server_default='1', nullable=False))
+        batch_op.create_foreign_key('fk_expenses_workflow_id', 'approval_workflows', ['workflow_id'], ['id'])
+
+    # Pending expenses whose first step is already decided wait on the next one
+    op.execute(
+        "UPDATE expenses SET current_step = ("
+        "SELECT MIN(approvals.workflow_step) FROM approvals "
+        "WHERE approvals.expense_id = expenses.id AND approvals.status = 'PENDING') "
+        "WHERE status = 'PENDING' AND EXISTS ("
+        "SELECT 1 FROM approvals WHERE approvals.expense_id = expenses.id AND approvals.status = 'PENDING')"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_expenses_workflow_id', type_='foreignkey')
+        batch_op.drop_column('current_step')
+        batch_op.drop_column('workflow_id')
+
+    with op.batch_alter_table('approval_workflows', schema=None) as batch_op:
+        batch_op.drop_index('ix_approval_workflows_company_id_is_active')
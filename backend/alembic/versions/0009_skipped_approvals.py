@@ -0,0 +1,39 @@
+"""skipped approvals
+
+Votes left pending on a decided step, or on the later steps of a decided
+expense, are closed as SKIPPED. Existing decided expenses get the same.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 14:37:05.912644
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        # A new enum value can't be used in the transaction that adds it
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE approvalstatus ADD VALUE IF NOT EXISTS 'SKIPPED'")
+
+    op.execute(
+        "UPDATE approvals SET status = 'SKIPPED', comments = 'Skipped: expense decided at an earlier step' "
+        "WHERE status = 'PENDING' AND EXISTS ("
+        "SELECT 1 FROM expenses WHERE expenses.id = approvals.expense_id AND expenses.status != 'PENDING')"
+    )
+
+
+def downgrade() -> None:
+    # PostgreSQL can't drop an enum value; the rows go back to pending instead
+    op.execute("UPDATE approvals SET status = 'PENDING', comments = NULL WHERE status = 'SKIPPED'")
@@ -0,0 +1,144 @@
+import argparse
+import json
+import re
+import sys
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+from .database import Base, SessionLocal, engine
+from .models.user import User, UserRole
+from .models.expense import Expense, ExpenseStatus
+from .models.approval import Approval, ApprovalStatus
+from .models.risk_score import RiskScore
+from .routers.expenses import EXPENSE_LIST_ORDER, ExpenseFilters, visible_expenses
+from .routers.approvals import InboxSort, expense_approvals, inbox_order, pending_approvals
+from .routers.users import USER_LIST_ORDER, company_users
+from .routers.analytics import spend_by_category_status, user_expenses_query
+from .core.pagination import DEFAULT_PAGE_SIZE, page_query
+from .services.principal_cache import Principal
+from .services.risk_service import RiskService
+
+# Plans chosen on a near-empty database say nothing about production; seed one
+# first (e.g. with a synthetic tenant) and check against that
+MIN_EXPENSES = 10000
+
+# Scanning a small table (users, companies) beats an index lookup; only full
+# scans of tables at least this large are reported
+MIN_SCANNED_ROWS = 10000
+
+_SQLITE_FULL_SCAN = re.compile(r"^SCAN (\w+)")
+
+def first_page(statement, columns, descending: bool = True):
+    """The first page of a keyset-paginated endpoint, as the router requests it"""
+    return page_query(statement, columns, None, DEFAULT_PAGE_SIZE, descending)
+
+def hot_queries(db: Session):
+    """(name, query) pairs built by the same helpers as the router and service hot paths"""
+    company_id = db.query(Expense.company_id).group_by(Expense.company_id).order_by(
+        func.count(Expense.id).desc()
+    ).limit(1).scalar()
+    users = db.query(User).filter(User.company_id == company_id)
+    admin = users.filter(User.role == UserRole.ADMIN).first()
+    manager = users.filter(User.role == UserRole.MANAGER).first()
+    employee_id = db.query(Expense.user_id).filter(Expense.company_id == company_id).group_by(
+        Expense.user_id
+    ).order_by(func.count(Expense.id).desc()).limit(1).scalar()
+    employee = db.query(User).filter(User.id == employee_id).first()
+    approver_id = db.query(Approval.approver_id).filter(
+        Approval.status == ApprovalStatus.PENDING
+    ).group_by(Approval.approver_id).order_by(func.count(Approval.id).desc()).limit(1).scalar()
+    expense_id = db.query(func.max(Expense.id)).filter(Expense.company_id == company_id).scalar()
+
+    queries = []
+    for label, user in (("admin", admin), ("manager", manager), ("employee", employee)):
+        if user is not None:
+            principal = Principal.from_user(user)
+            queries.append((f"GET /expenses ({label})", first_page(visible_expenses(principal), EXPENSE_LIST_ORDER)))
+    if admin is not None:
+        queries.append((
+            "GET /expenses?status=pending (admin)",
+            first_page(ExpenseFilters(status=ExpenseStatus.PENDING).apply(
+                visible_expenses(Principal.from_user(admin))
+            ), EXPENSE_LIST_ORDER)
+        ))
+    queries += [
+        ("GET /expenses/{id}", select(Expense).where(Expense.id == expense_id)),
+        ("GET /expenses/{id}/risk", select(RiskScore).where(RiskScore.expense_id == expense_id)),
+        ("GET /approvals/expense/{id}", expense_approvals(expense_id)),
+    ]
+    for sort in InboxSort:
+        columns, _, descending = inbox_order(sort)
+        queries.append((
+            f"GET /approvals/pending?sort={sort.value}",
+            first_page(pending_approvals(approver_id), columns, descending)
+        ))
+    queries += [
+        ("GET /users", first_page(company_users(db, company_id), USER_LIST_ORDER, descending=False)),
+        ("GET /analytics/dashboard", spend_by_category_status(company_id)),
+        ("GET /analytics/user-stats", user_expenses_query(employee_id)),
+        ("risk: recent expenses", RiskService.recent_expenses(employee_id)),
+    ]
+    return queries
+
+def sequential_scans(db: Session, query):
+    """Tables the planner would read in full for ``query`` (a Query or a select())"""
+    statement = getattr(query, "statement", query)
+    sql = str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+
+    if engine.dialect.name == "postgresql":
+        plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        scans, nodes = [], [plan[0]["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            if node["Node Type"] == "Seq Scan":
+                scans.append(node["Relation Name"])
+            nodes.extend(node.get("Plans", []))
+        return scans
+
+    if engine.dialect.name == "sqlite":
+        # "SCAN t" reads all of t, with or without an index to walk it in order;
+        # index lookups show up as "SEARCH t USING INDEX ..."
+        scans = []
+        for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}")):
+            match = _SQLITE_FULL_SCAN.match(row[-1])
+            if match and match.group(1) in Base.metadata.tables:
+                scans.append(match.group(1))
+        return scans
+
+    raise RuntimeError(f"Unsupported database dialect: {engine.dialect.name}")
+
+def check_query_plans(force: bool = False) -> bool:
+    db = SessionLocal()
+
+    try:
+        expense_count = db.query(func.count(Expense.id)).scalar()
+        if expense_count < MIN_EXPENSES and not force:
+            print(f"❌ Only {expense_count} expenses; seed at least {MIN_EXPENSES} first (or pass --force)")
+            return False
+        if engine.dialect.name == "postgresql":
+            db.execute(text("ANALYZE"))
+
+        table_rows = {}
+        def large(table):
+            if table not in table_rows:
+                table_rows[table] = db.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+            return table_rows[table] >= MIN_SCANNED_ROWS
+
+        ok = True
+        for name, query in hot_queries(db):
+            scans = [table for table in sequential_scans(db, query) if force or large(table)]
+            if scans:
+                ok = False
+                print(f"❌ {name}: sequential scan on {', '.join(sorted(set(scans)))}")
+            else:
+                print(f"✅ {name}")
+        return ok
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail if a hot-path query plans a sequential scan")
+    parser.add_argument("--force", action="store_true", help="Check even on a small database, reporting every full scan")
+    args = parser.parse_args()
+    sys.exit(0 if check_query_plans(args.force) else 1)
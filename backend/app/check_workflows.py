@@ -0,0 +1,102 @@
+import argparse
+import sys
+from typing import Optional
+from .models.approval import ApprovalStatus, ApprovalType
+from .services.workflow_engine import CompiledWorkflow, CompiledWorkflows, StepTally
+
+APPROVED = ApprovalStatus.APPROVED
+REJECTED = ApprovalStatus.REJECTED
+
+def workflow(
+    id: int, min_amount: float = 0.0, max_amount: Optional[float] = None,
+    approval_type: ApprovalType = ApprovalType.PERCENTAGE, percentage_required: Optional[float] = None,
+    specific_approver_id: Optional[int] = None
+) -> CompiledWorkflow:
+    return CompiledWorkflow(
+        id=id, name=f"workflow {id}", approval_type=approval_type, min_amount=min_amount,
+        max_amount=max_amount, percentage_required=percentage_required,
+        specific_approver_id=specific_approver_id, steps=()
+    )
+
+def tally(total: int, approved: int = 0, rejected: int = 0, specific: Optional[str] = None) -> StepTally:
+    """Votes on one step; ``specific`` is the specific approver's vote, "pending" if not yet cast"""
+    return StepTally(
+        total=total, approved=approved, rejected=rejected,
+        specific_total=1 if specific else 0,
+        specific_approved=1 if specific == "approved" else 0,
+        specific_rejected=1 if specific == "rejected" else 0
+    )
+
+def outcome_cases():
+    """(name, workflow, tally, expected outcome) for StepTally.outcome"""
+    half = workflow(1, percentage_required=50)
+    unanimous = workflow(2)
+    hybrid = workflow(3, approval_type=ApprovalType.HYBRID, percentage_required=50, specific_approver_id=9)
+    hybrid_unanimous = workflow(4, approval_type=ApprovalType.HYBRID, specific_approver_id=9)
+    return [
+        ("percentage: a tie meets 50%", half, tally(4, approved=2), APPROVED),
+        ("percentage: a tie of rejections leaves 50% reachable", half, tally(4, rejected=2), None),
+        ("percentage: one rejection past the tie decides it", half, tally(4, rejected=3), REJECTED),
+        ("percentage: 50% of 3 needs 2 approvals", half, tally(3, approved=1, rejected=1), None),
+        ("percentage: 50% of 1 needs its only vote", half, tally(1, approved=1), APPROVED),
+        ("percentage: unset means unanimous", unanimous, tally(3, approved=2), None),
+        ("percentage: unanimous fails on one rejection", unanimous, tally(3, approved=2, rejected=1), REJECTED),
+        ("hybrid: specific approver approves alone", hybrid, tally(4, approved=1, specific="approved"), APPROVED),
+        ("hybrid: specific reject leaves the percentage open", hybrid, tally(4, rejected=1, specific="rejected"), None),
+        ("hybrid: percentage approves over a specific reject", hybrid,
+         tally(4, approved=2, rejected=1, specific="rejected"), APPROVED),
+        ("hybrid: specific reject and lost percentage reject", hybrid,
+         tally(4, rejected=3, specific="rejected"), REJECTED),
+        ("hybrid: lost percentage waits on the specific approver", hybrid,
+         tally(4, rejected=3, specific="pending"), None),
+        ("hybrid: specific reject under unanimity rejects", hybrid_unanimous,
+         tally(4, approved=3, rejected=1, specific="rejected"), REJECTED),
+    ]
+
+def match_cases():
+    """(name, workflows, amount, expected workflow id) for CompiledWorkflows.match"""
+    catch_all = workflow(1)
+    band = workflow(2, min_amount=100, max_amount=500)
+    same_band_newer = workflow(3, min_amount=100, max_amount=500)
+    narrow = workflow(4, min_amount=200, max_amount=300)
+    overlapping = [catch_all, band, same_band_newer, narrow]
+    above = workflow(5, min_amount=1000)
+    below = workflow(6, max_amount=100)
+    return [
+        ("overlap: outside every band goes to the open range", overlapping, 50, 1),
+        ("overlap: equal ranges go to the newest", overlapping, 100, 3),
+        ("overlap: the narrowest range wins", overlapping, 250, 4),
+        ("overlap: max_amount is exclusive", overlapping, 300, 3),
+        ("overlap: the open range resumes past the band", overlapping, 500, 1),
+        ("open max_amount: covers very large amounts", overlapping, 10 ** 12, 1),
+        ("open max_amount: min_amount is inclusive", [above, below], 1000, 5),
+        ("open max_amount: gap below it matches nothing", [above, below], 500, None),
+        ("open max_amount: nothing below a positive min_amount", [above], 999.99, None),
+        ("bounded: amount at max_amount matches nothing", [below], 100, None),
+        ("empty: no workflows match nothing", [], 100, None),
+    ]
+
+def check_workflows() -> bool:
+    ok = True
+    for name, rules, votes, expected in outcome_cases():
+        actual = votes.outcome(rules)
+        if actual == expected:
+            print(f"✅ {name}")
+        else:
+            ok = False
+            print(f"❌ {name}: expected {expected}, got {actual}")
+
+    for name, workflows, amount, expected in match_cases():
+        winner = CompiledWorkflows(workflows).match(amount)
+        actual = winner.id if winner is not None else None
+        if actual == expected:
+            print(f"✅ {name}")
+        else:
+            ok = False
+            print(f"❌ {name}: expected workflow {expected}, got {actual}")
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail if workflow voting or amount-range matching misbehaves")
+    parser.parse_args()
+    sys.exit(0 if check_workflows() else 1)
@@ -1,3 +1,6 @@
-from .security import verify_password, get_password_hash, create_access_token, decode_access_token
+from .security import verify_password, get_password_hash, password_needs_rehash, create_access_token, decode_access_token
 
-__all__ = ["verify_password", "get_password_hash", "create_access_token", "decode_access_token"]
+__all__ = [
+    "verify_password", "get_password_hash", "password_needs_rehash",
+    "create_access_token", "decode_access_token"
+]
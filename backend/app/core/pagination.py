@@ -0,0 +1,111 @@
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+from fastapi import HTTPException, Response
+from sqlalchemy import Select, and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", 100))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 1000))
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Opaque cursor for the sort key of the last row on a page"""
+    encoded = [
+        {"dt": v.isoformat()} if isinstance(v, datetime) else v
+        for v in values
+    ]
+    return base64.urlsafe_b64encode(json.dumps(encoded).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return [
+            datetime.fromisoformat(v["dt"]) if isinstance(v, dict) else v
+            for v in values
+        ]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_filter(columns: Sequence, values: Sequence[Any], descending: bool):
+    """Rows strictly after ``values`` in (columns...) order"""
+    conditions = []
+    for i, column in enumerate(columns):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        beyond = column < values[i] if descending else column > values[i]
+        conditions.append(and_(*equal_prefix, beyond))
+    return or_(*conditions)
+
+
+def page_query(query, columns: Sequence, cursor: Optional[str], limit: int, descending: bool):
+    """``query`` (a Query or a select()) narrowed to one page plus a look-ahead row"""
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(columns):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(keyset_filter(columns, values, descending))
+
+    order = [c.desc() if descending else c.asc() for c in columns]
+    return query.order_by(*order).limit(limit + 1)
+
+
+def _split_page(rows: List[Any], row_key: Callable[[Any], Sequence[Any]], limit: int):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(row_key(rows[-1]))
+    return rows, next_cursor
+
+
+def paginate(
+    query: Query,
+    columns: Sequence,
+    row_key: Callable[[Any], Sequence[Any]],
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = True,
+) -> Tuple[List[Any], Optional[str]]:
+    """Keyset pagination over ``columns``, whose last element must be unique.
+
+    Returns the page and the cursor for the next page (None on the last page).
+    """
+    rows = page_query(query, columns, cursor, limit, descending).all()
+    return _split_page(rows, row_key, limit)
+
+
+async def paginate_async(
+    db: AsyncSession,
+    statement: Select,
+    columns: Sequence,
+    row_key: Callable[[Any], Sequence[Any]],
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = True,
+) -> Tuple[List[Any], Optional[str]]:
+    """``paginate`` for a single-entity select() on an AsyncSession"""
+    result = await db.execute(page_query(statement, columns, cursor, limit, descending))
+    return _split_page(list(result.scalars()), row_key, limit)
+
+
+async def count_async(db: AsyncSession, statement: Select) -> int:
+    return await db.scalar(
+        select(func.count()).select_from(statement.order_by(None).subquery())
+    )
+
+
+def set_pagination_headers(response: Response, next_cursor: Optional[str], total: Optional[int] = None):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if total is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
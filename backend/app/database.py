@@ -1,16 +1,174 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from collections import deque
+from typing import Dict
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Optional read-only replica for analytics and list endpoints; unset reads go to DATABASE_URL
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
 
-engine = create_engine(DATABASE_URL)
+# Per process (each worker has its own pools), for the primary and the replica alike
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+# Seconds before a connection is replaced; keep below the server's or proxy's idle timeout
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", -1))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
+
+_LATENCY_SAMPLES = 1000
+
+# Async drivers for the same databases, used by the async routes
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+class PoolMonitor:
+    """Checkout latency and saturation for one connection pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=_LATENCY_SAMPLES)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_seconds = 0.0
+        self.peak_checked_out = 0
+
+    def record(self, seconds: float, checked_out: int, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_seconds += seconds
+            self._latencies.append(seconds)
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def stats(self, pool: QueuePool) -> Dict:
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        with self._lock:
+            latencies = sorted(self._latencies)
+            def percentile(p):
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 6) if latencies else 0.0
+            return {
+                "pool_size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "saturation": round(pool.checkedout() / capacity, 3) if capacity else 0.0,
+                "peak_saturation": round(self.peak_checked_out / capacity, 3) if capacity else 0.0,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "checkout_seconds": {
+                    "mean": round(self.total_seconds / self.checkouts, 6) if self.checkouts else 0.0,
+                    "p50": percentile(0.50),
+                    "p95": percentile(0.95),
+                    "max": round(latencies[-1], 6) if latencies else 0.0,
+                },
+            }
+
+
+class _MonitoredPool:
+    """Times every checkout, including waiting for a free connection, opening
+    a new one and the pre-ping"""
+
+    monitor: PoolMonitor
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self.monitor.record(time.perf_counter() - started, self.checkedout(), timed_out=True)
+            raise
+        self.monitor.record(time.perf_counter() - started, self.checkedout())
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep counting into the same monitor
+        pool = super().recreate()
+        pool.monitor = self.monitor
+        return pool
+
+
+class MonitoredQueuePool(_MonitoredPool, QueuePool):
+    pass
+
+
+class MonitoredAsyncQueuePool(_MonitoredPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def async_url(url: str):
+    """The same database, reached through its async driver"""
+    parsed = make_url(url)
+    return parsed.set(drivername=_ASYNC_DRIVERS.get(parsed.get_backend_name(), parsed.drivername))
+
+
+def _is_memory_sqlite(url) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+
+def _pool_options() -> Dict:
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def _create_engine(url: str):
+    if _is_memory_sqlite(url):
+        # In-memory SQLite needs its single shared connection, not a pool
+        return create_engine(url)
+
+    engine = create_engine(url, poolclass=MonitoredQueuePool, **_pool_options())
+    engine.pool.monitor = PoolMonitor()
+    return engine
+
+
+def _create_async_engine(url: str):
+    url = async_url(url)
+    if _is_memory_sqlite(url):
+        return create_async_engine(url)
+
+    engine = create_async_engine(url, poolclass=MonitoredAsyncQueuePool, **_pool_options())
+    engine.sync_engine.pool.monitor = PoolMonitor()
+    return engine
+
+
+engine = _create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Replicas lag the primary: only use these where slightly stale data is fine,
+# never to read back something the same request (or the user's last one) wrote
+read_engine = _create_engine(DATABASE_READ_URL) if DATABASE_READ_URL else engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Async routes use these; their own pools, so size DB_POOL_* for both.
+# expire_on_commit=False: an expired attribute would need a lazy load, which
+# AsyncSession cannot do implicitly
+async_engine = _create_async_engine(DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+async_read_engine = _create_async_engine(DATABASE_READ_URL) if DATABASE_READ_URL else async_engine
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -19,3 +177,44 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_read_db():
+    """Session on the read replica (the primary when none is configured)"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    """AsyncSession on the read replica (the primary when none is configured)"""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+async def dispose_async_engines():
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+
+def pool_stats() -> Dict:
+    """Checkout latency and saturation of the primary and replica pools"""
+    stats = {}
+    pools = (
+        ("primary", engine, None),
+        ("replica", read_engine, engine),
+        ("async_primary", async_engine.sync_engine, None),
+        ("async_replica", async_read_engine.sync_engine, async_engine.sync_engine),
+    )
+    for name, pool_engine, primary in pools:
+        if pool_engine is primary:
+            continue
+        pool = pool_engine.pool
+        if isinstance(pool, _MonitoredPool):
+            stats[name] = pool.monitor.stats(pool)
+        else:
+            stats[name] = {"pool": type(pool).__name__}
+    return stats
@@ -0,0 +1,64 @@
+import argparse
+import os
+from .database import SessionLocal
+from .models.expense import Expense
+from .services.receipt_store import get_receipt_store, RECEIPT_URL_PREFIX, RECEIPT_GC_GRACE_SECONDS
+
+def adopt_legacy_receipts(db, dry_run=False):
+    """Move receipts saved as loose files into the store and point expenses at them"""
+    store = get_receipt_store()
+    expenses = db.query(Expense).filter(
+        Expense.receipt_url.isnot(None),
+        ~Expense.receipt_url.startswith(RECEIPT_URL_PREFIX)
+    ).all()
+
+    adopted = 0
+    for expense in expenses:
+        path = expense.receipt_url
+        if not os.path.exists(path):
+            print(f"❌ Expense {expense.id}: receipt file {path} is missing")
+            continue
+        if dry_run:
+            adopted += 1
+            continue
+        with open(path, "rb") as f:
+            stored = store.save(f)
+        expense.receipt_url = stored.url if stored else None
+        db.commit()
+        os.remove(path)
+        adopted += 1
+    return adopted
+
+def gc_receipts(grace_seconds=RECEIPT_GC_GRACE_SECONDS, adopt_legacy=False, dry_run=False):
+    db = SessionLocal()
+
+    try:
+        if adopt_legacy:
+            adopted = adopt_legacy_receipts(db, dry_run)
+            print(f"✅ Adopted {adopted} legacy receipt files")
+
+        referenced = set()
+        for column in (Expense.receipt_url, Expense.receipt_thumbnail_url):
+            referenced.update(
+                url[len(RECEIPT_URL_PREFIX):]
+                for (url,) in db.query(column).filter(column.startswith(RECEIPT_URL_PREFIX)).distinct()
+            )
+        removed = get_receipt_store().collect_garbage(referenced, grace_seconds, dry_run)
+        action = "Would remove" if dry_run else "Removed"
+        print(f"✅ {action} {removed} unreferenced receipts ({len(referenced)} in use)")
+    except Exception as e:
+        print(f"❌ Error collecting receipts: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete stored receipts no expense refers to")
+    parser.add_argument("--grace-seconds", type=int, default=RECEIPT_GC_GRACE_SECONDS,
+                        help="Keep unreferenced receipts stored more recently than this")
+    parser.add_argument("--adopt-legacy", action="store_true",
+                        help="First move receipts saved as loose files into the store")
+    parser.add_argument("--dry-run", action="store_true", help="Report without changing anything")
+    args = parser.parse_args()
+    gc_receipts(args.grace_seconds, args.adopt_legacy, args.dry_run)
@@ -0,0 +1,461 @@
+"""Deterministic synthetic tenants for capacity testing.
+
+Where create_demo_users makes one company and three logins, this builds many
+companies with manager hierarchies (admin -> directors -> managers ->
+employees) and millions of expenses with their approvals, duplicate
+fingerprints and risk scores, then rebuilds the dashboard rollups. The same
+``--seed`` and ``--as-of`` always produce the same data.
+
+Rows are written in chunks with COPY on PostgreSQL and executemany elsewhere;
+on PostgreSQL companies are generated in parallel worker processes. User and
+expense ids are assigned up front, so nothing else may write to the database
+while it runs: use a scratch database.
+
+    python -m app.generate_tenants --companies 50 --employees 400 --expenses 10000000
+"""
+import argparse
+import csv
+import io
+import math
+import multiprocessing
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Tuple
+from sqlalchemy import func, select, text
+from .database import SessionLocal, engine
+from .migrate import upgrade_database
+from .core.security import get_password_hash
+from .models.company import Company
+from .models.user import User, UserRole
+from .models.expense import Expense, ExpenseCategory, ExpenseStatus
+from .models.approval import Approval, ApprovalStatus
+from .models.enrichment_job import EnrichmentStatus
+from .models.expense_fingerprint import ExpenseFingerprint
+from .models.risk_score import RiskScore
+from .services.duplicate_index import amount_bucket, day_bucket, normalize_vendor
+from .services.risk_service import RiskService, RECENT_WINDOW_DAYS
+from .services.rollup_service import RollupService
+
+SYNTHETIC_PASSWORD = "Synthetic@123"
+SPAN_OF_CONTROL = 8  # Employees per manager
+MANAGERS_PER_DIRECTOR = 6
+DUPLICATE_RATE = 0.01  # Expenses re-submitted by the same user
+FOREIGN_RATE = 0.08  # Travel-type expenses paid in another currency
+SECOND_STEP_USD = 1000  # Above this a director approves after the manager
+
+COUNTRIES = [
+    ("United States", "USD", 30), ("India", "INR", 20), ("United Kingdom", "GBP", 12),
+    ("Germany", "EUR", 12), ("Canada", "CAD", 8), ("Australia", "AUD", 6),
+    ("Singapore", "SGD", 6), ("Japan", "JPY", 6),
+]
+# Units per US dollar; fixed so generated amounts do not depend on live rates
+USD_RATES = {
+    "USD": 1.0, "INR": 83.2, "GBP": 0.79, "EUR": 0.92, "CAD": 1.36, "AUD": 1.52, "SGD": 1.34, "JPY": 149.5,
+}
+
+# Category -> (share, median USD, lognormal sigma, vendors, descriptions)
+CATEGORY_PROFILES = {
+    ExpenseCategory.MEALS: (30, 35, 0.6, ["Corner Bistro", "Harbor Grill", "Bean There Cafe", "Noodle House", "Green Bowl"],
+                            ["Client lunch", "Team dinner", "Working lunch", "Coffee with candidate"]),
+    ExpenseCategory.TRANSPORTATION: (20, 28, 0.7, ["MetroCab", "Uber", "RailLink", "City Parking", "Lyft"],
+                                     ["Taxi to airport", "Train to client site", "Parking", "Ride to office"]),
+    ExpenseCategory.TRAVEL: (10, 420, 0.6, ["SkyWays", "Delta Air Lines", "IndiGo", "Lufthansa", "Expedia"],
+                             ["Flight to customer site", "Conference travel", "Return flight"]),
+    ExpenseCategory.ACCOMMODATION: (8, 180, 0.5, ["City Inn", "Marriott", "Hilton", "Airbnb", "Holiday Inn"],
+                                    ["Hotel stay", "Hotel for offsite", "Lodging during audit"]),
+    ExpenseCategory.OFFICE_SUPPLIES: (10, 45, 0.8, ["OfficeHub", "Staples Inc.", "Amazon", "Paper & Co"],
+                                      ["Printer paper and toner", "Notebooks and pens", "Monitor cable"]),
+    ExpenseCategory.SOFTWARE: (7, 60, 0.9, ["CodeTools", "JetBrains", "Adobe", "Atlassian", "Figma"],
+                               ["Monthly IDE licence", "Design tool subscription", "Plugin licence"]),
+    ExpenseCategory.ENTERTAINMENT: (5, 150, 0.8, ["Grand Theatre", "Bowl-O-Rama", "Harbor Grill", "Skyline Bar"],
+                                    ["Team outing", "Client entertainment", "Offsite activity"]),
+    ExpenseCategory.TRAINING: (3, 450, 0.7, ["LearnFast", "DevSummit", "Coursera", "O'Reilly"],
+                               ["Online course", "Conference registration", "Certification exam"]),
+    ExpenseCategory.UTILITIES: (4, 90, 0.5, ["FiberNet", "Vodafone", "Comcast", "Airtel"],
+                                ["Internet bill", "Mobile phone bill", "Home office internet"]),
+    ExpenseCategory.OTHER: (3, 50, 1.0, ["Amazon", "Local Store", "Post Office"],
+                            ["Courier", "Miscellaneous", "Gift for client"]),
+}
+FOREIGN_CATEGORIES = {ExpenseCategory.TRAVEL, ExpenseCategory.ACCOMMODATION, ExpenseCategory.MEALS}
+
+FIRST_NAMES = ["Aarav", "Maya", "Liam", "Sofia", "Noah", "Priya", "Ethan", "Chloe", "Arjun", "Hana",
+               "Lucas", "Amara", "Mateo", "Zoe", "Kenji", "Isla", "Omar", "Leah", "Ravi", "Nora"]
+LAST_NAMES = ["Sharma", "Smith", "Müller", "Tanaka", "Garcia", "Chen", "Brown", "Patel", "Rossi", "Kim",
+              "Singh", "Martin", "Nguyen", "Silva", "Cohen", "Okafor", "Dubois", "Larsen", "Khan", "Walsh"]
+
+USER_COLUMNS = ("id", "email", "hashed_password", "full_name", "role", "company_id", "manager_id", "created_at")
+EXPENSE_COLUMNS = (
+    "id", "user_id", "company_id", "amount", "currency", "converted_amount", "category", "description",
+    "expense_date", "vendor", "status", "ai_suggested_category", "enrichment_status", "current_step",
+    "created_at", "updated_at",
+)
+FINGERPRINT_COLUMNS = ("expense_id", "company_id", "user_id", "amount", "amount_bucket", "day_bucket", "vendor_key")
+APPROVAL_COLUMNS = ("expense_id", "approver_id", "workflow_step", "status", "approved_at", "created_at")
+RISK_COLUMNS = ("expense_id", "score", "risk_level", "factors", "created_at")
+
+
+class BulkWriter:
+    """Chunked inserts: COPY on PostgreSQL, executemany elsewhere.
+
+    Rows hold enum columns as member names, which is what SQLAlchemy stores
+    and what its Enum type also accepts, so they can go to COPY unconverted.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.copy = connection.dialect.name == "postgresql"
+
+    def write(self, table, columns: Tuple[str, ...], rows: List[Tuple]):
+        if not rows:
+            return
+        if not self.copy:
+            self.connection.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+            return
+
+        # None becomes an unquoted empty field, which COPY's csv format reads as NULL;
+        # str(datetime) is a timestamp PostgreSQL parses
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cursor = self.connection.connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+
+
+def _apportion(total: int, weights: List[float]) -> List[int]:
+    """Split ``total`` in proportion to ``weights`` (largest remainder)"""
+    weight_sum = sum(weights)
+    shares = [total * w / weight_sum for w in weights]
+    counts = [int(share) for share in shares]
+    by_remainder = sorted(range(len(weights)), key=lambda i: counts[i] - shares[i])
+    for i in by_remainder[:total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+def plan_companies(companies: int, employees: int, expenses: int, seed: int) -> List[Dict]:
+    """Company sizes vary around ``employees`` (a few big tenants, many small); expenses follow headcount"""
+    rng = random.Random(seed)
+    sizes = [max(5, round(employees * rng.lognormvariate(0, 0.8) / math.exp(0.32))) for _ in range(companies)]
+    countries = rng.choices(COUNTRIES, weights=[w for _, _, w in COUNTRIES], k=companies)
+    return [
+        {
+            "index": i,
+            "name": f"Synthetic Tenant {seed}-{i:04d}",
+            "domain": f"tenant{i}-s{seed}.example.com",
+            "country": country,
+            "currency": currency,
+            "employees": size,
+            "expenses": count,
+        }
+        for i, (size, (country, currency, _), count) in enumerate(
+            zip(sizes, countries, _apportion(expenses, sizes))
+        )
+    ]
+
+
+def build_hierarchy(plan: Dict, company_id: int, first_user_id: int, hashed_password: str, seed: int,
+                    created_at: datetime) -> Tuple[List[Tuple], List[Tuple]]:
+    """User rows for one company and its submitters as (user_id, approver chain, activity weight)"""
+    rng = random.Random(f"{seed}:users:{plan['index']}")
+    employees = plan["employees"]
+    managers = math.ceil(employees / SPAN_OF_CONTROL)
+    directors = math.ceil(managers / MANAGERS_PER_DIRECTOR) if managers > 1 else 0
+    rows, submitters = [], []
+    next_id = first_user_id
+
+    def add(email: str, role: UserRole, manager_id):
+        nonlocal next_id
+        user_id = next_id
+        next_id += 1
+        full_name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        rows.append((user_id, email, hashed_password, full_name, role.name, company_id, manager_id, created_at))
+        return user_id
+
+    domain = plan["domain"]
+    admin_id = add(f"admin@{domain}", UserRole.ADMIN, None)
+    director_ids = [add(f"director{i}@{domain}", UserRole.MANAGER, admin_id) for i in range(directors)]
+    manager_ids = []
+    for i in range(managers):
+        director_id = director_ids[i // MANAGERS_PER_DIRECTOR] if director_ids else admin_id
+        manager_ids.append(add(f"manager{i}@{domain}", UserRole.MANAGER, director_id))
+        # Managers file expenses too, less often than their reports
+        submitters.append((manager_ids[-1], (director_id, None if director_id == admin_id else admin_id), 0.5))
+    parent = {manager_id: rows[manager_id - first_user_id][6] for manager_id in manager_ids}
+    for i in range(employees):
+        manager_id = manager_ids[i // SPAN_OF_CONTROL]
+        user_id = add(f"employee{i}@{domain}", UserRole.EMPLOYEE, manager_id)
+        submitters.append((user_id, (manager_id, parent[manager_id]), rng.lognormvariate(0, 0.75)))
+    return rows, submitters
+
+
+def _status(rng: random.Random, age_days: float) -> ExpenseStatus:
+    roll = rng.random()
+    if age_days < 3:
+        return ExpenseStatus.PENDING if roll < 0.9 else ExpenseStatus.APPROVED
+    if age_days < 30:
+        return ExpenseStatus.PENDING if roll < 0.35 else ExpenseStatus.APPROVED if roll < 0.95 else ExpenseStatus.REJECTED
+    return ExpenseStatus.APPROVED if roll < 0.92 else ExpenseStatus.REJECTED if roll < 0.98 else ExpenseStatus.PENDING
+
+
+def user_expenses(rng: random.Random, count: int, currency: str, as_of: datetime, history_days: int) -> List[Dict]:
+    """One user's expenses, oldest submission first, with duplicate and frequency factors"""
+    categories = list(CATEGORY_PROFILES)
+    weights = [profile[0] for profile in CATEGORY_PROFILES.values()]
+    rate = USD_RATES[currency]
+    expenses = []
+    for _ in range(count):
+        if expenses and rng.random() < DUPLICATE_RATE:
+            # The same receipt submitted again a day or so later
+            original = rng.choice(expenses)
+            copy = dict(original, duplicates=1)
+            copy["expense_date"] = original["expense_date"] + timedelta(days=rng.randint(0, 1))
+            copy["created_at"] = min(original["created_at"] + timedelta(hours=rng.uniform(2, 72)), as_of)
+            original["duplicates"] += 1
+            expenses.append(copy)
+            continue
+
+        category = rng.choices(categories, weights)[0]
+        _, median_usd, sigma, vendors, descriptions = CATEGORY_PROFILES[category]
+        # Recent months are busier than older ones; weekends are quiet
+        days_ago = int(history_days * (1 - math.sqrt(rng.random())))
+        expense_date = (as_of - timedelta(days=days_ago)).replace(hour=0, minute=0, second=0, microsecond=0)
+        if expense_date.weekday() >= 5 and rng.random() < 0.75:
+            expense_date -= timedelta(days=expense_date.weekday() - rng.randint(0, 4))
+        converted = round(median_usd * rng.lognormvariate(0, sigma) * rate, 2)
+        paid_in = currency
+        amount = converted
+        if category in FOREIGN_CATEGORIES and rng.random() < FOREIGN_RATE:
+            paid_in = rng.choice([code for code in USD_RATES if code != currency])
+            amount = round(converted / rate * USD_RATES[paid_in], 2)
+        expenses.append({
+            "amount": amount,
+            "currency": paid_in,
+            "converted_amount": converted,
+            "usd_amount": converted / rate,
+            "category": category,
+            "description": rng.choice(descriptions),
+            "vendor": rng.choice(vendors),
+            "expense_date": expense_date,
+            "created_at": min(expense_date + timedelta(hours=rng.uniform(1, 120)), as_of),
+            "duplicates": 0,
+        })
+
+    expenses.sort(key=lambda e: e["created_at"])
+    window = deque()
+    for expense in expenses:
+        # What the risk check saw at submission: this user's expenses in the week before
+        while window and window[0] < expense["created_at"] - timedelta(days=RECENT_WINDOW_DAYS):
+            window.popleft()
+        expense["recent"] = len(window)
+        window.append(expense["created_at"])
+    return expenses
+
+
+def generate_company(job: Dict) -> Dict:
+    """Write one company's expenses and everything derived from them; runs in a worker process"""
+    started = time.perf_counter()
+    as_of, history_days, chunk_size = job["as_of"], job["history_days"], job["chunk_size"]
+    company_id, currency = job["company_id"], job["currency"]
+    rng = random.Random(f"{job['seed']}:expenses:{job['index']}")
+    counts = _apportion(job["expenses"], [weight for _, _, weight in job["submitters"]])
+    vendor_keys: Dict[str, str] = {}
+    next_id = job["first_expense_id"]
+    tables = {"expenses": [], "fingerprints": [], "approvals": [], "risk_scores": []}
+    written = 0
+
+    with engine.connect() as connection:
+        writer = BulkWriter(connection)
+
+        def flush():
+            # Explicit begin: COPY goes through the DBAPI cursor, which does not autobegin
+            with connection.begin():
+                writer.write(Expense.__table__, EXPENSE_COLUMNS, tables["expenses"])
+                writer.write(ExpenseFingerprint.__table__, FINGERPRINT_COLUMNS, tables["fingerprints"])
+                writer.write(Approval.__table__, APPROVAL_COLUMNS, tables["approvals"])
+                writer.write(RiskScore.__table__, RISK_COLUMNS, tables["risk_scores"])
+            for rows in tables.values():
+                rows.clear()
+
+        for (user_id, (approver_id, second_approver_id), _), count in zip(job["submitters"], counts):
+            for e in user_expenses(rng, count, currency, as_of, history_days):
+                expense_id = next_id
+                next_id += 1
+                created_at = e["created_at"]
+                status = _status(rng, (as_of - created_at).total_seconds() / 86400)
+                decided_at = min(created_at + timedelta(hours=rng.uniform(2, 96)), as_of)
+
+                # Pending approvals for every step are created with the expense, as the app does
+                two_step = second_approver_id is not None and e["usd_amount"] > SECOND_STEP_USD
+                if status == ExpenseStatus.PENDING:
+                    first = ApprovalStatus.APPROVED if two_step and rng.random() < 0.5 else ApprovalStatus.PENDING
+                    second = ApprovalStatus.PENDING
+                else:
+                    decided = ApprovalStatus(status.value)
+                    first, second = (ApprovalStatus.APPROVED, decided) if two_step else (decided, None)
+                current_step = 2 if first == ApprovalStatus.APPROVED and second == ApprovalStatus.PENDING else 1
+                updated_at = created_at if status == ExpenseStatus.PENDING else decided_at
+                tables["expenses"].append((
+                    expense_id, user_id, company_id, e["amount"], e["currency"], e["converted_amount"],
+                    e["category"].name, e["description"], e["expense_date"], e["vendor"], status.name,
+                    e["category"].value, EnrichmentStatus.COMPLETED.name, current_step,
+                    created_at, updated_at
+                ))
+
+                vendor = e["vendor"]
+                if vendor not in vendor_keys:
+                    vendor_keys[vendor] = normalize_vendor(vendor)
+                tables["fingerprints"].append((
+                    expense_id, company_id, user_id, e["converted_amount"],
+                    amount_bucket(e["converted_amount"]), day_bucket(e["expense_date"]), vendor_keys[vendor]
+                ))
+
+                tables["approvals"].append((
+                    expense_id, approver_id, 1, first.name,
+                    None if first == ApprovalStatus.PENDING else decided_at, created_at
+                ))
+                if two_step:
+                    tables["approvals"].append((
+                        expense_id, second_approver_id, 2, second.name,
+                        None if second == ApprovalStatus.PENDING else decided_at, created_at
+                    ))
+
+                risk = RiskService.score_factors(
+                    e["converted_amount"], e["expense_date"], False, e["duplicates"], e["recent"]
+                )
+                tables["risk_scores"].append((
+                    expense_id, risk["score"], risk["risk_level"].name, risk["factors"], created_at
+                ))
+
+                if len(tables["expenses"]) >= chunk_size:
+                    written += len(tables["expenses"])
+                    flush()
+        written += len(tables["expenses"])
+        flush()
+
+    return {"index": job["index"], "expenses": written, "seconds": time.perf_counter() - started}
+
+
+def _create_tenants(db, plans: List[Dict], seed: int, as_of: datetime) -> List[Dict]:
+    """Companies and their users; returns one expense job per company"""
+    names = [plan["name"] for plan in plans]
+    if db.query(Company.id).filter(Company.name.in_(names)).first() is not None:
+        raise RuntimeError(f"Tenants for seed {seed} already exist; use another --seed or a fresh database")
+
+    company_rows = [
+        Company(name=plan["name"], country=plan["country"], currency=plan["currency"], created_at=as_of)
+        for plan in plans
+    ]
+    db.add_all(company_rows)
+    db.commit()
+
+    # One bcrypt hash for everyone: hashing millions of passwords would dominate the run
+    hashed_password = get_password_hash(SYNTHETIC_PASSWORD)
+    next_user_id = (db.scalar(select(func.max(User.id))) or 0) + 1
+    next_expense_id = (db.scalar(select(func.max(Expense.id))) or 0) + 1
+    jobs = []
+    writer = BulkWriter(db.connection())
+    for plan, company in zip(plans, company_rows):
+        users, submitters = build_hierarchy(plan, company.id, next_user_id, hashed_password, seed, as_of)
+        writer.write(User.__table__, USER_COLUMNS, users)
+        next_user_id += len(users)
+        jobs.append({
+            "index": plan["index"],
+            "seed": seed,
+            "company_id": company.id,
+            "currency": plan["currency"],
+            "expenses": plan["expenses"],
+            "first_expense_id": next_expense_id,
+            "submitters": submitters,
+        })
+        next_expense_id += plan["expenses"]
+    db.commit()
+    return jobs
+
+
+def _sync_sequences(db):
+    """COPY with explicit ids leaves PostgreSQL's serial sequences behind"""
+    for table in ("users", "expenses"):
+        db.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT COALESCE(MAX(id), 1) FROM {table}))"
+        ))
+
+
+def generate_tenants(companies=10, employees=200, expenses=1000000, months=24, seed=42, as_of=None,
+                     workers=None, chunk_size=20000):
+    as_of = datetime.combine(as_of or date.today(), datetime.min.time()) + timedelta(hours=18)
+    postgres = engine.dialect.name == "postgresql"
+    # Only PostgreSQL takes concurrent bulk writers well
+    workers = max(1, workers or min(os.cpu_count() or 1, 8)) if postgres else 1
+    plans = plan_companies(companies, employees, expenses, seed)
+    started = time.perf_counter()
+
+    db = SessionLocal()
+    try:
+        jobs = _create_tenants(db, plans, seed, as_of)
+        user_count = sum(len(job["submitters"]) for job in jobs)
+        print(f"✅ Created {len(jobs)} companies and their hierarchies ({user_count} submitters)")
+        for job in jobs:
+            job.update(as_of=as_of, history_days=months * 30, chunk_size=chunk_size)
+
+        if workers == 1:
+            results = (generate_company(job) for job in jobs)
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            results = (future.result() for future in as_completed([executor.submit(generate_company, job) for job in jobs]))
+        done = 0
+        for result in results:
+            done += 1
+            print(f"✅ Company {done}/{len(jobs)}: {result['expenses']:,} expenses in {result['seconds']:.1f}s")
+        if workers > 1:
+            executor.shutdown()
+
+        if postgres:
+            _sync_sequences(db)
+        for job in jobs:
+            RollupService.rebuild(db, job["company_id"])
+        db.commit()
+        if postgres:
+            # Fresh planner statistics, or the first queries plan for empty tables
+            db.execute(text("ANALYZE"))
+            db.commit()
+    except Exception as e:
+        print(f"❌ Error generating tenants: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Generated {expenses:,} expenses for {companies} companies in {elapsed:.1f}s "
+          f"({expenses / elapsed:,.0f} expenses/s)")
+    print(f"\n📋 Every user logs in with password {SYNTHETIC_PASSWORD}, e.g.")
+    print(f"   admin@{plans[0]['domain']}")
+    print(f"   manager0@{plans[0]['domain']}")
+    print(f"   employee0@{plans[0]['domain']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic tenants for capacity testing")
+    parser.add_argument("--companies", type=int, default=10)
+    parser.add_argument("--employees", type=int, default=200, help="Average employees per company")
+    parser.add_argument("--expenses", type=int, default=1000000, help="Expenses across all companies")
+    parser.add_argument("--months", type=int, default=24, help="Months of history")
+    parser.add_argument("--seed", type=int, default=42, help="The same seed and --as-of give the same data")
+    parser.add_argument("--as-of", type=date.fromisoformat, default=None, help="Last day of history (default: today)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes on PostgreSQL (default: CPUs, max 8)")
+    parser.add_argument("--chunk-size", type=int, default=20000, help="Expenses per COPY/executemany batch")
+    parser.add_argument("--no-migrate", action="store_true", help="Skip upgrading the schema first")
+    args = parser.parse_args()
+    if not args.no_migrate:
+        upgrade_database()
+    generate_tenants(
+        args.companies, args.employees, args.expenses, args.months, args.seed, args.as_of,
+        args.workers, args.chunk_size
+    )
@@ -1,15 +1,46 @@
-from fastapi import FastAPI
+import secrets
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine, Base
-from .routers import auth, users, expenses, approvals, analytics
+from fastapi.responses import PlainTextResponse
+from .core.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+from .routers import auth, users, expenses, approvals, analytics, workflows
+from .services.country_index import get_country_index, COUNTRY_INDEX_REFRESH_ON_STARTUP
+from .services.http_client import get_http_client, close_http_client
+from .services.enrichment_service import get_enrichment_queue, ENRICHMENT_IN_PROCESS
+from .services.password_hasher import get_password_hasher
+from .services.receipt_preprocessor import get_receipt_preprocessor
+from .migrate import upgrade_database, AUTO_MIGRATE
+from .database import dispose_async_engines
+from .services.metrics import RequestMetricsMiddleware, get_metrics, METRICS_TOKEN
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Bring the database schema up to date
+if AUTO_MIGRATE:
+    upgrade_database()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The country index is served from the bundled snapshot; refresh it off the hot path
+    if COUNTRY_INDEX_REFRESH_ON_STARTUP:
+        get_country_index().refresh_in_background()
+    # One pooled HTTP client is shared by all outbound calls for the app's lifetime
+    get_http_client()
+    # bcrypt runs in its own worker processes, off the event loop
+    get_password_hasher().start()
+    if ENRICHMENT_IN_PROCESS:
+        await get_enrichment_queue().start()
+    yield
+    await get_enrichment_queue().stop()
+    await close_http_client()
+    get_password_hasher().shutdown()
+    get_receipt_preprocessor().shutdown()
+    await dispose_async_engines()
 
 app = FastAPI(
     title="SpendSense AI",
     description="Smart Expense Management Platform with AI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -19,13 +50,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, "Server-Timing"],
 )
 
+# Outermost, so its latency covers the other middleware too
+app.add_middleware(RequestMetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(expenses.router)
 app.include_router(approvals.router)
+app.include_router(workflows.router)
 app.include_router(analytics.router)
 
 @app.get("/")
@@ -39,3 +75,11 @@ def root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics(authorization: str = Header(None)):
+    """Request, SQL and external-call metrics in the Prometheus text format"""
+    if METRICS_TOKEN and not secrets.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    return PlainTextResponse(get_metrics().render(), media_type="text/plain; version=0.0.4")
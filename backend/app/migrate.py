@@ -0,0 +1,39 @@
+import argparse
+import os
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from dotenv import load_dotenv
+from .database import engine
+
+load_dotenv()
+
+# Apply pending migrations on startup. With several app workers, turn this off
+# and run `python -m app.migrate` once per deploy instead.
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "true").lower() == "true"
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The original create_all schema. Databases made by create_all later on may
+# hold some newer tables too; the revisions after this one skip what exists.
+BASELINE_REVISION = "0001"
+
+def alembic_config() -> Config:
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    config.attributes["configure_logger"] = False
+    return config
+
+def upgrade_database(revision: str = "head"):
+    config = alembic_config()
+    tables = inspect(engine).get_table_names()
+    if "alembic_version" not in tables and "expenses" in tables:
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, revision)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upgrade the database schema")
+    parser.add_argument("revision", nargs="?", default="head", help="Target revision (default: head)")
+    args = parser.parse_args()
+    upgrade_database(args.revision)
+    print(f"✅ Database upgraded to {args.revision}")
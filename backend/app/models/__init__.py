@@ -3,5 +3,13 @@ from .company import Company
 from .expense import Expense
 from .approval import Approval, ApprovalWorkflow
 from .risk_score import RiskScore
+from .enrichment_job import EnrichmentJob
+from .ai_result_cache import AIResultCache
+from .spend_rollup import SpendRollup, VendorRollup, RiskRollup
+from .expense_fingerprint import ExpenseFingerprint
 
-__all__ = ["User", "Company", "Expense", "Approval", "ApprovalWorkflow", "RiskScore"]
+__all__ = [
+    "User", "Company", "Expense", "Approval", "ApprovalWorkflow", "RiskScore",
+    "EnrichmentJob", "AIResultCache", "SpendRollup", "VendorRollup", "RiskRollup",
+    "ExpenseFingerprint"
+]
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, UniqueConstraint
+from datetime import datetime
+from ..database import Base
+
+class AIResultCache(Base):
+    __tablename__ = "ai_result_cache"
+    __table_args__ = (UniqueConstraint("namespace", "key", name="uq_ai_result_cache_namespace_key"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    namespace = Column(String, nullable=False)  # classification, ocr
+    key = Column(String(64), nullable=False)  # SHA-256 of the normalized input
+    value = Column(Text, nullable=False)  # JSON-encoded result
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text, Float, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text, Float, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
@@ -8,6 +8,7 @@ class ApprovalStatus(str, enum.Enum):
     PENDING = "pending"
     APPROVED = "approved"
     REJECTED = "rejected"
+    SKIPPED = "skipped"  # Vote no longer needed once its step or expense was decided
 
 class ApprovalType(str, enum.Enum):
     SEQUENTIAL = "sequential"
@@ -17,9 +18,12 @@ class ApprovalType(str, enum.Enum):
 
 class Approval(Base):
     __tablename__ = "approvals"
+    __table_args__ = (
+        Index("ix_approvals_approver_id_status", "approver_id", "status"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    expense_id = Column(Integer, ForeignKey("expenses.id"), nullable=False)
+    expense_id = Column(Integer, ForeignKey("expenses.id"), nullable=False, index=True)
     approver_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     workflow_step = Column(Integer, nullable=False)  # 1=Manager, 2=Finance, 3=Director
     status = Column(Enum(ApprovalStatus), default=ApprovalStatus.PENDING)
@@ -33,6 +37,9 @@ class Approval(Base):
 
 class ApprovalWorkflow(Base):
     __tablename__ = "approval_workflows"
+    __table_args__ = (
+        Index("ix_approval_workflows_company_id_is_active", "company_id", "is_active"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
@@ -42,7 +49,7 @@ class ApprovalWorkflow(Base):
     max_amount = Column(Float, nullable=True)
     percentage_required = Column(Float, nullable=True)  # For percentage type
     specific_approver_id = Column(Integer, ForeignKey("users.id"), nullable=True)
-    steps = Column(Text, nullable=True)  # JSON string of workflow steps
+    steps = Column(Text, nullable=True)  # JSON list of approver user ids and/or "manager"
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
+from .enrichment_job import EnrichmentStatus
 import enum
 
 class ExpenseStatus(str, enum.Enum):
@@ -23,6 +24,12 @@ class ExpenseCategory(str, enum.Enum):
 
 class Expense(Base):
     __tablename__ = "expenses"
+    __table_args__ = (
+        # Role-scoped listings are ordered newest first; dashboards filter on status
+        Index("ix_expenses_company_id_created_at", "company_id", "created_at"),
+        Index("ix_expenses_user_id_created_at", "user_id", "created_at"),
+        Index("ix_expenses_company_id_status", "company_id", "status"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -34,9 +41,16 @@ class Expense(Base):
     description = Column(Text, nullable=False)
     expense_date = Column(DateTime, nullable=False)
     receipt_url = Column(String, nullable=True)
+    receipt_thumbnail_url = Column(String, nullable=True)
     vendor = Column(String, nullable=True)
     status = Column(Enum(ExpenseStatus), default=ExpenseStatus.PENDING)
+    workflow_id = Column(Integer, ForeignKey("approval_workflows.id"), nullable=True)  # None: manager approval only
+    current_step = Column(Integer, nullable=False, default=1, server_default="1")  # Approval step awaiting a decision
     ai_suggested_category = Column(String, nullable=True)
+    enrichment_status = Column(Enum(EnrichmentStatus), default=EnrichmentStatus.COMPLETED)
+    ocr_text = Column(Text, nullable=True)
+    ocr_amount = Column(Float, nullable=True)
+    ocr_date = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -45,3 +59,4 @@ class Expense(Base):
     company = relationship("Company", back_populates="expenses")
     approvals = relationship("Approval", back_populates="expense")
     risk_score = relationship("RiskScore", back_populates="expense", uselist=False)
+    enrichment_jobs = relationship("EnrichmentJob", back_populates="expense")
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
+from ..database import Base
+
+# Near-duplicate lookup keys for expenses, maintained by DuplicateIndex.
+# Matching expenses land in the same or an adjacent (amount, day) bucket, so
+# a lookup probes at most 3x3 buckets through the composite index.
+
+class ExpenseFingerprint(Base):
+    __tablename__ = "expense_fingerprints"
+    __table_args__ = (
+        Index("ix_expense_fingerprints_bucket", "company_id", "amount_bucket", "day_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    expense_id = Column(Integer, ForeignKey("expenses.id"), nullable=False, unique=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    amount = Column(Float, nullable=False)  # In company currency
+    amount_bucket = Column(Integer, nullable=False)  # Logarithmic, see DuplicateIndex
+    day_bucket = Column(Integer, nullable=False)  # Ordinal of expense_date
+    vendor_key = Column(String, nullable=True)  # Normalized vendor name
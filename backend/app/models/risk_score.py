@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
@@ -11,6 +11,10 @@ class RiskLevel(str, enum.Enum):
 
 class RiskScore(Base):
     __tablename__ = "risk_scores"
+    __table_args__ = (
+        # One score per expense
+        Index("uq_risk_scores_expense_id", "expense_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     expense_id = Column(Integer, ForeignKey("expenses.id"), nullable=False)
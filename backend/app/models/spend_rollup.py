@@ -0,0 +1,45 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Enum, UniqueConstraint
+from ..database import Base
+from .expense import ExpenseCategory, ExpenseStatus
+from .risk_score import RiskLevel
+
+# Pre-aggregated dashboard counters, maintained by RollupService in the same
+# transaction as the expense writes they summarise.
+
+class SpendRollup(Base):
+    __tablename__ = "spend_rollups"
+    __table_args__ = (
+        UniqueConstraint("company_id", "year", "month", "category", "status", name="uq_spend_rollups_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    year = Column(Integer, nullable=False)  # Of expense_date
+    month = Column(Integer, nullable=False)
+    category = Column(Enum(ExpenseCategory), nullable=False)
+    status = Column(Enum(ExpenseStatus), nullable=False)
+    total_amount = Column(Float, nullable=False, default=0.0)  # In company currency
+    expense_count = Column(Integer, nullable=False, default=0)
+
+class VendorRollup(Base):
+    __tablename__ = "vendor_rollups"
+    __table_args__ = (
+        UniqueConstraint("company_id", "vendor", name="uq_vendor_rollups_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    vendor = Column(String, nullable=False)
+    total_amount = Column(Float, nullable=False, default=0.0)
+    expense_count = Column(Integer, nullable=False, default=0)
+
+class RiskRollup(Base):
+    __tablename__ = "risk_rollups"
+    __table_args__ = (
+        UniqueConstraint("company_id", "risk_level", name="uq_risk_rollups_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    risk_level = Column(Enum(RiskLevel), nullable=False)
+    expense_count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,24 @@
+import argparse
+from .database import SessionLocal
+from .services.rollup_service import RollupService
+
+def rebuild_rollups(company_id=None):
+    db = SessionLocal()
+    
+    try:
+        RollupService.rebuild(db, company_id)
+        db.commit()
+        scope = f"company {company_id}" if company_id else "all companies"
+        print(f"✅ Rebuilt dashboard rollups for {scope}")
+    except Exception as e:
+        print(f"❌ Error rebuilding rollups: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill the dashboard rollup tables")
+    parser.add_argument("--company-id", type=int, default=None, help="Only rebuild one company")
+    args = parser.parse_args()
+    rebuild_rollups(args.company_id)
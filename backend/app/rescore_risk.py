@@ -0,0 +1,41 @@
+import argparse
+import time
+from datetime import date, datetime
+from datetime import time as day_time
+from .database import SessionLocal
+from .models.company import Company
+from .services.risk_service import RiskService, RISK_BATCH_SIZE
+
+def rescore_risk(company_id=None, since=None, until=None, batch_size=RISK_BATCH_SIZE):
+    db = SessionLocal()
+    
+    try:
+        start_date = datetime.combine(since, day_time.min) if since else None
+        end_date = datetime.combine(until, day_time.max) if until else None
+        if company_id is not None:
+            company_ids = [company_id]
+        else:
+            company_ids = [row.id for row in db.query(Company.id).order_by(Company.id)]
+        
+        for cid in company_ids:
+            started = time.perf_counter()
+            scored = RiskService.rescore(
+                db, cid, start_date, end_date, batch_size=batch_size, commit=True
+            )
+            elapsed = time.perf_counter() - started
+            print(f"✅ Re-scored {scored} expenses for company {cid} in {elapsed:.1f}s")
+    except Exception as e:
+        print(f"❌ Error re-scoring expenses: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute risk scores in set-based batches")
+    parser.add_argument("--company-id", type=int, default=None, help="Only re-score one company")
+    parser.add_argument("--since", type=date.fromisoformat, default=None, help="First expense date (YYYY-MM-DD)")
+    parser.add_argument("--until", type=date.fromisoformat, default=None, help="Last expense date (YYYY-MM-DD)")
+    parser.add_argument("--batch-size", type=int, default=RISK_BATCH_SIZE, help="Expenses per chunk")
+    args = parser.parse_args()
+    rescore_risk(args.company_id, args.since, args.until, args.batch_size)
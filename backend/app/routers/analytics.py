@@ -1,85 +1,100 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
 from typing import List, Dict
 from datetime import datetime, timedelta
-from ..database import get_db
-from ..models.user import User, UserRole
+from ..database import get_async_db, pool_stats
+from ..models.user import UserRole
 from ..models.expense import Expense, ExpenseCategory, ExpenseStatus
 from ..models.risk_score import RiskScore, RiskLevel
+from ..models.spend_rollup import SpendRollup, VendorRollup, RiskRollup
 from ..routers.users import get_current_user
+from ..services.principal_cache import Principal, get_principal_cache
+from ..services.workflow_engine import get_workflow_engine
+from ..services.dashboard_cache import get_dashboard_cache
+from ..services.result_cache import classification_cache, ocr_cache
+from ..services.password_hasher import get_password_hasher
+from ..services.receipt_preprocessor import get_receipt_preprocessor
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
 @router.get("/dashboard")
-def get_dashboard_analytics(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_dashboard_analytics(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get AI-powered dashboard insights"""
     
-    # Get company expenses
-    company_expenses = db.query(Expense).filter(
-        Expense.company_id == current_user.company_id
-    ).all()
+    # Computed on the primary: a replica lagging behind the write that bumped
+    # the version would have its stale result cached under the new one
+    return await get_dashboard_cache().get_or_compute_async(
+        ("company", current_user.company_id),
+        lambda: _compute_dashboard(current_user.company_id, current_user.company_currency, db)
+    )
+
+def spend_by_category_status(company_id: int):
+    return select(
+        SpendRollup.category,
+        SpendRollup.status,
+        func.sum(SpendRollup.total_amount),
+        func.sum(SpendRollup.expense_count)
+    ).where(
+        SpendRollup.company_id == company_id
+    ).group_by(SpendRollup.category, SpendRollup.status)
+
+async def _compute_dashboard(company_id: int, currency: str, db: AsyncSession) -> Dict:
+    """Build the dashboard payload for a company"""
     
-    # Total spend
-    total_spend = sum(e.converted_amount or 0 for e in company_expenses)
+    # Spend by category and status, from the rollup table
+    spend_rows = (await db.execute(spend_by_category_status(company_id))).all()
     
-    # Spend by category
+    total_spend = 0
     category_spend = {}
-    for expense in company_expenses:
-        cat = expense.category.value
-        category_spend[cat] = category_spend.get(cat, 0) + (expense.converted_amount or 0)
+    status_counts = {}
+    for category, expense_status, total, count in spend_rows:
+        total_spend += total or 0
+        category_spend[category.value] = category_spend.get(category.value, 0) + (total or 0)
+        status_counts[expense_status] = status_counts.get(expense_status, 0) + (count or 0)
     
     # Monthly trend (last 6 months)
     six_months_ago = datetime.utcnow() - timedelta(days=180)
-    monthly_expenses = db.query(
-        extract('month', Expense.expense_date).label('month'),
-        func.sum(Expense.converted_amount).label('total')
-    ).filter(
-        Expense.company_id == current_user.company_id,
-        Expense.expense_date >= six_months_ago
-    ).group_by('month').all()
+    monthly_expenses = (await db.execute(select(
+        SpendRollup.year,
+        SpendRollup.month,
+        func.sum(SpendRollup.total_amount).label('total')
+    ).where(
+        SpendRollup.company_id == company_id,
+        SpendRollup.year * 100 + SpendRollup.month >= six_months_ago.year * 100 + six_months_ago.month
+    ).group_by(SpendRollup.year, SpendRollup.month).order_by(SpendRollup.year, SpendRollup.month))).all()
     
-    monthly_trend = [{"month": m, "total": float(t or 0)} for m, t in monthly_expenses]
+    monthly_trend = [{"month": m, "total": float(t or 0)} for _, m, t in monthly_expenses]
     
     # Risk distribution
-    risk_distribution = db.query(
-        RiskScore.risk_level,
-        func.count(RiskScore.id).label('count')
-    ).join(Expense).filter(
-        Expense.company_id == current_user.company_id
-    ).group_by(RiskScore.risk_level).all()
+    risk_distribution = (await db.execute(select(
+        RiskRollup.risk_level,
+        RiskRollup.expense_count
+    ).where(
+        RiskRollup.company_id == company_id,
+        RiskRollup.expense_count > 0
+    ))).all()
     
     risk_stats = {r.value: c for r, c in risk_distribution}
     
     # Top vendors
-    vendor_spend = db.query(
-        Expense.vendor,
-        func.sum(Expense.converted_amount).label('total')
-    ).filter(
-        Expense.company_id == current_user.company_id,
-        Expense.vendor.isnot(None)
-    ).group_by(Expense.vendor).order_by(func.sum(Expense.converted_amount).desc()).limit(5).all()
+    vendor_spend = (await db.execute(select(
+        VendorRollup.vendor,
+        VendorRollup.total_amount
+    ).where(
+        VendorRollup.company_id == company_id,
+        VendorRollup.expense_count > 0
+    ).order_by(VendorRollup.total_amount.desc()).limit(5))).all()
     
     top_vendors = [{"vendor": v, "total": float(t or 0)} for v, t in vendor_spend]
     
     # Approval stats
-    pending_count = db.query(Expense).filter(
-        Expense.company_id == current_user.company_id,
-        Expense.status == ExpenseStatus.PENDING
-    ).count()
-    
-    approved_count = db.query(Expense).filter(
-        Expense.company_id == current_user.company_id,
-        Expense.status == ExpenseStatus.APPROVED
-    ).count()
-    
-    rejected_count = db.query(Expense).filter(
-        Expense.company_id == current_user.company_id,
-        Expense.status == ExpenseStatus.REJECTED
-    ).count()
+    pending_count = status_counts.get(ExpenseStatus.PENDING, 0)
+    approved_count = status_counts.get(ExpenseStatus.APPROVED, 0)
+    rejected_count = status_counts.get(ExpenseStatus.REJECTED, 0)
     
     # AI Insights
     insights = []
@@ -91,7 +106,7 @@ def get_dashboard_analytics(
         insights.append({
             "type": "forecast",
             "title": "Spending Forecast",
-            "message": f"Based on recent trends, projected spend next month: {current_user.company.currency} {forecast:.2f}",
+            "message": f"Based on recent trends, projected spend next month: {currency} {forecast:.2f}",
             "value": forecast
         })
     
@@ -111,7 +126,7 @@ def get_dashboard_analytics(
         insights.append({
             "type": "category",
             "title": "Top Spending Category",
-            "message": f"{top_category[0].replace('_', ' ').title()} accounts for {current_user.company.currency} {top_category[1]:.2f}",
+            "message": f"{top_category[0].replace('_', ' ').title()} accounts for {currency} {top_category[1]:.2f}",
             "value": top_category[1]
         })
     
@@ -134,7 +149,7 @@ def get_dashboard_analytics(
     
     return {
         "total_spend": total_spend,
-        "currency": current_user.company.currency,
+        "currency": currency,
         "category_spend": category_spend,
         "monthly_trend": monthly_trend,
         "risk_distribution": risk_stats,
@@ -149,15 +164,25 @@ def get_dashboard_analytics(
     }
 
 @router.get("/user-stats")
-def get_user_stats(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_user_stats(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get user-specific expense statistics"""
     
-    user_expenses = db.query(Expense).filter(
-        Expense.user_id == current_user.id
-    ).all()
+    # On the primary, like the dashboard, so a cached payload never predates a write
+    return await get_dashboard_cache().get_or_compute_async(
+        ("user", current_user.id),
+        lambda: _compute_user_stats(current_user.id, db)
+    )
+
+def user_expenses_query(user_id: int):
+    return select(Expense).where(Expense.user_id == user_id)
+
+async def _compute_user_stats(user_id: int, db: AsyncSession) -> Dict:
+    """Build the expense statistics for a user"""
+    
+    user_expenses = (await db.scalars(user_expenses_query(user_id))).all()
     
     total_submitted = len(user_expenses)
     total_amount = sum(e.converted_amount or 0 for e in user_expenses)
@@ -173,3 +198,41 @@ def get_user_stats(
         "pending": pending,
         "approval_rate": (approved / total_submitted * 100) if total_submitted > 0 else 0
     }
+
+@router.get("/cache-stats")
+def get_cache_stats(current_user: Principal = Depends(get_current_user)):
+    """Get dashboard, principal, workflow and AI result cache hit rates (Admin only)"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return {
+        "dashboard": get_dashboard_cache().stats(),
+        "principals": get_principal_cache().stats(),
+        "workflows": get_workflow_engine().stats(),
+        "ocr": ocr_cache.stats(),
+        "classification": classification_cache.stats()
+    }
+
+@router.get("/password-hashing")
+def get_password_hashing_stats(current_user: Principal = Depends(get_current_user)):
+    """Get password hashing latency and queue depth (Admin only)"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return get_password_hasher().stats()
+
+@router.get("/receipt-preprocessing")
+def get_receipt_preprocessing_stats(current_user: Principal = Depends(get_current_user)):
+    """Get bytes saved and time spent shrinking receipts for OCR (Admin only)"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return get_receipt_preprocessor().stats()
+
+@router.get("/db-pool")
+def get_db_pool_stats(current_user: Principal = Depends(get_current_user)):
+    """Get database pool checkout latency and saturation (Admin only)"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return pool_stats()
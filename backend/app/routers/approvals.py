@@ -1,50 +1,111 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
+from typing import Any, Callable, List, Optional, Sequence, Tuple
 from datetime import datetime
-from ..database import get_db
-from ..models.user import User, UserRole
+import enum
+from ..database import get_async_db
+from ..models.user import UserRole
 from ..models.expense import Expense, ExpenseStatus
 from ..models.approval import Approval, ApprovalStatus
-from ..schemas.approval import ApprovalResponse, ApprovalUpdate
+from ..models.risk_score import RiskScore
+from ..schemas.approval import ApprovalResponse, ApprovalUpdate, PendingApprovalResponse
 from ..routers.users import get_current_user
+from ..services.principal_cache import Principal
+from ..core.pagination import paginate_async, count_async, set_pagination_headers, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from ..services.rollup_service import RollupService
+from ..services.dashboard_cache import get_dashboard_cache
+from ..services.workflow_engine import WorkflowEngine, get_workflow_engine
 
 router = APIRouter(prefix="/approvals", tags=["Approvals"])
 
-@router.get("/pending", response_model=List[dict])
-def get_pending_approvals(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+class InboxSort(str, enum.Enum):
+    AGE = "age"  # Oldest first
+    AMOUNT = "amount"  # Largest first, in company currency
+    RISK = "risk"  # Highest risk score first
+
+def pending_approvals(approver_id: int) -> Select:
+    """An approver's inbox, with expense, submitter and risk score joined in"""
+    return select(Approval).join(
+        Approval.expense
+    ).join(
+        Expense.user
+    ).outerjoin(
+        Expense.risk_score
+    ).options(
+        contains_eager(Approval.expense).contains_eager(Expense.user),
+        contains_eager(Approval.expense).contains_eager(Expense.risk_score)
+    ).filter(
+        Approval.approver_id == approver_id,
+        Approval.status == ApprovalStatus.PENDING,
+        # Later steps of a chain wait until the earlier ones are decided
+        Expense.status == ExpenseStatus.PENDING,
+        Approval.workflow_step == Expense.current_step
+    )
+
+def inbox_order(sort: InboxSort) -> Tuple[Sequence, Callable[[Approval], Sequence[Any]], bool]:
+    """(keyset columns, row key, descending) for an inbox sort"""
+    if sort == InboxSort.AMOUNT:
+        amount = func.coalesce(Expense.converted_amount, 0.0)
+        return [amount, Approval.id], lambda a: (a.expense.converted_amount or 0.0, a.id), True
+    if sort == InboxSort.RISK:
+        score = func.coalesce(RiskScore.score, 0.0)
+        risk_key = lambda a: (a.expense.risk_score.score if a.expense.risk_score else 0.0, a.id)
+        return [score, Approval.id], risk_key, True
+    return [Approval.created_at, Approval.id], lambda a: (a.created_at, a.id), False
+
+def expense_approvals(expense_id: int) -> Select:
+    return select(Approval).where(Approval.expense_id == expense_id).order_by(Approval.workflow_step)
+
+@router.get("/pending", response_model=List[PendingApprovalResponse])
+async def get_pending_approvals(
+    response: Response,
+    sort: InboxSort = InboxSort.AGE,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    include_total: bool = False,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get pending approvals for current user"""
-    
-    approvals = db.query(Approval).filter(
-        Approval.approver_id == current_user.id,
-        Approval.status == ApprovalStatus.PENDING
-    ).all()
-    
-    result = []
-    for approval in approvals:
-        expense = db.query(Expense).filter(Expense.id == approval.expense_id).first()
-        if expense:
-            result.append({
-                "approval": approval,
-                "expense": expense,
-                "submitter": expense.user
-            })
-    
-    return result
+    """Get pending approvals for current user with expense, submitter and risk"""
+    
+    # Approval, expense, submitter and risk score arrive in one joined query
+    statement = pending_approvals(current_user.id)
+    total = await count_async(db, statement) if include_total else None
+    
+    columns, row_key, descending = inbox_order(sort)
+    approvals, next_cursor = await paginate_async(
+        db,
+        statement,
+        columns,
+        row_key,
+        cursor,
+        limit,
+        descending=descending
+    )
+    set_pagination_headers(response, next_cursor, total)
+    
+    return [
+        {
+            "approval": approval,
+            "expense": approval.expense,
+            "submitter": approval.expense.user,
+            "risk": approval.expense.risk_score
+        }
+        for approval in approvals
+    ]
 
 @router.put("/{approval_id}", response_model=ApprovalResponse)
-def update_approval(
+async def update_approval(
     approval_id: int,
     approval_data: ApprovalUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Approve or reject an expense"""
     
-    approval = db.query(Approval).filter(Approval.id == approval_id).first()
+    approval = await db.get(Approval, approval_id)
     if not approval:
         raise HTTPException(status_code=404, detail="Approval not found")
     
@@ -52,43 +113,66 @@ def update_approval(
     if approval.approver_id != current_user.id and current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Access denied")
     
+    # Locked so concurrent votes on the same step are counted one after another
+    expense = await db.get(Expense, approval.expense_id, with_for_update=True)
+    # Re-read under the lock: a concurrent vote may have decided this approval since
+    await db.refresh(approval, with_for_update=True)
+    if (approval.status != ApprovalStatus.PENDING
+            or expense.status != ExpenseStatus.PENDING
+            or approval.workflow_step != expense.current_step):
+        raise HTTPException(status_code=400, detail="Approval is not awaiting a decision")
+    
     # Update approval
     approval.status = approval_data.status
     approval.comments = approval_data.comments
     approval.approved_at = datetime.utcnow()
+    old_status = expense.status
     
-    # Update expense status
-    expense = db.query(Expense).filter(Expense.id == approval.expense_id).first()
+    workflow = None
+    if expense.workflow_id:
+        workflow = await get_workflow_engine().workflow_for_async(expense.company_id, expense.workflow_id, db)
     
-    if approval_data.status == ApprovalStatus.REJECTED:
+    # Written before the step's votes are counted or the leftover ones closed
+    await db.flush()
+    if workflow is not None and workflow.is_group:
+        # Percentage and hybrid steps are decided by the step's vote counts, this one included
+        tally = await WorkflowEngine.tally_async(db, expense.id, approval.workflow_step, workflow.specific_approver_id)
+        outcome = tally.outcome(workflow)
+    else:
+        outcome = approval_data.status
+    
+    # Update expense status
+    if outcome == ApprovalStatus.REJECTED:
         expense.status = ExpenseStatus.REJECTED
-    elif approval_data.status == ApprovalStatus.APPROVED:
+    elif outcome == ApprovalStatus.APPROVED:
         # Check if there are more approval steps
-        next_approval = db.query(Approval).filter(
-            Approval.expense_id == approval.expense_id,
-            Approval.workflow_step > approval.workflow_step,
-            Approval.status == ApprovalStatus.PENDING
-        ).first()
-        
-        if not next_approval:
+        next_step = await WorkflowEngine.next_step_async(db, expense.id, approval.workflow_step)
+        if next_step is None:
             # No more approvals needed
             expense.status = ExpenseStatus.APPROVED
-        # else: expense stays pending for next approval
+        else:
+            expense.current_step = next_step
+    
+    if outcome is not None:
+        await WorkflowEngine.skip_pending_async(
+            db, expense.id, approval.workflow_step, later_steps=expense.status != ExpenseStatus.PENDING
+        )
     
-    db.commit()
-    db.refresh(approval)
+    await db.run_sync(lambda session: RollupService.record_status_change(expense, old_status, session))
+    await db.commit()
+    get_dashboard_cache().invalidate_expense_writes(expense.company_id, expense.user_id)
     
     return approval
 
 @router.get("/expense/{expense_id}", response_model=List[ApprovalResponse])
-def get_expense_approvals(
+async def get_expense_approvals(
     expense_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all approvals for an expense"""
     
-    expense = db.query(Expense).filter(Expense.id == expense_id).first()
+    expense = await db.get(Expense, expense_id)
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
     
@@ -97,8 +181,6 @@ def get_expense_approvals(
         expense.user_id != current_user.id):
         raise HTTPException(status_code=403, detail="Access denied")
     
-    approvals = db.query(Approval).filter(
-        Approval.expense_id == expense_id
-    ).order_by(Approval.workflow_step).all()
+    approvals = await db.scalars(expense_approvals(expense_id))
     
-    return approvals
+    return approvals.all()
@@ -4,8 +4,9 @@ from ..database import get_db
 from ..models.user import User, UserRole
 from ..models.company import Company
 from ..schemas.user import UserCreate, UserLogin, Token, UserResponse
-from ..core.security import verify_password, get_password_hash, create_access_token
+from ..core.security import create_access_token
 from ..services.external_api import ExternalAPIService
+from ..services.password_hasher import get_password_hasher
 from datetime import timedelta
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -19,6 +20,9 @@ def signup(user_data: UserCreate, company_name: str, country: str, db: Session =
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
+    # Hash first, so a saturated hashing pool refuses the signup before anything is written
+    hashed_password = get_password_hasher().hash(user_data.password)
+    
     # Get currency from country
     currency = ExternalAPIService.get_country_currency(country)
     
@@ -33,7 +37,6 @@ def signup(user_data: UserCreate, company_name: str, country: str, db: Session =
     db.refresh(company)
     
     # Create admin user
-    hashed_password = get_password_hash(user_data.password)
     user = User(
         email=user_data.email,
         hashed_password=hashed_password,
@@ -59,14 +62,22 @@ def signup(user_data: UserCreate, company_name: str, country: str, db: Session =
 @router.post("/login", response_model=Token)
 def login(credentials: UserLogin, db: Session = Depends(get_db)):
     """Login endpoint"""
+    hasher = get_password_hasher()
     
     user = db.query(User).filter(User.email == credentials.email).first()
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    if not user or not hasher.verify(credentials.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
+    # Upgrade hashes made with a different BCRYPT_ROUNDS while we have the plaintext
+    new_hash = hasher.rehash_if_needed(credentials.password, user.hashed_password)
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
+        db.refresh(user)
+    
     access_token = create_access_token(
         data={"sub": user.email, "user_id": user.id, "role": user.role.value}
     )
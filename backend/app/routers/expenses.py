@@ -1,19 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, func, case, insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
-from ..database import get_db
+from ..database import get_db, get_async_db, get_async_read_db, ReadSessionLocal
 from ..models.user import User, UserRole
 from ..models.expense import Expense, ExpenseStatus, ExpenseCategory
 from ..models.approval import Approval, ApprovalStatus
-from ..models.risk_score import RiskScore
-from ..schemas.expense import ExpenseCreate, ExpenseResponse, ExpenseUpdate
+from ..models.risk_score import RiskScore, RiskLevel
+from ..schemas.expense import ExpenseCreate, ExpenseResponse, ExpenseUpdate, EnrichmentStatusResponse, ExpenseImportResult
 from ..routers.users import get_current_user
+from ..services.principal_cache import Principal
+from ..core.pagination import paginate_async, count_async, set_pagination_headers, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from ..services.external_api import ExternalAPIService
 from ..services.risk_service import RiskService
-import base64
+from ..services.enrichment_service import get_enrichment_queue
+from ..services.rollup_service import RollupService
+from ..services.duplicate_index import DuplicateIndex
+from ..services.dashboard_cache import get_dashboard_cache
+from ..services.receipt_store import get_receipt_store
+from ..services.import_service import ImportService
+from ..services.workflow_engine import WorkflowEngine, get_workflow_engine
+from ..models.enrichment_job import EnrichmentJob
+from ..models.expense_fingerprint import ExpenseFingerprint
+import asyncio
+import csv
+import enum
+import io
+import json
 import os
 
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+
 router = APIRouter(prefix="/expenses", tags=["Expenses"])
 
 @router.post("/", response_model=ExpenseResponse)
@@ -25,8 +45,8 @@ async def create_expense(
     expense_date: str = Form(...),
     vendor: Optional[str] = Form(None),
     receipt: Optional[UploadFile] = File(None),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create new expense with optional receipt upload"""
     
@@ -36,31 +56,23 @@ async def create_expense(
     except:
         parsed_date = datetime.utcnow()
     
-    # Get company currency and convert
-    company = current_user.company
-    converted_amount = ExternalAPIService.convert_currency(
-        amount, currency, company.currency
-    )
-    
-    # Handle receipt upload and OCR
+    # Stream the receipt into the content-addressed store (identical files are kept once)
     receipt_url = None
-    ocr_data = None
     if receipt:
-        # Save receipt (in production, use cloud storage)
-        receipt_data = await receipt.read()
-        receipt_filename = f"receipt_{current_user.id}_{datetime.utcnow().timestamp()}.jpg"
-        receipt_path = f"/tmp/{receipt_filename}"
-        
-        with open(receipt_path, "wb") as f:
-            f.write(receipt_data)
-        
-        receipt_url = receipt_path
-        
-        # Extract text from receipt using OCR
-        ocr_data = await ExternalAPIService.extract_text_from_receipt(receipt_data)
+        stored = await asyncio.to_thread(get_receipt_store().save, receipt.file)
+        if stored:
+            receipt_url = stored.url
     
-    # Get AI category suggestion
-    ai_category = await ExternalAPIService.classify_expense_category(description)
+    # Get company currency and convert
+    converted_amount = await ExternalAPIService.convert_currency_async(
+        amount, currency, current_user.company_currency
+    )
+    
+    # Route through the company's workflow for this amount
+    compiled = await get_workflow_engine().for_company_async(current_user.company_id, db)
+    workflow_id, chain = WorkflowEngine.chain_for(
+        compiled, converted_amount, current_user.id, current_user.manager_id
+    )
     
     # Create expense
     expense = Expense(
@@ -73,75 +85,236 @@ async def create_expense(
         description=description,
         expense_date=parsed_date,
         receipt_url=receipt_url,
-        vendor=vendor or (ocr_data.get("vendor") if ocr_data else None),
-        ai_suggested_category=ai_category,
-        status=ExpenseStatus.PENDING
+        vendor=vendor,
+        status=ExpenseStatus.PENDING,
+        workflow_id=workflow_id
     )
     
     db.add(expense)
-    db.commit()
-    db.refresh(expense)
+    await db.flush()
+    await db.run_sync(lambda session: RollupService.record_expense(expense, session))
+    # A new expense has no fingerprint to refresh yet
+    db.add(ExpenseFingerprint(**DuplicateIndex.fingerprint(expense)))
     
     # Calculate risk score
-    risk_data = RiskService.calculate_risk_score(expense, db)
-    risk_score = RiskScore(
-        expense_id=expense.id,
-        score=risk_data["score"],
-        risk_level=risk_data["risk_level"],
-        factors=risk_data["factors"]
-    )
-    db.add(risk_score)
+    await RiskService.apply_risk_score_async(expense, db, is_new=True)
+    
+    # The whole approval chain goes in with one insert
+    if chain:
+        await db.execute(insert(Approval), [{"expense_id": expense.id, **row} for row in chain])
     
-    # Create approval workflow (Manager -> Finance -> Director)
-    if current_user.manager_id:
-        approval = Approval(
-            expense_id=expense.id,
-            approver_id=current_user.manager_id,
-            workflow_step=1
-        )
-        db.add(approval)
+    # OCR and AI category suggestion run in the background enrichment pipeline
+    enrichment_queue = get_enrichment_queue()
+    enrichment_queue.enqueue(expense, db)
     
-    db.commit()
-    db.refresh(expense)
+    await db.commit()
+    enrichment_queue.notify()
+    get_dashboard_cache().invalidate_expense_writes(expense.company_id, expense.user_id)
     
     return expense
 
-@router.get("/", response_model=List[ExpenseResponse])
-def get_expenses(
-    current_user: User = Depends(get_current_user),
+class ExportFormat(str, enum.Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+@router.post("/import", response_model=ExpenseImportResult)
+async def import_expenses(
+    file: UploadFile = File(...),
+    format: Optional[ExportFormat] = None,
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get expenses based on user role"""
+    """Bulk-create expenses from a CSV or NDJSON file laid out like the export"""
+    if format is None:
+        filename = (file.filename or "").lower()
+        format = ExportFormat.NDJSON if filename.endswith((".ndjson", ".jsonl")) else ExportFormat.CSV
+    
+    # Parsing, scoring and the chunked inserts all block; keep them off the event loop
+    return await asyncio.to_thread(
+        ImportService.import_expenses, file.file, format.value, current_user, db
+    )
+
+class ExpenseFilters:
+    """Query-string filters shared by the expense list and export endpoints"""
     
+    def __init__(
+        self,
+        status: Optional[ExpenseStatus] = None,
+        category: Optional[ExpenseCategory] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        user_id: Optional[int] = None,
+        risk_level: Optional[RiskLevel] = None
+    ):
+        self.status = status
+        self.category = category
+        self.start_date = start_date
+        self.end_date = end_date
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        self.user_id = user_id
+        self.risk_level = risk_level
+    
+    def apply(self, query):
+        if self.status:
+            query = query.filter(Expense.status == self.status)
+        if self.category:
+            query = query.filter(Expense.category == self.category)
+        if self.start_date:
+            query = query.filter(Expense.expense_date >= self.start_date)
+        if self.end_date:
+            query = query.filter(Expense.expense_date <= self.end_date)
+        # Amount filters are in company currency
+        if self.min_amount is not None:
+            query = query.filter(Expense.converted_amount >= self.min_amount)
+        if self.max_amount is not None:
+            query = query.filter(Expense.converted_amount <= self.max_amount)
+        if self.user_id:
+            query = query.filter(Expense.user_id == self.user_id)
+        if self.risk_level:
+            query = query.filter(Expense.id.in_(
+                select(RiskScore.expense_id).where(RiskScore.risk_level == self.risk_level)
+            ))
+        return query
+
+# Newest first, for the list endpoint and its query plan check
+EXPENSE_LIST_ORDER = [Expense.created_at, Expense.id]
+
+def visible_expenses(current_user: Principal):
+    """Expenses the current user may see, based on role"""
+    query = select(Expense)
     if current_user.role == UserRole.ADMIN:
         # Admin sees all company expenses
-        expenses = db.query(Expense).filter(
-            Expense.company_id == current_user.company_id
-        ).order_by(Expense.created_at.desc()).all()
-    elif current_user.role == UserRole.MANAGER:
+        return query.filter(Expense.company_id == current_user.company_id)
+    if current_user.role == UserRole.MANAGER:
         # Manager sees team expenses
-        subordinate_ids = [u.id for u in current_user.subordinates]
-        subordinate_ids.append(current_user.id)
-        expenses = db.query(Expense).filter(
-            Expense.user_id.in_(subordinate_ids)
-        ).order_by(Expense.created_at.desc()).all()
-    else:
-        # Employee sees own expenses
-        expenses = db.query(Expense).filter(
-            Expense.user_id == current_user.id
-        ).order_by(Expense.created_at.desc()).all()
+        team_ids = [*current_user.subordinate_ids, current_user.id]
+        return query.filter(Expense.user_id.in_(team_ids))
+    # Employee sees own expenses
+    return query.filter(Expense.user_id == current_user.id)
+
+@router.get("/", response_model=List[ExpenseResponse])
+async def get_expenses(
+    response: Response,
+    filters: ExpenseFilters = Depends(),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    include_total: bool = False,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get expenses based on user role, newest first, one page at a time"""
+    
+    statement = filters.apply(visible_expenses(current_user))
+    total = await count_async(db, statement) if include_total else None
+    
+    expenses, next_cursor = await paginate_async(
+        db,
+        statement,
+        EXPENSE_LIST_ORDER,
+        lambda e: (e.created_at, e.id),
+        cursor,
+        limit
+    )
+    set_pagination_headers(response, next_cursor, total)
     
     return expenses
 
+EXPORT_COLUMNS = [
+    "id", "created_at", "expense_date", "user_id", "submitter_email", "amount", "currency",
+    "converted_amount", "category", "status", "vendor", "description", "ai_suggested_category",
+    "risk_score", "risk_level", "approvals_pending", "approvals_approved", "approvals_rejected"
+]
+
+@router.get("/export")
+def export_expenses(
+    format: ExportFormat = ExportFormat.CSV,
+    filters: ExpenseFilters = Depends(),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Stream visible expenses as CSV or NDJSON with risk and approval columns"""
+    
+    # Per-expense approval counts, limited to the caller's company
+    approval_counts = select(
+        Approval.expense_id,
+        func.sum(case((Approval.status == ApprovalStatus.PENDING, 1), else_=0)).label("pending"),
+        func.sum(case((Approval.status == ApprovalStatus.APPROVED, 1), else_=0)).label("approved"),
+        func.sum(case((Approval.status == ApprovalStatus.REJECTED, 1), else_=0)).label("rejected")
+    ).join(Expense, Expense.id == Approval.expense_id).where(
+        Expense.company_id == current_user.company_id
+    ).group_by(Approval.expense_id).subquery()
+    
+    # Rows are read later from the stream's own session
+    statement = filters.apply(visible_expenses(current_user)).with_only_columns(
+        Expense.id, Expense.created_at, Expense.expense_date, Expense.user_id, User.email,
+        Expense.amount, Expense.currency, Expense.converted_amount, Expense.category,
+        Expense.status, Expense.vendor, Expense.description, Expense.ai_suggested_category,
+        RiskScore.score, RiskScore.risk_level,
+        func.coalesce(approval_counts.c.pending, 0),
+        func.coalesce(approval_counts.c.approved, 0),
+        func.coalesce(approval_counts.c.rejected, 0)
+    ).join(User, User.id == Expense.user_id).outerjoin(
+        RiskScore, RiskScore.expense_id == Expense.id
+    ).outerjoin(
+        approval_counts, approval_counts.c.expense_id == Expense.id
+    ).order_by(Expense.id)
+    
+    if format == ExportFormat.CSV:
+        media_type = "text/csv"
+    else:
+        media_type = "application/x-ndjson"
+    filename = f"expenses_{datetime.utcnow():%Y%m%d_%H%M%S}.{format.value}"
+    
+    return StreamingResponse(
+        _stream_export(statement, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+def _stream_export(statement, format: ExportFormat):
+    """Yield the export in chunks read from a server-side cursor"""
+    db = ReadSessionLocal()
+    try:
+        result = db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if format == ExportFormat.CSV:
+            writer.writerow(EXPORT_COLUMNS)
+        
+        for rows in result.partitions():
+            for row in rows:
+                values = [_export_value(v) for v in row]
+                if format == ExportFormat.CSV:
+                    writer.writerow(values)
+                else:
+                    buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, values))))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        
+        yield buffer.getvalue()
+    finally:
+        db.close()
+
+def _export_value(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
 @router.get("/{expense_id}", response_model=ExpenseResponse)
-def get_expense(
+async def get_expense(
     expense_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get expense by ID"""
     
-    expense = db.query(Expense).filter(Expense.id == expense_id).first()
+    expense = await db.get(Expense, expense_id)
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
     
@@ -151,19 +324,51 @@ def get_expense(
     
     return expense
 
+@router.get("/{expense_id}/enrichment", response_model=EnrichmentStatusResponse)
+async def get_expense_enrichment(
+    expense_id: int,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Poll the background OCR/classification status of an expense"""
+    
+    expense = await db.get(Expense, expense_id)
+    if not expense:
+        raise HTTPException(status_code=404, detail="Expense not found")
+    
+    # Check permissions
+    if current_user.role == UserRole.EMPLOYEE and expense.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    job = await db.scalar(select(EnrichmentJob).where(
+        EnrichmentJob.expense_id == expense_id
+    ).order_by(EnrichmentJob.id.desc()).limit(1))
+    
+    return {
+        "expense_id": expense.id,
+        "status": expense.enrichment_status,
+        "attempts": job.attempts if job else 0,
+        "last_error": job.last_error if job else None,
+        "vendor": expense.vendor,
+        "ai_suggested_category": expense.ai_suggested_category,
+        "ocr_text": expense.ocr_text,
+        "ocr_amount": expense.ocr_amount,
+        "ocr_date": expense.ocr_date
+    }
+
 @router.get("/{expense_id}/risk")
-def get_expense_risk(
+async def get_expense_risk(
     expense_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get risk score for expense"""
     
-    expense = db.query(Expense).filter(Expense.id == expense_id).first()
+    expense = await db.get(Expense, expense_id)
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
     
-    risk_score = db.query(RiskScore).filter(RiskScore.expense_id == expense_id).first()
+    risk_score = await db.scalar(select(RiskScore).where(RiskScore.expense_id == expense_id))
     if not risk_score:
         raise HTTPException(status_code=404, detail="Risk score not found")
     
@@ -1,48 +1,89 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
-from sqlalchemy.orm import Session
-from typing import List
-from ..database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response
+from sqlalchemy.orm import Session, joinedload, selectinload
+from typing import List, Optional
+from ..database import get_db, get_read_db
 from ..models.user import User, UserRole
 from ..schemas.user import UserCreate, UserResponse
-from ..core.security import get_password_hash, decode_access_token
+from ..core.security import decode_access_token
+from ..core.pagination import paginate, set_pagination_headers, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from ..services.dashboard_cache import get_dashboard_cache
+from ..services.principal_cache import Principal, get_principal_cache
+from ..services.password_hasher import get_password_hasher
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
-def get_current_user(authorization: str = Header(None), db: Session = Depends(get_db)):
-    """Get current user from token"""
+def get_current_user(authorization: str = Header(None), db: Session = Depends(get_db)) -> Principal:
+    """Get current user from token, from the principal cache when possible"""
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     token = authorization.replace("Bearer ", "")
-    payload = decode_access_token(token)
     
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    def load():
+        payload = decode_access_token(token)
+        if not payload:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        
+        user = db.query(User).options(
+            joinedload(User.company), selectinload(User.subordinates)
+        ).filter(User.id == payload.get("user_id")).first()
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found")
+        
+        return Principal.from_user(user), payload["exp"]
     
-    user = db.query(User).filter(User.id == payload.get("user_id")).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    
-    return user
+    return get_principal_cache().get_or_load(token, load)
+
+# Oldest first, for the directory endpoint and its query plan check
+USER_LIST_ORDER = [User.created_at, User.id]
+
+def company_users(db: Session, company_id: int, role: Optional[UserRole] = None, manager_id: Optional[int] = None):
+    query = db.query(User).filter(User.company_id == company_id)
+    if role:
+        query = query.filter(User.role == role)
+    if manager_id:
+        query = query.filter(User.manager_id == manager_id)
+    return query
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+def get_current_user_info(current_user: Principal = Depends(get_current_user)):
     """Get current user information"""
     return current_user
 
 @router.get("/", response_model=List[UserResponse])
-def get_users(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get all users in company (Admin only)"""
+def get_users(
+    response: Response,
+    role: Optional[UserRole] = None,
+    manager_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    include_total: bool = False,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Get users in company, oldest first, one page at a time (Admin only)"""
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    users = db.query(User).filter(User.company_id == current_user.company_id).all()
+    query = company_users(db, current_user.company_id, role, manager_id)
+    total = query.count() if include_total else None
+    
+    users, next_cursor = paginate(
+        query,
+        USER_LIST_ORDER,
+        lambda u: (u.created_at, u.id),
+        cursor,
+        limit,
+        descending=False
+    )
+    set_pagination_headers(response, next_cursor, total)
+    
     return users
 
 @router.post("/", response_model=UserResponse)
 def create_user(
     user_data: UserCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Create new user (Admin only)"""
@@ -55,7 +96,7 @@ def create_user(
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = get_password_hasher().hash(user_data.password)
     user = User(
         email=user_data.email,
         hashed_password=hashed_password,
@@ -67,6 +108,9 @@ def create_user(
     db.add(user)
     db.commit()
     db.refresh(user)
+    get_dashboard_cache().invalidate_company(user.company_id)
+    # The manager's team just grew
+    get_principal_cache().invalidate_users(user.manager_id)
     
     return user
 
@@ -75,7 +119,7 @@ def update_user(
     user_id: int,
     role: UserRole,
     manager_id: int = None,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Update user role and manager (Admin only)"""
@@ -90,9 +134,12 @@ def update_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    old_manager_id = user.manager_id
     user.role = role
     user.manager_id = manager_id
     db.commit()
     db.refresh(user)
+    get_dashboard_cache().invalidate_company(user.company_id)
+    get_principal_cache().invalidate_users(user.id, old_manager_id, user.manager_id)
     
     return user
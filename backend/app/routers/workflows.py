@@ -0,0 +1,110 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+import json
+from ..database import get_async_db
+from ..models.user import User, UserRole
+from ..models.approval import ApprovalWorkflow
+from ..schemas.approval import WorkflowCreate, WorkflowResponse
+from ..routers.users import get_current_user
+from ..services.principal_cache import Principal
+from ..services.workflow_engine import get_workflow_engine
+
+router = APIRouter(prefix="/workflows", tags=["Workflows"])
+
+def require_admin(current_user: Principal):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+async def check_approvers(workflow_data: WorkflowCreate, company_id: int, db: AsyncSession):
+    """Every approver a workflow names must belong to the company"""
+    approver_ids = {entry for entry in workflow_data.steps if isinstance(entry, int)}
+    if workflow_data.specific_approver_id:
+        approver_ids.add(workflow_data.specific_approver_id)
+    if not approver_ids:
+        return
+    found = await db.scalar(select(func.count()).select_from(User).where(
+        User.id.in_(approver_ids),
+        User.company_id == company_id
+    ))
+    if found != len(approver_ids):
+        raise HTTPException(status_code=400, detail="Approvers must be users in your company")
+
+async def get_company_workflow(workflow_id: int, company_id: int, db: AsyncSession) -> ApprovalWorkflow:
+    workflow = await db.get(ApprovalWorkflow, workflow_id)
+    if not workflow or workflow.company_id != company_id:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return workflow
+
+@router.get("/", response_model=List[WorkflowResponse])
+async def get_workflows(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get the company's approval workflows by amount range (Admin only)"""
+    require_admin(current_user)
+    workflows = await db.scalars(select(ApprovalWorkflow).where(
+        ApprovalWorkflow.company_id == current_user.company_id
+    ).order_by(ApprovalWorkflow.min_amount, ApprovalWorkflow.id))
+    return workflows.all()
+
+@router.post("/", response_model=WorkflowResponse)
+async def create_workflow(
+    workflow_data: WorkflowCreate,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create an approval workflow (Admin only)"""
+    require_admin(current_user)
+    await check_approvers(workflow_data, current_user.company_id, db)
+
+    workflow = ApprovalWorkflow(
+        company_id=current_user.company_id,
+        **workflow_data.model_dump(exclude={"steps"}),
+        steps=json.dumps(workflow_data.steps)
+    )
+    db.add(workflow)
+    await db.commit()
+    await db.refresh(workflow)
+    get_workflow_engine().invalidate(current_user.company_id)
+
+    return workflow
+
+@router.put("/{workflow_id}", response_model=WorkflowResponse)
+async def update_workflow(
+    workflow_id: int,
+    workflow_data: WorkflowCreate,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Replace an approval workflow (Admin only). Expenses already submitted keep their approvers."""
+    require_admin(current_user)
+    workflow = await get_company_workflow(workflow_id, current_user.company_id, db)
+    await check_approvers(workflow_data, current_user.company_id, db)
+
+    for field, value in workflow_data.model_dump(exclude={"steps"}).items():
+        setattr(workflow, field, value)
+    workflow.steps = json.dumps(workflow_data.steps)
+    await db.commit()
+    await db.refresh(workflow)
+    get_workflow_engine().invalidate(current_user.company_id)
+
+    return workflow
+
+@router.delete("/{workflow_id}", response_model=WorkflowResponse)
+async def deactivate_workflow(
+    workflow_id: int,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Stop routing new expenses through a workflow (Admin only). It is kept for the expenses it already routed."""
+    require_admin(current_user)
+    workflow = await get_company_workflow(workflow_id, current_user.company_id, db)
+
+    workflow.is_active = False
+    await db.commit()
+    await db.refresh(workflow)
+    get_workflow_engine().invalidate(current_user.company_id)
+
+    return workflow
@@ -1,11 +1,19 @@
 from .user import UserCreate, UserResponse, UserLogin, Token
 from .company import CompanyCreate, CompanyResponse
-from .expense import ExpenseCreate, ExpenseResponse, ExpenseUpdate
-from .approval import ApprovalCreate, ApprovalResponse, ApprovalUpdate
+from .expense import (
+    ExpenseCreate, ExpenseResponse, ExpenseUpdate, EnrichmentStatusResponse,
+    ExpenseImportRow, ImportRowError, ExpenseImportResult
+)
+from .approval import (
+    ApprovalCreate, ApprovalResponse, ApprovalUpdate, PendingApprovalResponse, RiskSummary,
+    WorkflowCreate, WorkflowResponse
+)
 
 __all__ = [
     "UserCreate", "UserResponse", "UserLogin", "Token",
     "CompanyCreate", "CompanyResponse",
-    "ExpenseCreate", "ExpenseResponse", "ExpenseUpdate",
-    "ApprovalCreate", "ApprovalResponse", "ApprovalUpdate"
+    "ExpenseCreate", "ExpenseResponse", "ExpenseUpdate", "EnrichmentStatusResponse",
+    "ExpenseImportRow", "ImportRowError", "ExpenseImportResult",
+    "ApprovalCreate", "ApprovalResponse", "ApprovalUpdate", "PendingApprovalResponse", "RiskSummary",
+    "WorkflowCreate", "WorkflowResponse"
 ]
@@ -1,7 +1,11 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import List, Optional, Union
 from datetime import datetime
-from ..models.approval import ApprovalStatus
+import json
+from ..models.approval import ApprovalStatus, ApprovalType
+from ..models.risk_score import RiskLevel
+from .expense import ExpenseResponse
+from .user import UserResponse
 
 class ApprovalCreate(BaseModel):
     expense_id: int
@@ -12,6 +16,13 @@ class ApprovalUpdate(BaseModel):
     status: ApprovalStatus
     comments: Optional[str] = None
 
+    @field_validator("status")
+    @classmethod
+    def check_status(cls, value):
+        if value not in (ApprovalStatus.APPROVED, ApprovalStatus.REJECTED):
+            raise ValueError("status must be approved or rejected")
+        return value
+
 class ApprovalResponse(BaseModel):
     id: int
     expense_id: int
@@ -24,3 +35,69 @@ class ApprovalResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+class RiskSummary(BaseModel):
+    score: float
+    risk_level: RiskLevel
+
+    class Config:
+        from_attributes = True
+
+class PendingApprovalResponse(BaseModel):
+    approval: ApprovalResponse
+    expense: ExpenseResponse
+    submitter: UserResponse
+    risk: Optional[RiskSummary] = None
+
+class WorkflowCreate(BaseModel):
+    name: str
+    approval_type: ApprovalType
+    min_amount: float = Field(0.0, ge=0)
+    max_amount: Optional[float] = None
+    percentage_required: Optional[float] = Field(None, gt=0, le=100)
+    specific_approver_id: Optional[int] = None
+    # Approver user ids, or "manager" for the submitter's manager
+    steps: List[Union[int, str]] = []
+    is_active: bool = True
+
+    @field_validator("steps")
+    @classmethod
+    def check_steps(cls, value):
+        for entry in value:
+            if isinstance(entry, str) and entry != "manager":
+                raise ValueError('steps must be user ids or "manager"')
+        return value
+
+    @model_validator(mode="after")
+    def check_rules(self):
+        if self.max_amount is not None and self.max_amount <= self.min_amount:
+            raise ValueError("max_amount must be greater than min_amount")
+        if self.approval_type in (ApprovalType.SPECIFIC_APPROVER, ApprovalType.HYBRID) and not self.specific_approver_id:
+            raise ValueError(f"{self.approval_type.value} workflows need specific_approver_id")
+        if self.approval_type in (ApprovalType.SEQUENTIAL, ApprovalType.PERCENTAGE) and not self.steps:
+            raise ValueError(f"{self.approval_type.value} workflows need at least one step")
+        return self
+
+class WorkflowResponse(BaseModel):
+    id: int
+    company_id: int
+    name: str
+    approval_type: ApprovalType
+    min_amount: float
+    max_amount: Optional[float]
+    percentage_required: Optional[float]
+    specific_approver_id: Optional[int]
+    steps: List[Union[int, str]]
+    is_active: bool
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+    @field_validator("steps", mode="before")
+    @classmethod
+    def parse_steps(cls, value):
+        # Stored as a JSON string
+        if isinstance(value, str):
+            return json.loads(value)
+        return value or []
@@ -1,7 +1,8 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
 from datetime import datetime
 from ..models.expense import ExpenseStatus, ExpenseCategory
+from ..models.enrichment_job import EnrichmentStatus
 
 class ExpenseCreate(BaseModel):
     amount: float
@@ -29,11 +30,65 @@ class ExpenseResponse(BaseModel):
     description: str
     expense_date: datetime
     receipt_url: Optional[str]
+    receipt_thumbnail_url: Optional[str] = None
     vendor: Optional[str]
     status: ExpenseStatus
     ai_suggested_category: Optional[str]
+    enrichment_status: Optional[EnrichmentStatus] = None
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
+
+class EnrichmentStatusResponse(BaseModel):
+    expense_id: int
+    status: Optional[EnrichmentStatus]
+    attempts: int
+    last_error: Optional[str]
+    vendor: Optional[str]
+    ai_suggested_category: Optional[str]
+    ocr_text: Optional[str]
+    ocr_amount: Optional[float]
+    ocr_date: Optional[str]
+
+class ExpenseImportRow(BaseModel):
+    """One row of a bulk import; column names match the export"""
+    amount: float = Field(gt=0)
+    currency: Optional[str] = None
+    category: Optional[ExpenseCategory] = None
+    description: str = Field(min_length=1)
+    expense_date: datetime
+    vendor: Optional[str] = None
+    submitter_email: Optional[str] = None
+
+    @field_validator("*", mode="before")
+    @classmethod
+    def blank_to_none(cls, value):
+        # CSV has no null; an empty cell means "not given"
+        if isinstance(value, str) and not value.strip():
+            return None
+        return value
+
+    @field_validator("currency")
+    @classmethod
+    def normalize_currency(cls, value):
+        return value.strip().upper() if value else value
+
+    @field_validator("expense_date", mode="before")
+    @classmethod
+    def parse_expense_date(cls, value):
+        if isinstance(value, str):
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        return value
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+class ExpenseImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ImportRowError]
+    errors_truncated: bool
+    seconds: float
@@ -0,0 +1,238 @@
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from ..database import SessionLocal
+from ..models.expense import Expense, ExpenseCategory
+
+load_dotenv()
+
+CLASSIFIER_MIN_CONFIDENCE = float(os.getenv("CLASSIFIER_MIN_CONFIDENCE", 0.5))
+CLASSIFIER_TRAINING_LIMIT = int(os.getenv("CLASSIFIER_TRAINING_LIMIT", 100000))
+CLASSIFIER_HASH_BITS = int(os.getenv("CLASSIFIER_HASH_BITS", 18))
+# A company's model is retrained in the background once it is this old
+CLASSIFIER_RETRAIN_SECONDS = float(os.getenv("CLASSIFIER_RETRAIN_SECONDS", 3600))
+CLASSIFIER_MAX_COMPANIES = int(os.getenv("CLASSIFIER_MAX_COMPANIES", 1000))
+
+# Built-in examples so the classifier is useful before a company has any history
+SEED_EXAMPLES = {
+    ExpenseCategory.TRAVEL: [
+        "flight to new york", "airline ticket", "airfare conference trip", "train ticket",
+        "baggage fee", "visa fee for business trip", "travel insurance", "airport parking",
+    ],
+    ExpenseCategory.MEALS: [
+        "team lunch", "client dinner", "breakfast meeting", "coffee with candidate",
+        "restaurant bill", "lunch at cafe", "food delivery for late work", "snacks for office",
+    ],
+    ExpenseCategory.ACCOMMODATION: [
+        "hotel stay", "hotel room two nights", "airbnb for conference", "motel",
+        "lodging during client visit", "hotel booking", "accommodation for offsite", "resort stay",
+    ],
+    ExpenseCategory.OFFICE_SUPPLIES: [
+        "printer paper", "stationery", "pens and notebooks", "office chair",
+        "toner cartridge", "desk supplies", "whiteboard markers", "monitor stand",
+    ],
+    ExpenseCategory.ENTERTAINMENT: [
+        "client entertainment", "concert tickets with client", "team outing", "bowling team event",
+        "movie night", "party for product launch", "sports event tickets", "karaoke team building",
+    ],
+    ExpenseCategory.TRANSPORTATION: [
+        "uber to airport", "taxi fare", "lyft ride", "cab to client office",
+        "fuel for rental car", "car rental", "metro card", "parking fee",
+    ],
+    ExpenseCategory.UTILITIES: [
+        "internet bill", "electricity bill", "phone bill", "mobile data plan",
+        "water bill", "broadband for home office", "gas bill", "cell phone service",
+    ],
+    ExpenseCategory.SOFTWARE: [
+        "software license", "saas subscription", "github subscription", "cloud hosting aws",
+        "zoom subscription", "adobe creative cloud", "domain renewal", "jira license",
+    ],
+    ExpenseCategory.TRAINING: [
+        "online course", "certification exam fee", "workshop registration", "conference ticket",
+        "udemy course", "technical books", "training seminar", "coursera subscription",
+    ],
+    ExpenseCategory.OTHER: [
+        "miscellaneous", "gift for colleague", "charity donation", "bank fee",
+        "postage", "courier charges", "membership fee", "other expense",
+    ],
+}
+
+
+def _features(text: str, buckets: int) -> Counter:
+    """Hashed word unigrams, bigrams and character trigrams"""
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    grams = list(words)
+    grams += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"<{word}>"
+        grams += [f"#{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    return Counter(zlib.crc32(g.encode()) % buckets for g in grams)
+
+
+class CategoryClassifier:
+    """Multinomial naive Bayes over hashed n-grams, trained on expense history.
+
+    Naive Bayes is linear in log space, so a prediction is one sparse dot
+    product per description; no network or model download is involved.
+    """
+
+    def __init__(self, hash_bits: int = CLASSIFIER_HASH_BITS, alpha: float = 0.1):
+        self.buckets = 1 << hash_bits
+        self.alpha = alpha
+        self.labels: List[str] = []
+        self._bias: List[float] = []
+        self._default: List[float] = []
+        self._weights: Dict[int, List[float]] = {}
+        self._lock = threading.Lock()
+        self.fit(self._seed_examples())
+
+    def fit(self, examples: Iterable[Tuple[str, str]]):
+        """Train from (description, category) pairs"""
+        feature_counts: Dict[str, Counter] = defaultdict(Counter)
+        doc_counts: Counter = Counter()
+        for text, label in examples:
+            if not text:
+                continue
+            feature_counts[label].update(_features(text, self.buckets))
+            doc_counts[label] += 1
+
+        labels = sorted(doc_counts)
+        total_docs = sum(doc_counts.values())
+        vocabulary = len(set().union(*feature_counts.values())) or 1
+
+        bias, default = [], []
+        for label in labels:
+            denominator = sum(feature_counts[label].values()) + self.alpha * vocabulary
+            bias.append(math.log(doc_counts[label] / total_docs))
+            default.append(math.log(self.alpha / denominator))
+
+        # Store each seen feature's weight relative to the per-class default
+        weights: Dict[int, List[float]] = {}
+        for i, label in enumerate(labels):
+            denominator = sum(feature_counts[label].values()) + self.alpha * vocabulary
+            for feature, count in feature_counts[label].items():
+                row = weights.setdefault(feature, [0.0] * len(labels))
+                row[i] = math.log((count + self.alpha) / denominator) - default[i]
+
+        with self._lock:
+            self.labels, self._bias, self._default, self._weights = labels, bias, default, weights
+
+    def train_from_db(self, db: Session, company_id: int, limit: int = CLASSIFIER_TRAINING_LIMIT):
+        """Retrain on one company's most recent labelled expenses plus the seed examples"""
+        rows = db.query(Expense.description, Expense.category).filter(
+            Expense.company_id == company_id
+        ).order_by(Expense.id.desc()).limit(limit).all()
+        examples = self._seed_examples()
+        examples += [(description, category.value) for description, category in rows]
+        self.fit(examples)
+
+    def predict(self, description: str) -> Tuple[str, float]:
+        """Return (category, confidence) for one description"""
+        return self.predict_batch([description])[0]
+
+    def predict_batch(self, descriptions: List[str]) -> List[Tuple[str, float]]:
+        """Classify many descriptions against one snapshot of the model.
+
+        Each description is still scored by its own pure-Python loop over its
+        n-grams; the batch only saves taking the lock and the call overhead.
+        """
+        with self._lock:
+            labels, bias, default, weights = self.labels, self._bias, self._default, self._weights
+
+        results = []
+        for description in descriptions:
+            features = _features(description or "", self.buckets)
+            n_tokens = sum(features.values())
+            scores = [b + n_tokens * d for b, d in zip(bias, default)]
+            for feature, count in features.items():
+                row = weights.get(feature)
+                if row:
+                    for i, w in enumerate(row):
+                        scores[i] += count * w
+
+            best = max(range(len(scores)), key=scores.__getitem__)
+            # Softmax probability of the winning class; naive Bayes is overconfident
+            # on longer texts, so temper the scores by sqrt(token count)
+            temperature = math.sqrt(n_tokens) if n_tokens else 1.0
+            total = sum(math.exp((s - scores[best]) / temperature) for s in scores)
+            results.append((labels[best], 1.0 / total))
+        return results
+
+    @staticmethod
+    def _seed_examples() -> List[Tuple[str, str]]:
+        return [
+            (text, category.value)
+            for category, texts in SEED_EXAMPLES.items()
+            for text in texts
+        ]
+
+
+class CompanyClassifiers:
+    """One CategoryClassifier per company, trained only on that company's expenses.
+
+    A company's model is trained in a background thread the first time it is
+    asked for, and again once it is older than ``retrain_interval``. Until a
+    retrain finishes, predictions use the company's previous model, or the
+    seed-only model if it has none yet.
+    """
+
+    def __init__(
+        self,
+        retrain_interval: float = CLASSIFIER_RETRAIN_SECONDS,
+        max_companies: int = CLASSIFIER_MAX_COMPANIES,
+    ):
+        self.retrain_interval = retrain_interval
+        self.max_companies = max_companies
+        self.seed = CategoryClassifier()
+        self._models: "OrderedDict[int, Tuple[float, CategoryClassifier]]" = OrderedDict()
+        self._training = set()
+        self._lock = threading.Lock()
+
+    def for_company(self, company_id: Optional[int]) -> CategoryClassifier:
+        if company_id is None:
+            return self.seed
+        with self._lock:
+            entry = self._models.get(company_id)
+            if entry is not None:
+                self._models.move_to_end(company_id)
+            stale = entry is None or time.time() - entry[0] > self.retrain_interval
+            start = stale and company_id not in self._training
+            if start:
+                self._training.add(company_id)
+        if start:
+            threading.Thread(target=self._train, args=(company_id,), daemon=True).start()
+        return entry[1] if entry is not None else self.seed
+
+    def _train(self, company_id: int):
+        db = SessionLocal()
+        try:
+            model = CategoryClassifier()
+            model.train_from_db(db, company_id)
+            with self._lock:
+                self._models[company_id] = (time.time(), model)
+                self._models.move_to_end(company_id)
+                while len(self._models) > self.max_companies:
+                    self._models.popitem(last=False)
+        except Exception as e:
+            print(f"Error training category classifier for company {company_id}: {e}")
+        finally:
+            db.close()
+            with self._lock:
+                self._training.discard(company_id)
+
+
+_company_classifiers: Optional[CompanyClassifiers] = None
+
+
+def get_company_classifiers() -> CompanyClassifiers:
+    global _company_classifiers
+    if _company_classifiers is None:
+        _company_classifiers = CompanyClassifiers()
+    return _company_classifiers
@@ -0,0 +1,172 @@
+import json
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Optional
+import requests
+from dotenv import load_dotenv
+from .metrics import track_external
+
+load_dotenv()
+
+COUNTRIES_URL = os.getenv(
+    "COUNTRIES_URL",
+    "https://restcountries.com/v3.1/all?fields=name,currencies,cca2,cca3,altSpellings"
+)
+COUNTRY_SNAPSHOT_PATH = os.getenv(
+    "COUNTRY_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(__file__), "data", "countries.json")
+)
+COUNTRY_INDEX_REFRESH_ON_STARTUP = os.getenv("COUNTRY_INDEX_REFRESH_ON_STARTUP", "true").lower() == "true"
+DEFAULT_CURRENCY = "USD"
+
+# Common names people type that are neither the REST Countries name nor an altSpelling
+ALIASES = {
+    "america": "US",
+    "united states of america": "US",
+    "england": "GB",
+    "scotland": "GB",
+    "wales": "GB",
+    "northern ireland": "GB",
+    "britain": "GB",
+    "holland": "NL",
+    "czech republic": "CZ",
+    "ivory coast": "CI",
+    "burma": "MM",
+    "turkiye": "TR",
+    "korea": "KR",
+    "north korea": "KP",
+    "uae": "AE",
+    "emirates": "AE",
+}
+
+
+def normalize_country_name(name: str) -> str:
+    """Case-, accent- and punctuation-insensitive lookup key"""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c)).casefold()
+    name = re.sub(r"[^0-9a-z]+", " ", name).strip()
+    if name.startswith("the "):
+        name = name[4:]
+    return name.replace(" ", "")
+
+
+class CountryIndex:
+    """In-memory country -> currency index.
+
+    Built once from the bundled REST Countries snapshot so lookups never touch
+    the network; ``refresh_in_background`` swaps in a fresh copy of the
+    dataset without blocking callers.
+    """
+
+    def __init__(self, snapshot_path: str = COUNTRY_SNAPSHOT_PATH, source_url: str = COUNTRIES_URL):
+        self.snapshot_path = snapshot_path
+        self.source_url = source_url
+        self._by_name: Dict[str, Dict] = {}
+        self._by_currency: Dict[str, Dict] = {}
+        self._refresh_lock = threading.Lock()
+        self.load_snapshot()
+
+    def load_snapshot(self):
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                self.load(json.load(f))
+        except Exception as e:
+            print(f"Error loading country snapshot: {e}")
+
+    def load(self, countries: List[Dict]):
+        """Rebuild the index from a REST Countries style list"""
+        by_name: Dict[str, Dict] = {}
+        by_currency: Dict[str, Dict] = {}
+        by_code: Dict[str, Dict] = {}
+
+        for country in countries:
+            currencies = country.get("currencies") or {}
+            record = {
+                "name": country.get("name", {}).get("common"),
+                "official_name": country.get("name", {}).get("official"),
+                "cca2": country.get("cca2"),
+                "cca3": country.get("cca3"),
+                "currency": next(iter(currencies), None),
+                "currencies": list(currencies.keys()),
+            }
+            if record["cca2"]:
+                by_code[record["cca2"]] = record
+
+            keys = [record["name"], record["official_name"], record["cca2"], record["cca3"]]
+            keys += country.get("altSpellings") or []
+            for key in keys:
+                if key:
+                    # Earlier entries win so a short alias can't shadow a real name
+                    by_name.setdefault(normalize_country_name(key), record)
+
+            for code, info in currencies.items():
+                entry = by_currency.setdefault(code, {
+                    "code": code,
+                    "name": (info or {}).get("name"),
+                    "symbol": (info or {}).get("symbol"),
+                    "countries": [],
+                })
+                entry["countries"].append(record["cca2"] or record["name"])
+
+        for alias, code in ALIASES.items():
+            if code in by_code:
+                by_name.setdefault(normalize_country_name(alias), by_code[code])
+
+        # Swap both maps in at once so readers never see a half-built index
+        self._by_name, self._by_currency = by_name, by_currency
+
+    def lookup(self, country_name: str) -> Optional[Dict]:
+        """Find a country by common/official name, ISO code or alias"""
+        if not country_name:
+            return None
+        return self._by_name.get(normalize_country_name(country_name))
+
+    def currency_for(self, country_name: str, default: Optional[str] = DEFAULT_CURRENCY) -> Optional[str]:
+        country = self.lookup(country_name)
+        if country and country["currency"]:
+            return country["currency"]
+        return default
+
+    def currency_info(self, currency_code: str) -> Optional[Dict]:
+        """Name, symbol and using countries for an ISO 4217 code"""
+        return self._by_currency.get((currency_code or "").upper())
+
+    def is_known_currency(self, currency_code: str) -> bool:
+        return self.currency_info(currency_code) is not None
+
+    def refresh(self) -> bool:
+        """Reload the index from the REST Countries API"""
+        try:
+            with track_external("countries"):
+                response = requests.get(self.source_url, timeout=10)
+            if response.status_code != 200:
+                return False
+            countries = response.json()
+        except Exception as e:
+            print(f"Error refreshing country index: {e}")
+            return False
+        if not countries:
+            return False
+        self.load(countries)
+        return True
+
+    def refresh_in_background(self):
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                self._refresh_lock.release()
+
+        threading.Thread(target=run, daemon=True).start()
+
+
+_country_index = CountryIndex()
+
+
+def get_country_index() -> CountryIndex:
+    return _country_index
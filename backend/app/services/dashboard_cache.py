@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DASHBOARD_CACHE_MAX_STALENESS = float(os.getenv("DASHBOARD_CACHE_MAX_STALENESS", 60))
+DASHBOARD_CACHE_MAX_ENTRIES = int(os.getenv("DASHBOARD_CACHE_MAX_ENTRIES", 1000))
+
+
+class DashboardCache:
+    """Computed analytics payloads, invalidated by per-scope version counters.
+
+    A scope is ``("company", id)`` or ``("user", id)``. Writers bump the
+    version of every scope they touch after committing, which makes cached
+    payloads for that scope unreachable. Versions are per process, so
+    ``max_staleness`` bounds how long another worker's writes can go unseen.
+    """
+
+    def __init__(
+        self,
+        max_staleness: float = DASHBOARD_CACHE_MAX_STALENESS,
+        max_entries: int = DASHBOARD_CACHE_MAX_ENTRIES,
+    ):
+        self.max_staleness = max_staleness
+        self.max_entries = max_entries
+        self._versions: Dict[Tuple, int] = {}
+        self._entries: "OrderedDict[Hashable, Tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.recompute_seconds = 0.0
+        self.recompute_seconds_saved = 0.0
+
+    def get_or_compute(self, scope: Tuple, compute: Callable[[], Any], key: Hashable = None) -> Any:
+        hit, payload, version = self._lookup(scope, key)
+        if hit:
+            return payload
+
+        started = time.perf_counter()
+        payload = compute()
+        self._store(scope, key, version, payload, time.perf_counter() - started)
+        return payload
+
+    async def get_or_compute_async(
+        self, scope: Tuple, compute: Callable[[], Awaitable[Any]], key: Hashable = None
+    ) -> Any:
+        hit, payload, version = self._lookup(scope, key)
+        if hit:
+            return payload
+
+        started = time.perf_counter()
+        payload = await compute()
+        self._store(scope, key, version, payload, time.perf_counter() - started)
+        return payload
+
+    def _lookup(self, scope: Tuple, key: Hashable) -> Tuple[bool, Any, int]:
+        """(hit, payload, scope version the caller must compute against)"""
+        cache_key = (scope, key)
+        with self._lock:
+            version = self._versions.get(scope, 0)
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                entry_version, computed_at, compute_seconds, payload = entry
+                if entry_version == version and time.time() - computed_at <= self.max_staleness:
+                    self._entries.move_to_end(cache_key)
+                    self.hits += 1
+                    self.recompute_seconds_saved += compute_seconds
+                    return True, payload, version
+            self.misses += 1
+            return False, None, version
+
+    def _store(self, scope: Tuple, key: Hashable, version: int, payload: Any, elapsed: float):
+        cache_key = (scope, key)
+        with self._lock:
+            self.recompute_seconds += elapsed
+            # Only store if nothing was written while we computed
+            if self._versions.get(scope, 0) == version:
+                self._entries[cache_key] = (version, time.time(), elapsed, payload)
+                self._entries.move_to_end(cache_key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+    def bump(self, *scopes: Tuple):
+        """Invalidate cached payloads for the given scopes"""
+        with self._lock:
+            for scope in scopes:
+                self._versions[scope] = self._versions.get(scope, 0) + 1
+
+    def invalidate_expense_writes(self, company_id: int, user_id: int):
+        self.bump(("company", company_id), ("user", user_id))
+
+    def invalidate_company(self, company_id: int):
+        self.bump(("company", company_id))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "max_staleness_seconds": self.max_staleness,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "recompute_seconds": round(self.recompute_seconds, 6),
+                "recompute_seconds_saved": round(self.recompute_seconds_saved, 6),
+            }
+
+
+_dashboard_cache = DashboardCache()
+
+
+def get_dashboard_cache() -> DashboardCache:
+    return _dashboard_cache
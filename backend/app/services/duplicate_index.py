@@ -0,0 +1,146 @@
+import math
+import os
+import re
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from ..models.expense import Expense
+from ..models.expense_fingerprint import ExpenseFingerprint
+
+load_dotenv()
+
+# Relative difference under which two amounts count as the same (rounding,
+# FX conversion noise); amounts are compared in company currency
+DUPLICATE_AMOUNT_TOLERANCE = float(os.getenv("DUPLICATE_AMOUNT_TOLERANCE", 0.005))
+DUPLICATE_BACKFILL_BATCH_SIZE = int(os.getenv("DUPLICATE_BACKFILL_BATCH_SIZE", 5000))
+
+# Buckets twice as wide as the tolerance, so any two matching amounts are at
+# most one bucket apart
+_BUCKET_WIDTH = math.log(1 + 2 * DUPLICATE_AMOUNT_TOLERANCE)
+
+_VENDOR_SUFFIXES = {
+    "the", "inc", "llc", "llp", "ltd", "limited", "co", "corp", "corporation",
+    "company", "gmbh", "plc", "pvt", "pte", "sa", "ag", "bv",
+}
+
+
+def normalize_vendor(vendor: Optional[str]) -> Optional[str]:
+    """'The Coffee Co.' and 'coffee' share a key"""
+    words = re.findall(r"[a-z0-9]+", (vendor or "").lower())
+    return " ".join(w for w in words if w not in _VENDOR_SUFFIXES) or None
+
+
+def amount_bucket(amount: float) -> int:
+    return int(math.floor(math.log(max(abs(amount), 1.0)) / _BUCKET_WIDTH))
+
+
+def day_bucket(expense_date: datetime) -> int:
+    return expense_date.toordinal()
+
+
+class DuplicateIndex:
+    """Bucketed near-duplicate index over ``expense_fingerprints``.
+
+    Two expenses match when their amounts (in company currency) are within
+    DUPLICATE_AMOUNT_TOLERANCE, their dates are at most one day apart, and
+    they come from the same user or carry the same normalized vendor (one
+    receipt claimed by several users).
+    """
+
+    @staticmethod
+    def fingerprint(expense: Expense) -> Dict:
+        amount = expense.converted_amount if expense.converted_amount is not None else expense.amount
+        return {
+            "expense_id": expense.id,
+            "company_id": expense.company_id,
+            "user_id": expense.user_id,
+            "amount": amount,
+            "amount_bucket": amount_bucket(amount),
+            "day_bucket": day_bucket(expense.expense_date),
+            "vendor_key": normalize_vendor(expense.vendor)
+        }
+
+    @staticmethod
+    def record(expense: Expense, db: Session):
+        """Add or refresh an expense's fingerprint (after insert or a vendor fill)"""
+        values = DuplicateIndex.fingerprint(expense)
+        row = db.query(ExpenseFingerprint).filter(
+            ExpenseFingerprint.expense_id == expense.id
+        ).first()
+        if row is None:
+            db.add(ExpenseFingerprint(**values))
+        else:
+            for column, value in values.items():
+                setattr(row, column, value)
+
+    @staticmethod
+    def find_matches(expense: Expense, db: Session) -> Tuple[int, int]:
+        """Return (same-user near duplicates, other-user matches on the same vendor)"""
+        probe = DuplicateIndex.fingerprint(expense)
+        candidates = db.execute(DuplicateIndex._candidates(probe)).all()
+        return DuplicateIndex._count_matches(probe, candidates)
+
+    @staticmethod
+    async def find_matches_async(expense: Expense, db: AsyncSession) -> Tuple[int, int]:
+        probe = DuplicateIndex.fingerprint(expense)
+        candidates = (await db.execute(DuplicateIndex._candidates(probe))).all()
+        return DuplicateIndex._count_matches(probe, candidates)
+
+    @staticmethod
+    def _candidates(probe: Dict):
+        return select(
+            ExpenseFingerprint.user_id, ExpenseFingerprint.amount, ExpenseFingerprint.vendor_key
+        ).where(
+            ExpenseFingerprint.company_id == probe["company_id"],
+            ExpenseFingerprint.amount_bucket.between(probe["amount_bucket"] - 1, probe["amount_bucket"] + 1),
+            ExpenseFingerprint.day_bucket.between(probe["day_bucket"] - 1, probe["day_bucket"] + 1),
+            ExpenseFingerprint.expense_id != probe["expense_id"]
+        )
+
+    @staticmethod
+    def _count_matches(probe: Dict, candidates) -> Tuple[int, int]:
+        duplicates = shared = 0
+        for user_id, amount, vendor_key in candidates:
+            if abs(amount - probe["amount"]) > DUPLICATE_AMOUNT_TOLERANCE * (amount + probe["amount"]) / 2:
+                continue
+            if user_id == probe["user_id"]:
+                duplicates += 1
+            elif probe["vendor_key"] and vendor_key == probe["vendor_key"]:
+                shared += 1
+        return duplicates, shared
+
+    @staticmethod
+    def match_condition(a, b):
+        """SQL join condition for fingerprint ``b`` matching fingerprint ``a``"""
+        return and_(
+            b.company_id == a.company_id,
+            b.amount_bucket.between(a.amount_bucket - 1, a.amount_bucket + 1),
+            b.day_bucket.between(a.day_bucket - 1, a.day_bucket + 1),
+            b.expense_id != a.expense_id,
+            func.abs(b.amount - a.amount) <= DUPLICATE_AMOUNT_TOLERANCE * (a.amount + b.amount) / 2,
+            or_(b.user_id == a.user_id, b.vendor_key == a.vendor_key)
+        )
+
+    @staticmethod
+    def backfill(db: Session, company_id: Optional[int] = None, batch_size: int = DUPLICATE_BACKFILL_BATCH_SIZE) -> int:
+        """Fingerprint expenses that predate the index. Returns the number added."""
+        added = 0
+        while True:
+            # Only the fingerprinted columns, so this also runs from migrations that predate later ones
+            query = db.query(
+                Expense.id, Expense.company_id, Expense.user_id, Expense.amount,
+                Expense.converted_amount, Expense.expense_date, Expense.vendor
+            ).outerjoin(
+                ExpenseFingerprint, ExpenseFingerprint.expense_id == Expense.id
+            ).filter(ExpenseFingerprint.id.is_(None))
+            if company_id is not None:
+                query = query.filter(Expense.company_id == company_id)
+            expenses = query.order_by(Expense.id).limit(batch_size).all()
+            if not expenses:
+                return added
+            # Core insert: the ORM bulk path splits the batch wherever vendor_key is NULL
+            db.execute(ExpenseFingerprint.__table__.insert(), [DuplicateIndex.fingerprint(e) for e in expenses])
+            added += len(expenses)
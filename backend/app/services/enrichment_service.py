@@ -0,0 +1,250 @@
+import asyncio
+import io
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from ..database import SessionLocal
+from ..models.expense import Expense
+from ..models.enrichment_job import EnrichmentJob, EnrichmentStatus
+from .external_api import ExternalAPIService
+from .risk_service import RiskService
+from .rollup_service import RollupService
+from .duplicate_index import DuplicateIndex
+from .dashboard_cache import get_dashboard_cache
+from .receipt_store import get_receipt_store
+from .receipt_preprocessor import get_receipt_preprocessor
+
+load_dotenv()
+
+ENRICHMENT_IN_PROCESS = os.getenv("ENRICHMENT_IN_PROCESS", "true").lower() == "true"
+ENRICHMENT_WORKERS = int(os.getenv("ENRICHMENT_WORKERS", 4))
+ENRICHMENT_MAX_ATTEMPTS = int(os.getenv("ENRICHMENT_MAX_ATTEMPTS", 3))
+ENRICHMENT_POLL_INTERVAL = float(os.getenv("ENRICHMENT_POLL_INTERVAL", 5))
+ENRICHMENT_JOB_TIMEOUT = int(os.getenv("ENRICHMENT_JOB_TIMEOUT", 300))
+
+
+class EnrichmentQueue:
+    """DB-backed queue of expense enrichment jobs drained by a bounded worker pool.
+
+    Jobs are rows in ``enrichment_jobs`` written in the same transaction as the
+    expense, so nothing is lost on restart: a job left ``processing`` by a dead
+    worker is claimed again once its lease (``ENRICHMENT_JOB_TIMEOUT``) expires.
+    """
+
+    def __init__(
+        self,
+        workers: int = ENRICHMENT_WORKERS,
+        max_attempts: int = ENRICHMENT_MAX_ATTEMPTS,
+        poll_interval: float = ENRICHMENT_POLL_INTERVAL,
+        job_timeout: int = ENRICHMENT_JOB_TIMEOUT,
+    ):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.job_timeout = job_timeout
+        self._tasks: List[asyncio.Task] = []
+        self._signal: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @staticmethod
+    def enqueue(expense: Expense, db: Session) -> EnrichmentJob:
+        """Add an enrichment job for an expense to the caller's transaction"""
+        expense.enrichment_status = EnrichmentStatus.PENDING
+        job = EnrichmentJob(expense_id=expense.id, status=EnrichmentStatus.PENDING)
+        db.add(job)
+        return job
+
+    def notify(self):
+        """Wake an idle worker after a job has been committed"""
+        if self._loop is not None and self._signal is not None:
+            self._loop.call_soon_threadsafe(self._signal.release)
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._signal = asyncio.Semaphore(0)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+
+    def queue_depth(self) -> int:
+        db = SessionLocal()
+        try:
+            return db.query(EnrichmentJob).filter(
+                EnrichmentJob.status == EnrichmentStatus.PENDING
+            ).count()
+        finally:
+            db.close()
+
+    async def _worker(self):
+        while True:
+            try:
+                job_id = await asyncio.to_thread(self._claim_next)
+            except Exception as e:
+                print(f"Error claiming enrichment job: {e}")
+                job_id = None
+
+            if job_id is None:
+                try:
+                    await asyncio.wait_for(self._signal.acquire(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self.process(job_id)
+
+    async def process(self, job_id: int):
+        """Run OCR and classification for a claimed job and store the results"""
+        try:
+            inputs = await asyncio.to_thread(self._load_inputs, job_id)
+            receipt_data = None
+            thumbnail_url = None
+            if inputs["receipt_url"]:
+                store = get_receipt_store()
+                original = await asyncio.to_thread(store.read, inputs["receipt_url"])
+                # OCR gets an upright, grayscale, downscaled copy instead of the raw photo
+                prepared = await get_receipt_preprocessor().prepare(original)
+                receipt_data = prepared.image
+                if prepared.thumbnail:
+                    thumbnail = await asyncio.to_thread(store.save, io.BytesIO(prepared.thumbnail))
+                    thumbnail_url = thumbnail.url
+
+            ocr_data, ai_category = await asyncio.gather(
+                ExternalAPIService.extract_text_from_receipt(receipt_data)
+                if receipt_data is not None else asyncio.sleep(0, result=None),
+                ExternalAPIService.classify_expense_category(inputs["description"], inputs["company_id"])
+            )
+            if receipt_data is not None and ocr_data is None:
+                # Usually transient (DNS, timeouts, a model still loading); the job is retried
+                raise RuntimeError("Receipt OCR failed")
+            await asyncio.to_thread(self._apply, job_id, ocr_data, ai_category, thumbnail_url)
+        except Exception as e:
+            print(f"Error processing enrichment job {job_id}: {e}")
+            try:
+                await asyncio.to_thread(self._record_failure, job_id, str(e))
+            except Exception as e:
+                # The job stays claimed; it is picked up again once its lease expires
+                print(f"Error recording enrichment job {job_id} failure: {e}")
+
+    def _claim_next(self) -> Optional[int]:
+        db = SessionLocal()
+        try:
+            lease_expired = datetime.utcnow() - timedelta(seconds=self.job_timeout)
+            claimable = or_(
+                EnrichmentJob.status == EnrichmentStatus.PENDING,
+                and_(
+                    EnrichmentJob.status == EnrichmentStatus.PROCESSING,
+                    EnrichmentJob.started_at < lease_expired
+                )
+            )
+            # Another worker may claim the same row first; try the next few candidates
+            for _ in range(5):
+                candidate = db.query(EnrichmentJob.id).filter(claimable).order_by(EnrichmentJob.id).first()
+                if not candidate:
+                    return None
+                claimed = db.query(EnrichmentJob).filter(
+                    EnrichmentJob.id == candidate.id, claimable
+                ).update({
+                    EnrichmentJob.status: EnrichmentStatus.PROCESSING,
+                    EnrichmentJob.started_at: datetime.utcnow(),
+                    EnrichmentJob.attempts: EnrichmentJob.attempts + 1
+                }, synchronize_session=False)
+                db.commit()
+                if claimed:
+                    return candidate.id
+            return None
+        finally:
+            db.close()
+
+    def _load_inputs(self, job_id: int) -> Dict:
+        db = SessionLocal()
+        try:
+            job = db.query(EnrichmentJob).filter(EnrichmentJob.id == job_id).first()
+            if job.attempts > self.max_attempts:
+                raise RuntimeError("Maximum attempts exceeded")
+            expense = job.expense
+            expense.enrichment_status = EnrichmentStatus.PROCESSING
+            db.commit()
+            return {
+                "description": expense.description,
+                "receipt_url": expense.receipt_url,
+                "company_id": expense.company_id
+            }
+        finally:
+            db.close()
+
+    def _apply(self, job_id: int, ocr_data: Optional[Dict], ai_category: str, thumbnail_url: Optional[str] = None):
+        db = SessionLocal()
+        try:
+            job = db.query(EnrichmentJob).filter(EnrichmentJob.id == job_id).first()
+            expense = job.expense
+
+            expense.ai_suggested_category = ai_category
+            if thumbnail_url:
+                expense.receipt_thumbnail_url = thumbnail_url
+            if ocr_data:
+                expense.ocr_text = ocr_data.get("text")
+                expense.ocr_amount = ocr_data.get("amount")
+                expense.ocr_date = ocr_data.get("date")
+                if not expense.vendor and ocr_data.get("vendor"):
+                    expense.vendor = ocr_data["vendor"]
+                    RollupService.record_vendor_change(expense, None, db)
+                    DuplicateIndex.record(expense, db)
+
+            # New data can change the risk picture
+            RiskService.apply_risk_score(expense, db)
+
+            expense.enrichment_status = EnrichmentStatus.COMPLETED
+            job.status = EnrichmentStatus.COMPLETED
+            job.last_error = None
+            job.finished_at = datetime.utcnow()
+            db.commit()
+            get_dashboard_cache().invalidate_expense_writes(expense.company_id, expense.user_id)
+        finally:
+            db.close()
+
+    def _record_failure(self, job_id: int, error: str):
+        db = SessionLocal()
+        try:
+            job = db.query(EnrichmentJob).filter(EnrichmentJob.id == job_id).first()
+            if not job:
+                return
+            job.last_error = error
+            if job.attempts >= self.max_attempts:
+                job.status = EnrichmentStatus.FAILED
+                job.finished_at = datetime.utcnow()
+                job.expense.enrichment_status = EnrichmentStatus.FAILED
+            else:
+                job.status = EnrichmentStatus.PENDING
+                job.expense.enrichment_status = EnrichmentStatus.PENDING
+            db.commit()
+        finally:
+            db.close()
+
+
+_enrichment_queue = EnrichmentQueue()
+
+
+def get_enrichment_queue() -> EnrichmentQueue:
+    return _enrichment_queue
+
+
+async def run_worker():
+    """Drain the queue from a dedicated process (set ENRICHMENT_IN_PROCESS=false on API workers)"""
+    queue = get_enrichment_queue()
+    await queue.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await queue.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_worker())
@@ -0,0 +1,250 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+import requests
+from dotenv import load_dotenv
+from .http_client import TIMEOUTS, get_http_client, timeout_for
+from .metrics import track_external
+
+load_dotenv()
+
+FX_RATES_URL = os.getenv("FX_RATES_URL", "https://api.exchangerate-api.com/v4/latest/{base}")
+FX_RATES_PIVOT = os.getenv("FX_RATES_PIVOT", "USD")
+FX_RATES_TTL_SECONDS = int(os.getenv("FX_RATES_TTL_SECONDS", 3600))
+FX_RATES_MAX_STALE_SECONDS = int(os.getenv("FX_RATES_MAX_STALE_SECONDS", 86400))
+FX_RATES_RETRY_SECONDS = int(os.getenv("FX_RATES_RETRY_SECONDS", 60))
+FX_RATES_SNAPSHOT_PATH = os.getenv("FX_RATES_SNAPSHOT_PATH")
+FX_RATES_SOURCE_FILE = os.getenv("FX_RATES_SOURCE_FILE")
+
+
+class ExchangeRateTable:
+    """Process-wide exchange rate table keyed by base currency.
+
+    Each base currency holds the full rate map returned by one bulk request.
+    Lookups are served from memory; entries older than ``ttl`` are refreshed
+    in a background thread while the stale rates keep being served, and only
+    entries older than ``max_stale`` (or missing) block on a refresh.
+    """
+
+    def __init__(
+        self,
+        url: str = FX_RATES_URL,
+        pivot: str = FX_RATES_PIVOT,
+        ttl: int = FX_RATES_TTL_SECONDS,
+        max_stale: int = FX_RATES_MAX_STALE_SECONDS,
+        retry_after: int = FX_RATES_RETRY_SECONDS,
+        snapshot_path: Optional[str] = FX_RATES_SNAPSHOT_PATH,
+        source_file: Optional[str] = FX_RATES_SOURCE_FILE,
+    ):
+        self.url = url
+        self.pivot = pivot.upper()
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.retry_after = retry_after
+        self.snapshot_path = snapshot_path
+        self.source_file = source_file
+        self._tables: Dict[str, Dict] = {}
+        self._refreshing = set()
+        self._failed_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.load_snapshot()
+
+    def get_rate(self, from_currency: str, to_currency: str, fetch: bool = True) -> Optional[float]:
+        """Return the rate from one currency to another, or None if unknown"""
+        from_currency = from_currency.upper()
+        to_currency = to_currency.upper()
+        if from_currency == to_currency:
+            return 1.0
+
+        # A table fetched for the source currency gives the rate directly
+        rates = self._rates_for(from_currency, fetch=False)
+        if rates and to_currency in rates:
+            return rates[to_currency]
+
+        # Otherwise derive a cross rate from the pivot table
+        pivot_rates = self._rates_for(self.pivot, fetch=fetch)
+        if pivot_rates:
+            if from_currency == self.pivot:
+                return pivot_rates.get(to_currency)
+            if to_currency == self.pivot and pivot_rates.get(from_currency):
+                return 1.0 / pivot_rates[from_currency]
+            if pivot_rates.get(from_currency) and to_currency in pivot_rates:
+                return pivot_rates[to_currency] / pivot_rates[from_currency]
+
+        # Unknown to the pivot table: fall back to a table for the source currency
+        rates = self._rates_for(from_currency, fetch=fetch)
+        if rates:
+            return rates.get(to_currency)
+        return None
+
+    def convert(self, amount: float, from_currency: str, to_currency: str) -> Optional[float]:
+        """Convert an amount using the in-memory rates"""
+        rate = self.get_rate(from_currency, to_currency)
+        if rate is None:
+            return None
+        return round(amount * rate, 2)
+
+    async def aconvert(self, amount: float, from_currency: str, to_currency: str) -> Optional[float]:
+        """Convert an amount without blocking the event loop on a cold table"""
+        from_currency = from_currency.upper()
+        to_currency = to_currency.upper()
+        if from_currency != to_currency:
+            # Wait only where get_rate would block: on a pivot table that is missing
+            # or past max_stale, unless the source table already has the rate
+            direct = self._rates_for(from_currency, fetch=False)
+            if not (direct and to_currency in direct) and self._needs_fetch(self.pivot):
+                await self.arefresh(self.pivot)
+
+        rate = self.get_rate(from_currency, to_currency, fetch=False)
+        if rate is None and self._needs_fetch(from_currency) and await self.arefresh(from_currency):
+            rate = self.get_rate(from_currency, to_currency, fetch=False)
+        if rate is None:
+            return None
+        return round(amount * rate, 2)
+
+    def refresh(self, base: str) -> bool:
+        """Fetch the full rate map for a base currency and store it"""
+        base = base.upper()
+        if self._recently_failed(base):
+            return False
+        try:
+            rates = self._fetch(base)
+        except Exception as e:
+            print(f"Error refreshing exchange rates for {base}: {e}")
+            rates = None
+        if not self._store_fetched(base, rates):
+            return False
+        self.save_snapshot()
+        return True
+
+    async def arefresh(self, base: str) -> bool:
+        """Async variant of refresh using the shared HTTP client"""
+        base = base.upper()
+        if self._recently_failed(base):
+            return False
+        try:
+            if self.source_file:
+                rates = await asyncio.to_thread(self._fetch, base)
+            else:
+                with track_external("fx"):
+                    response = await get_http_client().get(
+                        self.url.format(base=base), timeout=timeout_for("fx")
+                    )
+                rates = response.json().get("rates") if response.status_code == 200 else None
+        except Exception as e:
+            print(f"Error refreshing exchange rates for {base}: {e}")
+            rates = None
+        if not self._store_fetched(base, rates):
+            return False
+        await asyncio.to_thread(self.save_snapshot)
+        return True
+
+    def set_rates(self, base: str, rates: Dict[str, float], fetched_at: Optional[float] = None):
+        """Store a rate map for a base currency"""
+        with self._lock:
+            self._tables[base.upper()] = {
+                "fetched_at": fetched_at if fetched_at is not None else time.time(),
+                "rates": {code.upper(): float(rate) for code, rate in rates.items()},
+            }
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+            self._failed_at.clear()
+
+    def load_snapshot(self):
+        """Warm the table from the on-disk snapshot, if one is configured"""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path) as f:
+                snapshot = json.load(f)
+            for base, table in snapshot.get("tables", {}).items():
+                self.set_rates(base, table["rates"], fetched_at=table["fetched_at"])
+        except Exception as e:
+            print(f"Error loading exchange rate snapshot: {e}")
+
+    def save_snapshot(self):
+        """Write the table to disk so a restarted worker starts warm"""
+        if not self.snapshot_path:
+            return
+        with self._lock:
+            snapshot = {"tables": dict(self._tables)}
+        tmp_path = f"{self.snapshot_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except Exception as e:
+            print(f"Error saving exchange rate snapshot: {e}")
+
+    def _recently_failed(self, base: str) -> bool:
+        # Don't hammer the upstream API while it is failing
+        return time.time() - self._failed_at.get(base, 0) < self.retry_after
+
+    def _store_fetched(self, base: str, rates: Optional[Dict[str, float]]) -> bool:
+        if not rates:
+            self._failed_at[base] = time.time()
+            return False
+        self._failed_at.pop(base, None)
+        self.set_rates(base, rates)
+        return True
+
+    def _needs_fetch(self, base: str) -> bool:
+        """Missing or past ``max_stale``: callers wait for a refresh rather than use it"""
+        table = self._tables.get(base)
+        return table is None or time.time() - table["fetched_at"] > self.max_stale
+
+    def _rates_for(self, base: str, fetch: bool = True) -> Optional[Dict[str, float]]:
+        if fetch and self._needs_fetch(base) and self.refresh(base):
+            return self._tables[base]["rates"]
+
+        table = self._tables.get(base)
+        if table is None:
+            return None
+        if time.time() - table["fetched_at"] > self.ttl:
+            self._refresh_in_background(base)
+        return table["rates"]
+
+    def _refresh_in_background(self, base: str):
+        with self._lock:
+            if base in self._refreshing:
+                return
+            self._refreshing.add(base)
+
+        def run():
+            try:
+                self.refresh(base)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(base)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _fetch(self, base: str) -> Optional[Dict[str, float]]:
+        if self.source_file:
+            # Local stand-in: a JSON object mapping base currency -> rates
+            with open(self.source_file) as f:
+                return json.load(f).get(base)
+
+        with track_external("fx"):
+            response = requests.get(self.url.format(base=base), timeout=TIMEOUTS["fx"])
+        if response.status_code == 200:
+            return response.json().get("rates")
+        return None
+
+
+_exchange_rate_table = ExchangeRateTable()
+
+
+def get_exchange_rate_table() -> ExchangeRateTable:
+    return _exchange_rate_table
+
+
+def set_exchange_rate_table(table: ExchangeRateTable):
+    """Swap the process-wide table, e.g. for one backed by a local file"""
+    global _exchange_rate_table
+    _exchange_rate_table = table
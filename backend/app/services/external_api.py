@@ -1,82 +1,100 @@
-import requests
-import httpx
 import os
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
+from .exchange_rates import get_exchange_rate_table
+from .country_index import get_country_index
+from .http_client import get_http_client, timeout_for
+from .metrics import track_external
+from .category_classifier import get_company_classifiers, CLASSIFIER_MIN_CONFIDENCE
+from .result_cache import classification_cache, ocr_cache, normalize_description, content_hash
+from ..models.expense import ExpenseCategory
 
 load_dotenv()
 
 HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
+# Inference API root; point at a local stand-in for benchmarks
+HUGGINGFACE_API_URL = os.getenv("HUGGINGFACE_API_URL", "https://api-inference.huggingface.co/models").rstrip("/")
 
 class ExternalAPIService:
     
     @staticmethod
     def get_country_currency(country_name: str) -> Optional[str]:
-        """Fetch currency for a country from REST Countries API"""
-        try:
-            response = requests.get(
-                "https://restcountries.com/v3.1/all?fields=name,currencies",
-                timeout=10
-            )
-            if response.status_code == 200:
-                countries = response.json()
-                for country in countries:
-                    if country.get("name", {}).get("common", "").lower() == country_name.lower():
-                        currencies = country.get("currencies", {})
-                        if currencies:
-                            return list(currencies.keys())[0]
-            return "USD"  # Default fallback
-        except Exception as e:
-            print(f"Error fetching country currency: {e}")
-            return "USD"
+        """Look up the currency for a country in the in-memory country index"""
+        return get_country_index().currency_for(country_name)
     
     @staticmethod
     def convert_currency(amount: float, from_currency: str, to_currency: str) -> float:
-        """Convert currency using Exchange Rate API"""
+        """Convert currency using the cached exchange rate table"""
         if from_currency == to_currency:
             return amount
         
-        try:
-            response = requests.get(
-                f"https://api.exchangerate-api.com/v4/latest/{from_currency}",
-                timeout=10
-            )
-            if response.status_code == 200:
-                data = response.json()
-                rate = data.get("rates", {}).get(to_currency, 1.0)
-                return round(amount * rate, 2)
+        converted = get_exchange_rate_table().convert(amount, from_currency, to_currency)
+        if converted is None:
+            print(f"No exchange rate for {from_currency} -> {to_currency}")
             return amount
-        except Exception as e:
-            print(f"Error converting currency: {e}")
+        return converted
+    
+    @staticmethod
+    async def convert_currency_async(amount: float, from_currency: str, to_currency: str) -> float:
+        """Convert currency without blocking the event loop"""
+        if from_currency == to_currency:
+            return amount
+        
+        converted = await get_exchange_rate_table().aconvert(amount, from_currency, to_currency)
+        if converted is None:
+            print(f"No exchange rate for {from_currency} -> {to_currency}")
             return amount
+        return converted
     
     @staticmethod
-    async def extract_text_from_receipt(image_data: bytes) -> Dict:
+    async def extract_text_from_receipt(image_data: bytes) -> Optional[Dict]:
+        """Extract text from receipt, reusing the result for identical images.
+        
+        None when the OCR service could not be reached or answered with an error.
+        """
+        if not HUGGINGFACE_API_KEY:
+            # OCR isn't configured, so there is nothing worth retrying
+            return {"text": "", "amount": None, "date": None, "vendor": None}
+        
+        cache_key = content_hash(image_data)
+        cached = await ocr_cache.aget(cache_key)
+        if cached is not None:
+            return cached
+        
+        parsed_data = await ExternalAPIService._extract_text_from_receipt_remote(image_data)
+        if parsed_data is not None:
+            await ocr_cache.aset(cache_key, parsed_data)
+        return parsed_data
+    
+    @staticmethod
+    async def _extract_text_from_receipt_remote(image_data: bytes) -> Optional[Dict]:
         """Extract text from receipt using Hugging Face OCR"""
         try:
             # Using Microsoft's TrOCR model for receipt OCR
-            API_URL = "https://api-inference.huggingface.co/models/microsoft/trocr-base-printed"
+            API_URL = f"{HUGGINGFACE_API_URL}/microsoft/trocr-base-printed"
             headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(API_URL, headers=headers, content=image_data)
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    # Extract text from response
-                    if isinstance(result, list) and len(result) > 0:
-                        extracted_text = result[0].get("generated_text", "")
-                    else:
-                        extracted_text = str(result)
-                    
-                    # Parse extracted text for amount, date, vendor
-                    parsed_data = ExternalAPIService._parse_receipt_text(extracted_text)
-                    return parsed_data
+            with track_external("ocr"):
+                response = await get_http_client().post(
+                    API_URL, headers=headers, content=image_data, timeout=timeout_for("ocr")
+                )
+            
+            if response.status_code == 200:
+                result = response.json()
+                # Extract text from response
+                if isinstance(result, list) and len(result) > 0:
+                    extracted_text = result[0].get("generated_text", "")
                 else:
-                    return {"text": "", "amount": None, "date": None, "vendor": None}
+                    extracted_text = str(result)
+                
+                # Parse extracted text for amount, date, vendor
+                parsed_data = ExternalAPIService._parse_receipt_text(extracted_text)
+                return parsed_data
+            else:
+                return None
         except Exception as e:
             print(f"Error extracting text from receipt: {e}")
-            return {"text": "", "amount": None, "date": None, "vendor": None}
+            return None
     
     @staticmethod
     def _parse_receipt_text(text: str) -> Dict:
@@ -120,18 +138,35 @@ class ExternalAPIService:
         }
     
     @staticmethod
-    async def classify_expense_category(description: str) -> str:
-        """Classify expense category using Hugging Face NLP"""
+    async def classify_expense_category(description: str, company_id: Optional[int] = None) -> str:
+        """Classify expense category with the company's local model, asking Hugging Face only when unsure"""
+        category, confidence = get_company_classifiers().for_company(company_id).predict(description)
+        if confidence >= CLASSIFIER_MIN_CONFIDENCE or not HUGGINGFACE_API_KEY:
+            return category
+        
+        cache_key = normalize_description(description)
+        remote_category = await classification_cache.aget(cache_key)
+        if remote_category is None:
+            remote_category = await ExternalAPIService._classify_expense_category_remote(description)
+            if remote_category is not None:
+                await classification_cache.aset(cache_key, remote_category)
+        return remote_category or category
+    
+    @staticmethod
+    def classify_expense_categories(descriptions: List[str], company_id: Optional[int] = None) -> List[str]:
+        """Classify a batch of descriptions with the company's local model"""
+        classifier = get_company_classifiers().for_company(company_id)
+        return [category for category, _ in classifier.predict_batch(descriptions)]
+    
+    @staticmethod
+    async def _classify_expense_category_remote(description: str) -> Optional[str]:
+        """Classify expense category using Hugging Face zero-shot NLP"""
         try:
             # Using zero-shot classification
-            API_URL = "https://api-inference.huggingface.co/models/facebook/bart-large-mnli"
+            API_URL = f"{HUGGINGFACE_API_URL}/facebook/bart-large-mnli"
             headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
             
-            categories = [
-                "travel", "meals", "accommodation", "office_supplies",
-                "entertainment", "transportation", "utilities", "software",
-                "training", "other"
-            ]
+            categories = [c.value for c in ExpenseCategory]
             
             payload = {
                 "inputs": description,
@@ -140,16 +175,16 @@ class ExternalAPIService:
                 }
             }
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(API_URL, headers=headers, json=payload)
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if "labels" in result and len(result["labels"]) > 0:
-                        return result["labels"][0]
-                    return "other"
-                else:
-                    return "other"
+            with track_external("classify"):
+                response = await get_http_client().post(
+                    API_URL, headers=headers, json=payload, timeout=timeout_for("classify")
+                )
+            
+            if response.status_code == 200:
+                result = response.json()
+                if "labels" in result and len(result["labels"]) > 0:
+                    return result["labels"][0]
+            return None
         except Exception as e:
             print(f"Error classifying expense category: {e}")
-            return "other"
+            return None
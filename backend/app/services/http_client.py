@@ -0,0 +1,56 @@
+import os
+from typing import Optional
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", 5))
+
+# Per-call read timeouts, in seconds, by external target
+TIMEOUTS = {
+    "fx": float(os.getenv("FX_TIMEOUT", 10)),
+    "ocr": float(os.getenv("OCR_TIMEOUT", 30)),
+    "classify": float(os.getenv("CLASSIFY_TIMEOUT", 30)),
+}
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def timeout_for(target: str) -> httpx.Timeout:
+    return httpx.Timeout(
+        TIMEOUTS.get(target, 10.0),
+        connect=HTTP_CONNECT_TIMEOUT,
+        pool=HTTP_POOL_TIMEOUT
+    )
+
+
+def create_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+        ),
+        timeout=timeout_for("default")
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared connection-pooled client, owned by the app lifespan"""
+    global _client
+    if _client is None or _client.is_closed:
+        # Scripts that never run the lifespan still get a working client
+        _client = create_http_client()
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
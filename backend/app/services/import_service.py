@@ -0,0 +1,222 @@
+import csv
+import io
+import json
+import os
+import time
+from types import SimpleNamespace
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from ..models.user import User, UserRole
+from ..models.expense import Expense, ExpenseStatus, ExpenseCategory
+from ..models.approval import Approval
+from ..models.expense_fingerprint import ExpenseFingerprint
+from ..schemas.expense import ExpenseImportRow, ImportRowError, ExpenseImportResult
+from .principal_cache import Principal
+from .exchange_rates import get_exchange_rate_table
+from .external_api import ExternalAPIService
+from .risk_service import RiskService
+from .rollup_service import RollupService
+from .duplicate_index import DuplicateIndex
+from .dashboard_cache import get_dashboard_cache
+from .workflow_engine import WorkflowEngine, get_workflow_engine
+
+load_dotenv()
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 1000))
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", 100000))
+IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", 1000))
+
+
+def iter_import_rows(fileobj: BinaryIO, format: str) -> Iterator[Tuple[int, Union[Dict, str]]]:
+    """(line number, row dict or parse error) from a CSV or NDJSON upload, read as a stream"""
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    if format == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, "Expected a JSON object"
+            continue
+        yield line_number, row
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors()
+    )
+
+
+class _ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[ImportRowError] = []
+
+    def fail(self, line: int, error: str):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append(ImportRowError(line=line, error=error))
+
+
+class ImportService:
+    """Bulk expense import.
+
+    Rows are validated as the file is read and written in chunks of
+    ``IMPORT_CHUNK_SIZE``, each in its own transaction: one multi-row INSERT
+    each for expenses, fingerprints and approvals, one upsert per touched
+    rollup bucket, and a set-based risk pass over the chunk. Exchange rates
+    are looked up once per currency pair for the whole file. Bad rows are
+    reported by line number and skipped; the rest of the file still imports.
+    """
+
+    @staticmethod
+    def import_expenses(
+        fileobj: BinaryIO,
+        format: str,
+        principal: Principal,
+        db: Session,
+        chunk_size: int = IMPORT_CHUNK_SIZE
+    ) -> ExpenseImportResult:
+        started = time.perf_counter()
+        report = _ImportReport()
+        company_currency = principal.company_currency
+
+        # Submitters the caller may import for, by email
+        users = db.query(User.id, User.email, User.manager_id).filter(
+            User.company_id == principal.company_id
+        )
+        if principal.role == UserRole.MANAGER:
+            users = users.filter(User.id.in_([principal.id, *principal.subordinate_ids]))
+        elif principal.role != UserRole.ADMIN:
+            users = users.filter(User.id == principal.id)
+        submitters = {email.lower(): (user_id, manager_id) for user_id, email, manager_id in users}
+        own_email = principal.email.lower()
+
+        rates: Dict[Tuple[str, str], Optional[float]] = {}
+        chunk = []
+        line = 0
+        try:
+            for line, raw in iter_import_rows(fileobj, format):
+                if report.imported + report.failed + len(chunk) >= IMPORT_MAX_ROWS:
+                    report.fail(line, f"Import is limited to {IMPORT_MAX_ROWS} rows; the rest of the file was skipped")
+                    break
+                if isinstance(raw, str):
+                    report.fail(line, raw)
+                    continue
+                try:
+                    row = ExpenseImportRow.model_validate(raw)
+                except ValidationError as e:
+                    report.fail(line, _describe(e))
+                    continue
+
+                submitter = submitters.get((row.submitter_email or own_email).lower())
+                if submitter is None:
+                    report.fail(line, f"Cannot import expenses for {row.submitter_email}")
+                    continue
+
+                currency = row.currency or company_currency
+                if currency == company_currency:
+                    converted_amount = row.amount
+                else:
+                    pair = (currency, company_currency)
+                    if pair not in rates:
+                        rates[pair] = get_exchange_rate_table().get_rate(currency, company_currency)
+                    if rates[pair] is None:
+                        report.fail(line, f"No exchange rate for {currency} -> {company_currency}")
+                        continue
+                    converted_amount = round(row.amount * rates[pair], 2)
+
+                chunk.append((line, row, submitter, currency, converted_amount))
+                if len(chunk) >= chunk_size:
+                    ImportService._write_chunk(db, principal.company_id, chunk, report)
+                    chunk = []
+        except (UnicodeDecodeError, csv.Error) as e:
+            report.fail(line + 1, f"Unreadable file, import stopped: {e}")
+
+        if chunk:
+            ImportService._write_chunk(db, principal.company_id, chunk, report)
+
+        return ExpenseImportResult(
+            imported=report.imported,
+            failed=report.failed,
+            errors=report.errors,
+            errors_truncated=report.failed > len(report.errors),
+            seconds=round(time.perf_counter() - started, 3)
+        )
+
+    @staticmethod
+    def _write_chunk(db: Session, company_id: int, chunk: List, report: _ImportReport):
+        # Imports repeat descriptions a lot; classify each distinct one once
+        descriptions = list(dict.fromkeys(row.description for _, row, *_ in chunk))
+        categories = dict(zip(descriptions, ExternalAPIService.classify_expense_categories(descriptions, company_id)))
+        suggestions = [categories[row.description] for _, row, *_ in chunk]
+        compiled = get_workflow_engine().for_company(company_id, db)
+        routes = [
+            WorkflowEngine.chain_for(compiled, converted_amount, user_id, manager_id)
+            for _, _, (user_id, manager_id), _, converted_amount in chunk
+        ]
+        values = [
+            {
+                "user_id": user_id,
+                "company_id": company_id,
+                "amount": row.amount,
+                "currency": currency,
+                "converted_amount": converted_amount,
+                "category": row.category or ExpenseCategory(suggestion),
+                "description": row.description,
+                "expense_date": row.expense_date,
+                "vendor": row.vendor,
+                "status": ExpenseStatus.PENDING,
+                "ai_suggested_category": suggestion,
+                "workflow_id": workflow_id
+            }
+            for (_, row, (user_id, _), currency, converted_amount), suggestion, (workflow_id, _)
+            in zip(chunk, suggestions, routes)
+        ]
+
+        # Core table inserts: ORM bulk inserts split the batch wherever nullable columns vary
+        expenses_table = Expense.__table__
+        try:
+            ids = db.execute(
+                expenses_table.insert().returning(expenses_table.c.id, sort_by_parameter_order=True),
+                values
+            ).scalars().all()
+            # Stand-ins for the per-expense helpers, without ORM instrumentation
+            expenses = [SimpleNamespace(id=expense_id, **v) for expense_id, v in zip(ids, values)]
+            db.execute(ExpenseFingerprint.__table__.insert(), [DuplicateIndex.fingerprint(e) for e in expenses])
+
+            approvals = [
+                {"expense_id": expense_id, **row}
+                for expense_id, (_, chain) in zip(ids, routes)
+                for row in chain
+            ]
+            if approvals:
+                db.execute(Approval.__table__.insert(), approvals)
+
+            RollupService.record_expenses(expenses, db)
+            RiskService.rescore(db, company_id, expense_ids=ids, backfill=False)
+            db.commit()
+        except SQLAlchemyError as e:
+            print(f"Error importing expenses: {e}")
+            db.rollback()
+            for line, *_ in chunk:
+                report.fail(line, "Database error; this row's chunk was rolled back")
+            return
+
+        report.imported += len(ids)
+        dashboard_cache = get_dashboard_cache()
+        for user_id in {v["user_id"] for v in values}:
+            dashboard_cache.invalidate_expense_writes(company_id, user_id)
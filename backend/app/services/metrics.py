@@ -0,0 +1,247 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Add a Server-Timing header (app, db and per-target external time) to every response
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+# When set, /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+METRICS_PREFIX = "spendsense"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+EXTERNAL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_set(names: Sequence[str], values: Sequence) -> str:
+    def escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str]):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, labels: Tuple, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{{{_label_set(self.labels, labels)}}} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format"""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> (per-bucket counts, +Inf count, sum)
+        self._series: Dict[Tuple, List] = {}
+
+    def observe(self, labels: Tuple, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * len(self.buckets), 0, 0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+        series[1] += 1
+        series[2] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, value_sum) in sorted(self._series.items()):
+            label_set = _label_set(self.labels, labels)
+            prefix = f"{label_set}," if label_set else ""
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {total}')
+            lines.append(f"{self.name}_sum{{{label_set}}} {round(value_sum, 6)}")
+            lines.append(f"{self.name}_count{{{label_set}}} {total}")
+        return lines
+
+
+class RequestTiming:
+    """Where one request's time went; filled in by the SQL and external-call hooks"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.external: Dict[str, List[float]] = {}
+
+    def record_external(self, target: str, seconds: float):
+        calls = self.external.setdefault(target, [0, 0.0])
+        calls[0] += 1
+        calls[1] += seconds
+
+    def server_timing(self) -> str:
+        elapsed_ms = (time.perf_counter() - self.started) * 1000
+        entries = [
+            f"app;dur={elapsed_ms:.1f}",
+            f'db;dur={self.sql_seconds * 1000:.1f};desc="{self.queries} queries"',
+        ]
+        for target, (calls, seconds) in sorted(self.external.items()):
+            entries.append(f'ext-{target};dur={seconds * 1000:.1f};desc="{calls} calls"')
+        return ", ".join(entries)
+
+
+_current_request: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+
+class Metrics:
+    """Per-process request, SQL and external-call metrics.
+
+    Every worker process keeps its own; scrape each worker (or run one per
+    container) to see them all.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_seconds = Histogram(
+            f"{METRICS_PREFIX}_http_request_duration_seconds",
+            "HTTP request latency by route template",
+            ("method", "route", "status"), LATENCY_BUCKETS
+        )
+        self.request_queries = Histogram(
+            f"{METRICS_PREFIX}_http_request_db_queries",
+            "SQL statements executed per HTTP request",
+            ("method", "route"), QUERY_COUNT_BUCKETS
+        )
+        self.request_sql_seconds = Histogram(
+            f"{METRICS_PREFIX}_http_request_db_seconds",
+            "Time spent executing SQL per HTTP request",
+            ("method", "route"), LATENCY_BUCKETS
+        )
+        self.queries = Counter(
+            f"{METRICS_PREFIX}_db_queries_total",
+            "SQL statements executed, inside or outside a request",
+            ("in_request",)
+        )
+        self.external_seconds = Histogram(
+            f"{METRICS_PREFIX}_external_call_duration_seconds",
+            "Outbound API call latency by target",
+            ("target", "outcome"), EXTERNAL_BUCKETS
+        )
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, timing: RequestTiming):
+        with self._lock:
+            self.request_seconds.observe((method, route, str(status)), seconds)
+            self.request_queries.observe((method, route), timing.queries)
+            self.request_sql_seconds.observe((method, route), timing.sql_seconds)
+
+    def observe_query(self, seconds: float):
+        timing = _current_request.get()
+        if timing is not None:
+            timing.queries += 1
+            timing.sql_seconds += seconds
+        with self._lock:
+            self.queries.inc(("true" if timing is not None else "false",))
+
+    def observe_external(self, target: str, outcome: str, seconds: float):
+        timing = _current_request.get()
+        if timing is not None:
+            timing.record_external(target, seconds)
+        with self._lock:
+            self.external_seconds.observe((target, outcome), seconds)
+
+    def render(self) -> str:
+        with self._lock:
+            lines = []
+            for metric in (
+                self.request_seconds, self.request_queries, self.request_sql_seconds,
+                self.queries, self.external_seconds
+            ):
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+@contextmanager
+def track_external(target: str) -> Iterator[None]:
+    """Time an outbound call; targets match http_client.TIMEOUTS (fx, ocr, classify, ...)"""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        _metrics.observe_external(target, outcome, time.perf_counter() - started)
+
+
+# Every engine, sync or async (whose statements run on its sync_engine)
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    if started is not None:
+        _metrics.observe_query(time.perf_counter() - started)
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    # Raw paths of unmatched requests would give every 404 its own series
+    return getattr(route, "path", None) or "unmatched"
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware recording latency, SQL and external-call time per route"""
+
+    def __init__(self, app, server_timing: bool = SERVER_TIMING_ENABLED):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _current_request.set(timing)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    # Streamed bodies keep running after this; their queries still reach /metrics
+                    MutableHeaders(scope=message).append("Server-Timing", timing.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_request.reset(token)
+            _metrics.observe_request(
+                scope["method"], _route_label(scope), status,
+                time.perf_counter() - timing.started, timing
+            )
@@ -0,0 +1,137 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+from fastapi import HTTPException
+from dotenv import load_dotenv
+from ..core.security import verify_password, get_password_hash, password_needs_rehash, BCRYPT_ROUNDS
+
+load_dotenv()
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+# Hashes queued or running at once; beyond this, requests are refused with a 503
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", PASSWORD_HASH_WORKERS * 8))
+
+_LATENCY_SAMPLES = 1000
+
+
+class PasswordHasherBusy(HTTPException):
+    """The hashing pool already has its maximum of requests in flight"""
+
+    def __init__(self):
+        super().__init__(
+            status_code=503,
+            detail="Too many sign-ins in progress, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+
+
+class PasswordHasher:
+    """Runs bcrypt in a dedicated process pool with admission control.
+
+    bcrypt is deliberately slow and holds the GIL, so hashing on the event
+    loop (or its thread pool) stalls every other request. Hashes here run in
+    ``workers`` separate processes; once ``max_pending`` are queued or running,
+    new ones are rejected straight away rather than waiting behind them.
+
+    Calls block their caller until the hash is done, so they belong in sync
+    endpoints, which FastAPI runs on its thread pool, not on the event loop.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=_LATENCY_SAMPLES)
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.total_seconds = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers don't inherit the event loop's threads and locks
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+        return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def hash(self, password: str) -> str:
+        return self._run(get_password_hash, password)
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return self._run(verify_password, password, hashed_password)
+
+    def rehash_if_needed(self, password: str, hashed_password: str) -> Optional[str]:
+        """New hash at the current BCRYPT_ROUNDS, or None if unchanged or the pool is busy"""
+        if not password_needs_rehash(hashed_password):
+            return None
+        try:
+            new_hash = self.hash(password)
+        except PasswordHasherBusy:
+            # Not worth failing a login over; the next one will retry
+            return None
+        with self._lock:
+            self.rehashed += 1
+        return new_hash
+
+    def _run(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy()
+            self.in_flight += 1
+
+        started = time.perf_counter()
+        try:
+            # Only the calling thread waits; the GIL is released while it does
+            return self.start().submit(fn, *args).result()
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+                self.total_seconds += elapsed
+                self._latencies.append(elapsed)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            def percentile(p):
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 6) if latencies else 0.0
+            return {
+                "workers": self.workers,
+                "bcrypt_rounds": BCRYPT_ROUNDS,
+                "max_pending": self.max_pending,
+                "queue_depth": max(0, self.in_flight - self.workers),
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+                "latency_seconds": {
+                    "mean": round(self.total_seconds / self.completed, 6) if self.completed else 0.0,
+                    "p50": percentile(0.50),
+                    "p95": percentile(0.95),
+                    "max": round(latencies[-1], 6) if latencies else 0.0,
+                },
+            }
+
+
+_password_hasher = PasswordHasher()
+
+
+def get_password_hasher() -> PasswordHasher:
+    return _password_hasher
@@ -0,0 +1,140 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Optional, Set, Tuple
+from pydantic import BaseModel
+from dotenv import load_dotenv
+from ..models.user import User, UserRole
+
+load_dotenv()
+
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 60))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", 10000))
+
+
+class Principal(BaseModel):
+    """Snapshot of the authenticated user, detached from any DB session"""
+    id: int
+    email: str
+    full_name: str
+    role: UserRole
+    company_id: int
+    manager_id: Optional[int]
+    created_at: datetime
+    company_currency: str
+    subordinate_ids: Tuple[int, ...]
+
+    class Config:
+        frozen = True
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            role=user.role,
+            company_id=user.company_id,
+            manager_id=user.manager_id,
+            created_at=user.created_at,
+            company_currency=user.company.currency,
+            subordinate_ids=tuple(sorted(u.id for u in user.subordinates))
+        )
+
+
+class PrincipalCache:
+    """Verified principals keyed by a hash of the bearer token.
+
+    Entries expire after ``ttl`` seconds or when the token does, whichever is
+    sooner. User writes invalidate every cached token of the users they touch;
+    that only reaches this process, so ``ttl`` bounds how long a change made
+    through another worker can go unseen.
+    """
+
+    def __init__(self, ttl: float = PRINCIPAL_CACHE_TTL_SECONDS, max_entries: int = PRINCIPAL_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(
+        self,
+        token: str,
+        load: Callable[[], Optional[Tuple[Principal, float]]]
+    ) -> Optional[Principal]:
+        """Cached principal for ``token``, else ``load()`` -> (principal, token expiry) or None"""
+        key = hashlib.sha256(token.encode()).hexdigest()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, principal = entry
+                if time.time() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return principal
+                self._remove(key)
+            self.misses += 1
+            generation = self._generation
+
+        loaded = load()
+        if loaded is None:
+            return None
+        principal, token_expires_at = loaded
+
+        with self._lock:
+            # Only store if no user was changed while we loaded
+            if self._generation == generation:
+                self._entries[key] = (min(time.time() + self.ttl, token_expires_at), principal)
+                self._tokens_by_user.setdefault(principal.id, set()).add(key)
+                while len(self._entries) > self.max_entries:
+                    self._remove(next(iter(self._entries)))
+        return principal
+
+    def invalidate_users(self, *user_ids: Optional[int]):
+        """Drop cached principals of users whose row or team changed"""
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                if user_id is None:
+                    continue
+                for key in self._tokens_by_user.pop(user_id, set()):
+                    self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _remove(self, key: str):
+        _, principal = self._entries.pop(key)
+        keys = self._tokens_by_user.get(principal.id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._tokens_by_user[principal.id]
+
+
+_principal_cache = PrincipalCache()
+
+
+def get_principal_cache() -> PrincipalCache:
+    return _principal_cache
@@ -0,0 +1,135 @@
+import asyncio
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+from pydantic import BaseModel
+from dotenv import load_dotenv
+from PIL import ExifTags, Image, ImageOps
+
+load_dotenv()
+
+RECEIPT_PREPROCESS_WORKERS = int(os.getenv("RECEIPT_PREPROCESS_WORKERS", 2))
+# Longest side sent to OCR; phone photos are several times larger than OCR models read
+RECEIPT_OCR_MAX_SIDE = int(os.getenv("RECEIPT_OCR_MAX_SIDE", 1600))
+RECEIPT_OCR_JPEG_QUALITY = int(os.getenv("RECEIPT_OCR_JPEG_QUALITY", 85))
+RECEIPT_THUMBNAIL_SIDE = int(os.getenv("RECEIPT_THUMBNAIL_SIDE", 256))
+
+
+class PreparedReceipt(BaseModel):
+    image: bytes
+    thumbnail: Optional[bytes]
+    original_bytes: int
+    seconds: float
+
+
+def preprocess_receipt(
+    image_data: bytes,
+    max_side: int = RECEIPT_OCR_MAX_SIDE,
+    quality: int = RECEIPT_OCR_JPEG_QUALITY,
+    thumbnail_side: int = RECEIPT_THUMBNAIL_SIDE,
+) -> Tuple[bytes, Optional[bytes]]:
+    """(OCR-ready grayscale JPEG, thumbnail JPEG); runs in a worker process.
+
+    Anything Pillow cannot decode (e.g. a PDF) is returned unchanged, without a thumbnail.
+    """
+    try:
+        image = Image.open(io.BytesIO(image_data))
+        # Let the JPEG decoder scale down while decoding instead of afterwards
+        image.draft("L", (max_side, max_side))
+        rotated = image.getexif().get(ExifTags.Base.Orientation, 1) != 1
+        image = ImageOps.exif_transpose(image).convert("L")
+    except Exception:
+        return image_data, None
+
+    resized = max(image.size) > max_side
+    if resized:
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=quality, optimize=True)
+    prepared = buffer.getvalue()
+    if not (rotated or resized) and len(prepared) >= len(image_data):
+        # Already small and upright; re-encoding only lost quality
+        prepared = image_data
+
+    image.thumbnail((thumbnail_side, thumbnail_side), Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=75, optimize=True)
+    return prepared, buffer.getvalue()
+
+
+def _timed_preprocess(image_data: bytes) -> Tuple[bytes, Optional[bytes], float]:
+    started = time.process_time()
+    prepared, thumbnail = preprocess_receipt(image_data)
+    return prepared, thumbnail, time.process_time() - started
+
+
+class ReceiptPreprocessor:
+    """Shrinks receipt photos for OCR in a pool of worker processes.
+
+    Decoding and resampling multi-megapixel photos is CPU-bound, so it runs in
+    ``workers`` separate processes, never on the event loop.
+    """
+
+    def __init__(self, workers: int = RECEIPT_PREPROCESS_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.images = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+        self.wall_seconds = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+        return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def prepare(self, image_data: bytes) -> PreparedReceipt:
+        started = time.perf_counter()
+        prepared, thumbnail, cpu_seconds = await asyncio.get_running_loop().run_in_executor(
+            self.start(), _timed_preprocess, image_data
+        )
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.images += 1
+            self.bytes_in += len(image_data)
+            self.bytes_out += len(prepared)
+            self.cpu_seconds += cpu_seconds
+            self.wall_seconds += elapsed
+        return PreparedReceipt(
+            image=prepared, thumbnail=thumbnail, original_bytes=len(image_data), seconds=elapsed
+        )
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "images": self.images,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "bytes_saved": self.bytes_in - self.bytes_out,
+                "cpu_seconds": round(self.cpu_seconds, 6),
+                "wall_seconds": round(self.wall_seconds, 6),
+            }
+
+
+_receipt_preprocessor = ReceiptPreprocessor()
+
+
+def get_receipt_preprocessor() -> ReceiptPreprocessor:
+    return _receipt_preprocessor
@@ -0,0 +1,191 @@
+import hashlib
+import os
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple, Type
+from fastapi import HTTPException
+from pydantic import BaseModel
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RECEIPT_STORAGE_BACKEND = os.getenv("RECEIPT_STORAGE_BACKEND", "local")
+RECEIPT_STORAGE_DIR = os.getenv("RECEIPT_STORAGE_DIR", "/tmp/receipts")
+RECEIPT_MAX_BYTES = int(os.getenv("RECEIPT_MAX_BYTES", 10 * 1024 * 1024))
+RECEIPT_CHUNK_SIZE = int(os.getenv("RECEIPT_CHUNK_SIZE", 64 * 1024))
+# Unreferenced blobs younger than this may belong to an expense still being created
+RECEIPT_GC_GRACE_SECONDS = int(os.getenv("RECEIPT_GC_GRACE_SECONDS", 3600))
+
+# Expense.receipt_url for stored receipts; anything else is a legacy file path
+RECEIPT_URL_PREFIX = "sha256:"
+
+
+class ReceiptTooLarge(HTTPException):
+    """The upload exceeded RECEIPT_MAX_BYTES"""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(status_code=413, detail=f"Receipt exceeds the {max_bytes} byte limit")
+
+
+class StoredReceipt(BaseModel):
+    digest: str
+    size: int
+    deduplicated: bool
+
+    @property
+    def url(self) -> str:
+        return RECEIPT_URL_PREFIX + self.digest
+
+
+class ReceiptBackend(ABC):
+    """Where receipt blobs live, keyed by the hex SHA-256 of their content"""
+
+    # Uploads are streamed to a local file here before ``put``
+    spool_dir: str = tempfile.gettempdir()
+
+    @abstractmethod
+    def put(self, digest: str, spool_path: str) -> bool:
+        """Store the spooled file under ``digest``; False if it was already stored"""
+
+    @abstractmethod
+    def open(self, digest: str) -> BinaryIO:
+        ...
+
+    @abstractmethod
+    def delete(self, digest: str):
+        ...
+
+    @abstractmethod
+    def digests(self) -> Iterator[Tuple[str, float]]:
+        """(digest, last stored timestamp) for every blob"""
+
+
+class LocalReceiptBackend(ReceiptBackend):
+    """Blobs on the local filesystem under ``root/ab/cd/abcd...``"""
+
+    def __init__(self, root: str = RECEIPT_STORAGE_DIR):
+        self.root = root
+        self.spool_dir = os.path.join(root, "incoming")
+        os.makedirs(self.spool_dir, exist_ok=True)
+
+    def path_for(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def put(self, digest: str, spool_path: str) -> bool:
+        path = self.path_for(digest)
+        if os.path.exists(path):
+            # Restart the GC grace period for the new reference
+            os.utime(path)
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Atomic; a concurrent identical upload just replaces the same bytes
+        os.replace(spool_path, path)
+        return True
+
+    def open(self, digest: str) -> BinaryIO:
+        return open(self.path_for(digest), "rb")
+
+    def delete(self, digest: str):
+        try:
+            os.remove(self.path_for(digest))
+        except FileNotFoundError:
+            pass
+
+    def digests(self) -> Iterator[Tuple[str, float]]:
+        for shard in os.scandir(self.root):
+            if not shard.is_dir() or len(shard.name) != 2:
+                continue
+            for subshard in os.scandir(shard.path):
+                if not subshard.is_dir():
+                    continue
+                for blob in os.scandir(subshard.path):
+                    if blob.is_file():
+                        yield blob.name, blob.stat().st_mtime
+
+
+_BACKENDS: Dict[str, Type[ReceiptBackend]] = {
+    "local": LocalReceiptBackend,
+}
+
+
+class ReceiptStore:
+    """Content-addressed receipt storage with deduplication.
+
+    Uploads are streamed in ``chunk_size`` pieces to a spool file while being
+    hashed, so memory use does not grow with the file, and aborted as soon
+    as they pass ``max_bytes``. Identical receipts are stored once.
+    """
+
+    def __init__(
+        self,
+        backend: ReceiptBackend,
+        max_bytes: int = RECEIPT_MAX_BYTES,
+        chunk_size: int = RECEIPT_CHUNK_SIZE,
+    ):
+        self.backend = backend
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+
+    def save(self, fileobj: BinaryIO) -> Optional[StoredReceipt]:
+        """Store an upload (blocking; run it off the event loop). None if it is empty"""
+        digest = hashlib.sha256()
+        size = 0
+        fd, spool_path = tempfile.mkstemp(dir=self.backend.spool_dir, prefix="upload-")
+        try:
+            with os.fdopen(fd, "wb") as spool:
+                while True:
+                    chunk = fileobj.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise ReceiptTooLarge(self.max_bytes)
+                    digest.update(chunk)
+                    spool.write(chunk)
+            if size == 0:
+                return None
+            created = self.backend.put(digest.hexdigest(), spool_path)
+            return StoredReceipt(digest=digest.hexdigest(), size=size, deduplicated=not created)
+        finally:
+            if os.path.exists(spool_path):
+                os.remove(spool_path)
+
+    def read(self, receipt_url: str) -> bytes:
+        if receipt_url.startswith(RECEIPT_URL_PREFIX):
+            with self.backend.open(receipt_url[len(RECEIPT_URL_PREFIX):]) as f:
+                return f.read()
+        # Receipts uploaded before the store existed are plain file paths
+        with open(receipt_url, "rb") as f:
+            return f.read()
+
+    def collect_garbage(self, referenced: set, grace_seconds: int = RECEIPT_GC_GRACE_SECONDS, dry_run: bool = False) -> int:
+        """Delete blobs whose digest is not in ``referenced``; returns how many"""
+        cutoff = time.time() - grace_seconds
+        removed = 0
+        for digest, stored_at in list(self.backend.digests()):
+            if digest not in referenced and stored_at < cutoff:
+                if not dry_run:
+                    self.backend.delete(digest)
+                removed += 1
+        # Spool files left behind by a crashed worker
+        for entry in os.scandir(self.backend.spool_dir):
+            if entry.name.startswith("upload-") and entry.stat().st_mtime < cutoff and not dry_run:
+                os.remove(entry.path)
+        return removed
+
+
+def create_receipt_backend(name: str = RECEIPT_STORAGE_BACKEND) -> ReceiptBackend:
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown receipt storage backend: {name}")
+    return _BACKENDS[name]()
+
+
+_receipt_store: Optional[ReceiptStore] = None
+
+
+def get_receipt_store() -> ReceiptStore:
+    global _receipt_store
+    if _receipt_store is None:
+        _receipt_store = ReceiptStore(create_receipt_backend())
+    return _receipt_store
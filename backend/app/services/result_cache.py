@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+from sqlalchemy.exc import IntegrityError
+from ..database import SessionLocal
+from ..models.ai_result_cache import AIResultCache
+
+load_dotenv()
+
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", 10000))
+AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+AI_CACHE_PERSISTENT = os.getenv("AI_CACHE_PERSISTENT", "false").lower() == "true"
+
+
+def normalize_description(description: str) -> str:
+    """Descriptions that differ only in case, spacing or punctuation share a key"""
+    return " ".join(re.findall(r"\w+", (description or "").lower()))
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResultCache:
+    """Bounded LRU cache with TTL eviction and hit/miss counters.
+
+    With ``persistent`` enabled, misses fall through to the ``ai_result_cache``
+    table and new results are written there too, so cached results survive
+    restarts and are shared between workers.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        maxsize: int = AI_CACHE_MAX_ENTRIES,
+        ttl: int = AI_CACHE_TTL_SECONDS,
+        persistent: bool = AI_CACHE_PERSISTENT,
+    ):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.persistent = persistent
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Memory lookup only; use ``aget`` to fall through to the backing table"""
+        value = self._get_memory(key)
+        if value is None:
+            with self._lock:
+                self.misses += 1
+        return value
+
+    def set(self, key: str, value: Any, stored_at: Optional[float] = None):
+        with self._lock:
+            self._entries[key] = (stored_at if stored_at is not None else time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """Memory lookup, then the backing table (off the event loop)"""
+        value = self._get_memory(key)
+        if value is not None:
+            return value
+        if not self.persistent:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        row = await asyncio.to_thread(self._load, key)
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.persistent_hits += 1
+        value, stored_at = row
+        self.set(key, value, stored_at=stored_at)
+        return value
+
+    async def aset(self, key: str, value: Any):
+        self.set(key, value)
+        if self.persistent:
+            await asyncio.to_thread(self._store, key, value)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.persistent_hits + self.misses
+            return {
+                "namespace": self.namespace,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.persistent_hits) / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _get_memory(self, key: str) -> Optional[Any]:
+        """Memory lookup that counts hits; the caller decides whether a None is a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if time.time() - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+        return None
+
+    def _db_key(self, key: str) -> str:
+        # Keys can be arbitrarily long descriptions; the table stores a fixed-size digest
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def _load(self, key: str) -> Optional[tuple]:
+        db = SessionLocal()
+        try:
+            row = db.query(AIResultCache).filter(
+                AIResultCache.namespace == self.namespace,
+                AIResultCache.key == self._db_key(key),
+                AIResultCache.created_at >= datetime.utcnow() - timedelta(seconds=self.ttl)
+            ).first()
+            if not row:
+                return None
+            age = (datetime.utcnow() - row.created_at).total_seconds()
+            return json.loads(row.value), time.time() - age
+        except Exception as e:
+            print(f"Error reading {self.namespace} cache: {e}")
+            return None
+        finally:
+            db.close()
+
+    def _store(self, key: str, value: Any):
+        db = SessionLocal()
+        try:
+            db_key = self._db_key(key)
+            row = db.query(AIResultCache).filter(
+                AIResultCache.namespace == self.namespace,
+                AIResultCache.key == db_key
+            ).first()
+            if not row:
+                row = AIResultCache(namespace=self.namespace, key=db_key)
+                db.add(row)
+            row.value = json.dumps(value)
+            row.created_at = datetime.utcnow()
+            db.commit()
+        except IntegrityError:
+            # A concurrent writer inserted the same key first; its value is equivalent
+            db.rollback()
+        except Exception as e:
+            db.rollback()
+            print(f"Error writing {self.namespace} cache: {e}")
+        finally:
+            db.close()
+
+
+classification_cache = ResultCache("classification")
+ocr_cache = ResultCache("ocr")
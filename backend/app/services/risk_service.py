@@ -1,53 +1,66 @@
-from typing import Dict, List
-from sqlalchemy.orm import Session
+from collections import Counter
+from typing import Dict, List, Optional
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
 from ..models.expense import Expense
+from ..models.expense_fingerprint import ExpenseFingerprint
 from ..models.risk_score import RiskScore, RiskLevel
+from .duplicate_index import DuplicateIndex
+from .rollup_service import RollupService
 import json
+import os
 from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RISK_BATCH_SIZE = int(os.getenv("RISK_BATCH_SIZE", 5000))
+RECENT_WINDOW_DAYS = 7
 
 class RiskService:
     
     @staticmethod
-    def calculate_risk_score(expense: Expense, db: Session) -> Dict:
-        """Calculate Smart Risk Score for an expense"""
+    def score_factors(
+        converted_amount: Optional[float],
+        expense_date: datetime,
+        has_receipt: bool,
+        duplicate_count: int,
+        recent_expenses: int,
+        shared_receipt_count: int = 0
+    ) -> Dict:
+        """Score an expense from its precomputed factor inputs"""
         risk_factors = []
         score = 0
         
         # Factor 1: Amount threshold (0-30 points)
-        if expense.converted_amount:
-            if expense.converted_amount > 10000:
+        if converted_amount:
+            if converted_amount > 10000:
                 score += 30
                 risk_factors.append("High amount (>10000)")
-            elif expense.converted_amount > 5000:
+            elif converted_amount > 5000:
                 score += 20
                 risk_factors.append("Medium-high amount (>5000)")
-            elif expense.converted_amount > 1000:
+            elif converted_amount > 1000:
                 score += 10
                 risk_factors.append("Medium amount (>1000)")
         
         # Factor 2: Duplicate detection (0-25 points)
-        duplicate_count = db.query(Expense).filter(
-            Expense.user_id == expense.user_id,
-            Expense.amount == expense.amount,
-            Expense.expense_date == expense.expense_date,
-            Expense.id != expense.id
-        ).count()
-        
-        if duplicate_count > 0:
+        if duplicate_count > 0 or shared_receipt_count > 0:
             score += 25
-            risk_factors.append(f"Potential duplicate ({duplicate_count} similar expenses)")
+            if duplicate_count > 0:
+                risk_factors.append(f"Potential duplicate ({duplicate_count} similar expenses)")
+            if shared_receipt_count > 0:
+                risk_factors.append(
+                    f"Possible shared receipt ({shared_receipt_count} matching expenses from other users)"
+                )
         
         # Factor 3: Weekend/Holiday submission (0-15 points)
-        if expense.expense_date.weekday() >= 5:  # Saturday or Sunday
+        if expense_date.weekday() >= 5:  # Saturday or Sunday
             score += 15
             risk_factors.append("Weekend expense")
         
         # Factor 4: Frequency check (0-20 points)
-        recent_expenses = db.query(Expense).filter(
-            Expense.user_id == expense.user_id,
-            Expense.created_at >= datetime.utcnow() - timedelta(days=7)
-        ).count()
-        
         if recent_expenses > 10:
             score += 20
             risk_factors.append(f"High frequency ({recent_expenses} expenses in 7 days)")
@@ -56,7 +69,7 @@ class RiskService:
             risk_factors.append(f"Medium frequency ({recent_expenses} expenses in 7 days)")
         
         # Factor 5: Missing receipt (0-10 points)
-        if not expense.receipt_url:
+        if not has_receipt:
             score += 10
             risk_factors.append("No receipt uploaded")
         
@@ -74,6 +87,231 @@ class RiskService:
             "factors": json.dumps(risk_factors)
         }
     
+    @staticmethod
+    def calculate_risk_score(expense: Expense, db: Session) -> Dict:
+        """Calculate Smart Risk Score for an expense"""
+        duplicate_count, shared_receipt_count = DuplicateIndex.find_matches(expense, db)
+        recent_expenses = db.scalar(RiskService.recent_expenses(expense.user_id))
+        
+        return RiskService.score_factors(
+            expense.converted_amount,
+            expense.expense_date,
+            bool(expense.receipt_url),
+            duplicate_count,
+            recent_expenses,
+            shared_receipt_count
+        )
+    
+    @staticmethod
+    async def calculate_risk_score_async(expense: Expense, db: AsyncSession) -> Dict:
+        duplicate_count, shared_receipt_count = await DuplicateIndex.find_matches_async(expense, db)
+        recent_expenses = await db.scalar(RiskService.recent_expenses(expense.user_id))
+        
+        return RiskService.score_factors(
+            expense.converted_amount,
+            expense.expense_date,
+            bool(expense.receipt_url),
+            duplicate_count,
+            recent_expenses,
+            shared_receipt_count
+        )
+    
+    @staticmethod
+    def recent_expenses(user_id: int):
+        return select(func.count(Expense.id)).where(
+            Expense.user_id == user_id,
+            Expense.created_at >= datetime.utcnow() - timedelta(days=RECENT_WINDOW_DAYS)
+        )
+    
+    @staticmethod
+    def apply_risk_score(expense: Expense, db: Session) -> RiskScore:
+        """Calculate the risk score and create or update the expense's RiskScore row"""
+        risk_data = RiskService.calculate_risk_score(expense, db)
+        risk_score = db.query(RiskScore).filter(RiskScore.expense_id == expense.id).first()
+        if not risk_score:
+            risk_score = RiskScore(expense_id=expense.id)
+            db.add(risk_score)
+        RollupService.record_risk_change(
+            expense.company_id, risk_score.risk_level, risk_data["risk_level"], db
+        )
+        risk_score.score = risk_data["score"]
+        risk_score.risk_level = risk_data["risk_level"]
+        risk_score.factors = risk_data["factors"]
+        return risk_score
+    
+    @staticmethod
+    async def apply_risk_score_async(expense: Expense, db: AsyncSession, is_new: bool = False) -> RiskScore:
+        """``apply_risk_score`` on an AsyncSession; a new expense has no score to look up"""
+        risk_data = await RiskService.calculate_risk_score_async(expense, db)
+        risk_score = None
+        if not is_new:
+            risk_score = await db.scalar(select(RiskScore).where(RiskScore.expense_id == expense.id))
+        if not risk_score:
+            risk_score = RiskScore(expense_id=expense.id)
+            db.add(risk_score)
+        # The rollup upsert shares the sync code; its statement still awaits the async driver
+        old_level = risk_score.risk_level
+        await db.run_sync(lambda session: RollupService.record_risk_change(
+            expense.company_id, old_level, risk_data["risk_level"], session
+        ))
+        risk_score.score = risk_data["score"]
+        risk_score.risk_level = risk_data["risk_level"]
+        risk_score.factors = risk_data["factors"]
+        return risk_score
+    
+    @staticmethod
+    def rescore(
+        db: Session,
+        company_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        expense_ids: Optional[List[int]] = None,
+        batch_size: int = RISK_BATCH_SIZE,
+        commit: bool = False,
+        backfill: bool = True
+    ) -> int:
+        """Re-score a company's expenses (optionally by expense_date range) set-wise.
+
+        Users are packed into chunks of about ``batch_size`` expenses. Each
+        chunk is scored with one query (a self-join of the fingerprint index
+        for near duplicates, a grouped join for frequency) and written back
+        with bulk UPDATE/INSERT statements. With ``commit`` every chunk is
+        committed on its own. Callers that fingerprinted the expenses themselves
+        can skip the ``backfill`` scan. Returns the number of expenses scored.
+        """
+        if backfill:
+            DuplicateIndex.backfill(db, company_id)
+        
+        scope = RiskService._batch_scope(company_id, start_date, end_date)
+        counts = db.query(Expense.user_id, func.count(Expense.id)).filter(*scope)
+        if expense_ids is not None:
+            counts = counts.filter(Expense.id.in_(expense_ids))
+        counts = counts.group_by(Expense.user_id).order_by(Expense.user_id).all()
+        
+        chunks, chunk, chunk_size = [], [], 0
+        for user_id, count in counts:
+            if chunk and chunk_size + count > batch_size:
+                chunks.append(chunk)
+                chunk, chunk_size = [], 0
+            chunk.append(user_id)
+            chunk_size += count
+        if chunk:
+            chunks.append(chunk)
+        
+        scored = 0
+        for user_ids in chunks:
+            statement = RiskService._batch_factor_query(company_id, scope, user_ids, expense_ids)
+            rows = db.execute(statement).all()
+            RiskService._write_batch(db, company_id, rows)
+            scored += len(rows)
+            if commit:
+                db.commit()
+        return scored
+    
+    @staticmethod
+    def _batch_scope(
+        company_id: int,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime]
+    ) -> List:
+        scope = [Expense.company_id == company_id]
+        if start_date is not None:
+            scope.append(Expense.expense_date >= start_date)
+        if end_date is not None:
+            scope.append(Expense.expense_date <= end_date)
+        return scope
+    
+    @staticmethod
+    def _batch_factor_query(
+        company_id: int,
+        scope: List,
+        user_ids: List[int],
+        expense_ids: Optional[List[int]]
+    ):
+        factors = select(
+            Expense.id,
+            Expense.converted_amount,
+            Expense.expense_date,
+            Expense.receipt_url,
+            Expense.user_id
+        ).where(*scope, Expense.user_id.in_(user_ids))
+        if expense_ids is not None:
+            # Filter before the self-join, not after it
+            factors = factors.where(Expense.id.in_(expense_ids))
+        factors = factors.subquery()
+        
+        # Near-duplicate counts from a self-join of the fingerprint index
+        probe = aliased(ExpenseFingerprint)
+        other = aliased(ExpenseFingerprint)
+        if expense_ids is not None:
+            # Look explicit ids up by expense_id rather than scanning the company
+            probes = [probe.expense_id.in_(expense_ids)]
+        else:
+            probes = [
+                probe.company_id == company_id,
+                probe.user_id.in_(user_ids),
+                probe.expense_id.in_(select(factors.c.id))
+            ]
+        matches = select(
+            probe.expense_id,
+            func.sum(case((other.user_id == probe.user_id, 1), else_=0)).label("duplicate_count"),
+            func.sum(case((other.user_id != probe.user_id, 1), else_=0)).label("shared_receipt_count")
+        ).join(
+            other, DuplicateIndex.match_condition(probe, other)
+        ).where(*probes).group_by(probe.expense_id).subquery()
+        
+        recent = select(
+            Expense.user_id, func.count(Expense.id).label("recent_expenses")
+        ).where(
+            Expense.user_id.in_(user_ids),
+            Expense.created_at >= datetime.utcnow() - timedelta(days=RECENT_WINDOW_DAYS)
+        ).group_by(Expense.user_id).subquery()
+        
+        statement = select(
+            factors.c.id,
+            factors.c.converted_amount,
+            factors.c.expense_date,
+            factors.c.receipt_url,
+            func.coalesce(matches.c.duplicate_count, 0),
+            func.coalesce(matches.c.shared_receipt_count, 0),
+            func.coalesce(recent.c.recent_expenses, 0),
+            RiskScore.id,
+            RiskScore.risk_level
+        ).outerjoin(
+            matches, matches.c.expense_id == factors.c.id
+        ).outerjoin(
+            recent, recent.c.user_id == factors.c.user_id
+        ).outerjoin(
+            RiskScore, RiskScore.expense_id == factors.c.id
+        ).order_by(factors.c.id)
+        return statement
+    
+    @staticmethod
+    def _write_batch(db: Session, company_id: int, rows):
+        updates, inserts = [], []
+        level_deltas = Counter()
+        for (expense_id, converted_amount, expense_date, receipt_url,
+             duplicate_count, shared_receipt_count, recent_expenses,
+             risk_score_id, old_level) in rows:
+            risk_data = RiskService.score_factors(
+                converted_amount, expense_date, bool(receipt_url),
+                duplicate_count, recent_expenses, shared_receipt_count
+            )
+            if risk_score_id is None:
+                inserts.append({"expense_id": expense_id, **risk_data})
+            else:
+                updates.append({"id": risk_score_id, **risk_data})
+            if old_level != risk_data["risk_level"]:
+                if old_level is not None:
+                    level_deltas[old_level] -= 1
+                level_deltas[risk_data["risk_level"]] += 1
+        
+        if updates:
+            db.execute(update(RiskScore), updates)
+        if inserts:
+            db.execute(insert(RiskScore), inserts)
+        RollupService.record_risk_deltas(company_id, level_deltas, db)
+    
     @staticmethod
     def get_gamified_message(risk_level: RiskLevel, user_name: str) -> str:
         """Generate gamified compliance message"""
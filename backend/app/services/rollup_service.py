@@ -0,0 +1,212 @@
+from collections import defaultdict
+from typing import Dict, Iterable, Optional
+from sqlalchemy import func, extract, select, cast, Integer
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from ..models.expense import Expense, ExpenseStatus
+from ..models.risk_score import RiskScore, RiskLevel
+from ..models.spend_rollup import SpendRollup, VendorRollup, RiskRollup
+
+_UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+class RollupService:
+    """Keeps the dashboard rollup tables in step with expense writes.
+
+    Every method only adds statements to the caller's session, so rollups
+    commit (or roll back) together with the change they describe.
+    """
+
+    @staticmethod
+    def record_expense(expense: Expense, db: Session, sign: int = 1):
+        """Count a new expense (or remove one with sign=-1)"""
+        amount = (expense.converted_amount or 0) * sign
+        RollupService._increment(db, SpendRollup, {
+            "company_id": expense.company_id,
+            "year": expense.expense_date.year,
+            "month": expense.expense_date.month,
+            "category": expense.category,
+            "status": expense.status or ExpenseStatus.PENDING
+        }, amount, sign)
+        if expense.vendor:
+            RollupService._increment(db, VendorRollup, {
+                "company_id": expense.company_id,
+                "vendor": expense.vendor
+            }, amount, sign)
+
+    @staticmethod
+    def record_expenses(expenses: Iterable[Expense], db: Session):
+        """Count a batch of new expenses with one upsert per touched bucket"""
+        spend = defaultdict(lambda: [0.0, 0])
+        vendors = defaultdict(lambda: [0.0, 0])
+        for expense in expenses:
+            amount = expense.converted_amount or 0
+            key = (expense.company_id, expense.expense_date.year, expense.expense_date.month,
+                   expense.category, expense.status or ExpenseStatus.PENDING)
+            spend[key][0] += amount
+            spend[key][1] += 1
+            if expense.vendor:
+                vendors[(expense.company_id, expense.vendor)][0] += amount
+                vendors[(expense.company_id, expense.vendor)][1] += 1
+        
+        RollupService._increment_many(db, SpendRollup, [
+            ({"company_id": company_id, "year": year, "month": month,
+              "category": category, "status": status}, amount, count)
+            for (company_id, year, month, category, status), (amount, count) in spend.items()
+        ])
+        RollupService._increment_many(db, VendorRollup, [
+            ({"company_id": company_id, "vendor": vendor}, amount, count)
+            for (company_id, vendor), (amount, count) in vendors.items()
+        ])
+
+    @staticmethod
+    def record_status_change(expense: Expense, old_status: ExpenseStatus, db: Session):
+        if old_status == expense.status:
+            return
+        bucket = {
+            "company_id": expense.company_id,
+            "year": expense.expense_date.year,
+            "month": expense.expense_date.month,
+            "category": expense.category
+        }
+        amount = expense.converted_amount or 0
+        RollupService._increment(db, SpendRollup, {**bucket, "status": old_status}, -amount, -1)
+        RollupService._increment(db, SpendRollup, {**bucket, "status": expense.status}, amount, 1)
+
+    @staticmethod
+    def record_vendor_change(expense: Expense, old_vendor: Optional[str], db: Session):
+        if old_vendor == expense.vendor:
+            return
+        amount = expense.converted_amount or 0
+        if old_vendor:
+            RollupService._increment(db, VendorRollup, {
+                "company_id": expense.company_id, "vendor": old_vendor
+            }, -amount, -1)
+        if expense.vendor:
+            RollupService._increment(db, VendorRollup, {
+                "company_id": expense.company_id, "vendor": expense.vendor
+            }, amount, 1)
+
+    @staticmethod
+    def record_risk_change(
+        company_id: int,
+        old_level: Optional[RiskLevel],
+        new_level: RiskLevel,
+        db: Session
+    ):
+        if old_level == new_level:
+            return
+        if old_level is not None:
+            RollupService._increment(db, RiskRollup, {
+                "company_id": company_id, "risk_level": old_level
+            }, None, -1)
+        RollupService._increment(db, RiskRollup, {
+            "company_id": company_id, "risk_level": new_level
+        }, None, 1)
+
+    @staticmethod
+    def record_risk_deltas(company_id: int, deltas: Dict[RiskLevel, int], db: Session):
+        """Apply net per-level count changes from a batch of re-scored expenses"""
+        for level, delta in deltas.items():
+            if delta:
+                RollupService._increment(db, RiskRollup, {
+                    "company_id": company_id, "risk_level": level
+                }, None, delta)
+
+    @staticmethod
+    def rebuild(db: Session, company_id: Optional[int] = None):
+        """Recompute all rollups (for one company) from the source tables"""
+        for model in (SpendRollup, VendorRollup, RiskRollup):
+            query = db.query(model)
+            if company_id is not None:
+                query = query.filter(model.company_id == company_id)
+            query.delete(synchronize_session=False)
+
+        def scoped(statement):
+            if company_id is not None:
+                return statement.where(Expense.company_id == company_id)
+            return statement
+
+        year = cast(extract("year", Expense.expense_date), Integer)
+        month = cast(extract("month", Expense.expense_date), Integer)
+        spend = scoped(select(
+            Expense.company_id, year, month, Expense.category, Expense.status,
+            func.coalesce(func.sum(Expense.converted_amount), 0), func.count(Expense.id)
+        )).group_by(Expense.company_id, year, month, Expense.category, Expense.status)
+        db.execute(SpendRollup.__table__.insert().from_select(
+            ["company_id", "year", "month", "category", "status", "total_amount", "expense_count"],
+            spend
+        ))
+
+        vendors = scoped(select(
+            Expense.company_id, Expense.vendor,
+            func.coalesce(func.sum(Expense.converted_amount), 0), func.count(Expense.id)
+        ).where(Expense.vendor.isnot(None))).group_by(Expense.company_id, Expense.vendor)
+        db.execute(VendorRollup.__table__.insert().from_select(
+            ["company_id", "vendor", "total_amount", "expense_count"],
+            vendors
+        ))
+
+        risks = scoped(select(
+            Expense.company_id, RiskScore.risk_level, func.count(RiskScore.id)
+        ).join(RiskScore, RiskScore.expense_id == Expense.id)).group_by(
+            Expense.company_id, RiskScore.risk_level
+        )
+        db.execute(RiskRollup.__table__.insert().from_select(
+            ["company_id", "risk_level", "expense_count"],
+            risks
+        ))
+
+    @staticmethod
+    def _increment(db: Session, model, bucket: Dict, amount: Optional[float], count: int):
+        values = {"expense_count": count}
+        if amount is not None:
+            values["total_amount"] = amount
+
+        insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+        if insert is not None:
+            # Atomic read-modify-write, safe under concurrent submissions
+            statement = insert(model).values(**bucket, **values)
+            statement = statement.on_conflict_do_update(
+                index_elements=list(bucket.keys()),
+                set_={
+                    column: getattr(model, column) + getattr(statement.excluded, column)
+                    for column in values
+                }
+            )
+            db.execute(statement)
+            return
+
+        row = db.query(model).filter_by(**bucket).with_for_update().first()
+        if row is None:
+            db.add(model(**bucket, **values))
+            db.flush()
+        else:
+            for column, delta in values.items():
+                setattr(row, column, getattr(row, column) + delta)
+
+    @staticmethod
+    def _increment_many(db: Session, model, increments):
+        """Apply (bucket, amount, count) increments, all buckets distinct, in one upsert"""
+        if not increments:
+            return
+        insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+        if insert is None:
+            for bucket, amount, count in increments:
+                RollupService._increment(db, model, bucket, amount, count)
+            return
+
+        statement = insert(model).values([
+            {**bucket, "total_amount": amount, "expense_count": count}
+            for bucket, amount, count in increments
+        ])
+        statement = statement.on_conflict_do_update(
+            index_elements=list(increments[0][0].keys()),
+            set_={
+                column: getattr(model, column) + getattr(statement.excluded, column)
+                for column in ("total_amount", "expense_count")
+            }
+        )
+        db.execute(statement)
@@ -0,0 +1,311 @@
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from pydantic import BaseModel
+from sqlalchemy import case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from ..models.approval import Approval, ApprovalStatus, ApprovalType, ApprovalWorkflow
+
+load_dotenv()
+
+WORKFLOW_CACHE_TTL_SECONDS = float(os.getenv("WORKFLOW_CACHE_TTL_SECONDS", 60))
+
+# Step entry that resolves to the submitter's manager
+MANAGER_STEP = "manager"
+
+StepEntry = Union[str, int]
+
+
+class CompiledWorkflow(BaseModel):
+    """An active workflow with its steps parsed, detached from any DB session"""
+    id: int
+    name: str
+    approval_type: ApprovalType
+    min_amount: float
+    max_amount: Optional[float]
+    percentage_required: Optional[float]
+    specific_approver_id: Optional[int]
+    steps: Tuple[StepEntry, ...]
+
+    class Config:
+        frozen = True
+
+    @classmethod
+    def from_workflow(cls, workflow: ApprovalWorkflow) -> "CompiledWorkflow":
+        return cls(
+            id=workflow.id,
+            name=workflow.name,
+            approval_type=workflow.approval_type,
+            min_amount=workflow.min_amount or 0.0,
+            max_amount=workflow.max_amount,
+            percentage_required=workflow.percentage_required,
+            specific_approver_id=workflow.specific_approver_id,
+            steps=tuple(parse_steps(workflow.steps))
+        )
+
+    @property
+    def is_group(self) -> bool:
+        """Percentage and hybrid workflows are one step decided by a vote"""
+        return self.approval_type in (ApprovalType.PERCENTAGE, ApprovalType.HYBRID)
+
+    def build_chain(self, submitter_id: int, manager_id: Optional[int]) -> List[Dict]:
+        """(approver_id, workflow_step) rows for one expense, without expense_id"""
+        if self.approval_type == ApprovalType.SPECIFIC_APPROVER:
+            entries: Sequence[StepEntry] = (self.specific_approver_id,)
+        elif self.approval_type == ApprovalType.HYBRID:
+            entries = self.steps + (self.specific_approver_id,)
+        else:
+            entries = self.steps
+
+        chain = []
+        seen = set()
+        for entry in entries:
+            approver_id = manager_id if entry == MANAGER_STEP else entry
+            # Nobody approves their own expense, or votes twice in a group
+            if approver_id is None or approver_id == submitter_id or approver_id in seen:
+                continue
+            seen.add(approver_id)
+            step = 1 if self.is_group else len(chain) + 1
+            chain.append({"approver_id": approver_id, "workflow_step": step})
+        return chain
+
+
+def parse_steps(steps: Optional[str]) -> List[StepEntry]:
+    """Step entries from the JSON ``steps`` column: user ids or "manager\""""
+    if not steps:
+        return []
+    try:
+        entries = json.loads(steps)
+    except ValueError as e:
+        print(f"Error parsing workflow steps: {e}")
+        return []
+    if not isinstance(entries, list):
+        return []
+    return [e for e in entries if e == MANAGER_STEP or (isinstance(e, int) and not isinstance(e, bool))]
+
+
+class CompiledWorkflows:
+    """A company's active workflows as disjoint amount ranges.
+
+    Each workflow covers ``[min_amount, max_amount)``; an open ``max_amount``
+    runs to infinity. Where ranges overlap the narrowest one wins, then the
+    newest. Overlaps are resolved here, once, so ``match`` is a bisect over
+    sorted range starts.
+    """
+
+    def __init__(self, workflows: Sequence[CompiledWorkflow]):
+        self.by_id: Dict[int, CompiledWorkflow] = {w.id: w for w in workflows}
+        self._starts: List[float] = []
+        self._ends: List[float] = []
+        self._winners: List[CompiledWorkflow] = []
+
+        bounds = sorted({w.min_amount for w in workflows} | {w.max_amount for w in workflows if w.max_amount is not None})
+        bounds.append(math.inf)
+        precedence = sorted(
+            workflows,
+            key=lambda w: ((w.max_amount if w.max_amount is not None else math.inf) - w.min_amount, -w.id)
+        )
+        for start, end in zip(bounds, bounds[1:]):
+            winner = next(
+                (w for w in precedence
+                 if w.min_amount <= start and (w.max_amount is None or end <= w.max_amount)),
+                None
+            )
+            if winner is None:
+                continue
+            # Adjacent pieces of the same workflow merge into one range
+            if self._winners and self._winners[-1].id == winner.id and self._ends[-1] == start:
+                self._ends[-1] = end
+                continue
+            self._starts.append(start)
+            self._ends.append(end)
+            self._winners.append(winner)
+
+    def match(self, amount: float) -> Optional[CompiledWorkflow]:
+        position = bisect.bisect_right(self._starts, amount) - 1
+        if position < 0 or amount >= self._ends[position]:
+            return None
+        return self._winners[position]
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+
+class StepTally(BaseModel):
+    """Votes cast on one workflow step of an expense"""
+    total: int
+    approved: int
+    rejected: int
+    specific_total: int
+    specific_approved: int
+    specific_rejected: int
+
+    def outcome(self, workflow: CompiledWorkflow) -> Optional[ApprovalStatus]:
+        """APPROVED or REJECTED once the vote is decided, None while it is open"""
+        percentage = workflow.percentage_required if workflow.percentage_required is not None else 100.0
+        required = max(1, math.ceil(self.total * percentage / 100 - 1e-9))
+        hybrid = workflow.approval_type == ApprovalType.HYBRID
+
+        if self.approved >= required or (hybrid and self.specific_approved):
+            return ApprovalStatus.APPROVED
+        percentage_lost = self.total - self.rejected < required
+        specific_lost = not hybrid or not self.specific_total or self.specific_rejected > 0
+        if percentage_lost and specific_lost:
+            return ApprovalStatus.REJECTED
+        return None
+
+
+class WorkflowEngine:
+    """Compiled approval workflows, cached per company.
+
+    Workflow writes invalidate their company's entry after committing; that
+    only reaches this process, so ``ttl`` bounds how long a change made
+    through another worker can go unseen.
+    """
+
+    def __init__(self, ttl: float = WORKFLOW_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._entries: Dict[int, Tuple[float, CompiledWorkflows]] = {}
+        self._generations: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def for_company(self, company_id: int, db: Session) -> CompiledWorkflows:
+        compiled, generation = self._lookup(company_id)
+        if compiled is None:
+            rows = db.scalars(self._active(company_id)).all()
+            compiled = self._store(company_id, generation, rows)
+        return compiled
+
+    async def for_company_async(self, company_id: int, db: AsyncSession) -> CompiledWorkflows:
+        compiled, generation = self._lookup(company_id)
+        if compiled is None:
+            rows = (await db.scalars(self._active(company_id))).all()
+            compiled = self._store(company_id, generation, rows)
+        return compiled
+
+    async def workflow_for_async(self, company_id: int, workflow_id: int, db: AsyncSession) -> Optional[CompiledWorkflow]:
+        """Rules of the workflow an expense was routed through, even if since deactivated"""
+        compiled = await self.for_company_async(company_id, db)
+        workflow = compiled.by_id.get(workflow_id)
+        if workflow is None:
+            row = await db.get(ApprovalWorkflow, workflow_id)
+            workflow = CompiledWorkflow.from_workflow(row) if row else None
+        return workflow
+
+    def invalidate(self, company_id: int):
+        with self._lock:
+            self._generations[company_id] = self._generations.get(company_id, 0) + 1
+            self._entries.pop(company_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "companies": len(self._entries),
+                "workflows": sum(len(compiled) for _, compiled in self._entries.values()),
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    @staticmethod
+    def chain_for(
+        compiled: CompiledWorkflows, amount: Optional[float], submitter_id: int, manager_id: Optional[int]
+    ) -> Tuple[Optional[int], List[Dict]]:
+        """(workflow id, approval rows) for a new expense; the manager alone when nothing matches"""
+        workflow = compiled.match(amount or 0.0)
+        if workflow is not None:
+            chain = workflow.build_chain(submitter_id, manager_id)
+            if chain:
+                return workflow.id, chain
+        if manager_id is None:
+            return None, []
+        return None, [{"approver_id": manager_id, "workflow_step": 1}]
+
+    @staticmethod
+    async def tally_async(
+        db: AsyncSession, expense_id: int, workflow_step: int, specific_approver_id: Optional[int]
+    ) -> StepTally:
+        """Count one step's votes in a single aggregate query"""
+        approved = Approval.status == ApprovalStatus.APPROVED
+        rejected = Approval.status == ApprovalStatus.REJECTED
+        specific = Approval.approver_id == specific_approver_id
+
+        def count(condition):
+            return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+        row = (await db.execute(
+            select(
+                func.count(), count(approved), count(rejected),
+                count(specific), count(approved & specific), count(rejected & specific)
+            ).where(Approval.expense_id == expense_id, Approval.workflow_step == workflow_step)
+        )).one()
+        return StepTally(
+            total=row[0], approved=row[1], rejected=row[2],
+            specific_total=row[3], specific_approved=row[4], specific_rejected=row[5]
+        )
+
+    @staticmethod
+    async def next_step_async(db: AsyncSession, expense_id: int, after_step: int) -> Optional[int]:
+        """Lowest step after ``after_step`` still waiting on someone"""
+        return await db.scalar(select(func.min(Approval.workflow_step)).where(
+            Approval.expense_id == expense_id,
+            Approval.workflow_step > after_step,
+            Approval.status == ApprovalStatus.PENDING
+        ))
+
+    @staticmethod
+    async def skip_pending_async(db: AsyncSession, expense_id: int, step: int, later_steps: bool):
+        """Close the votes left on a decided step, and on every later step once the expense is decided"""
+        pending = (Approval.expense_id == expense_id, Approval.status == ApprovalStatus.PENDING)
+        await db.execute(update(Approval).where(*pending, Approval.workflow_step == step).values(
+            status=ApprovalStatus.SKIPPED, comments="Skipped: step decided by other approvers"
+        ))
+        if later_steps:
+            await db.execute(update(Approval).where(*pending, Approval.workflow_step > step).values(
+                status=ApprovalStatus.SKIPPED, comments="Skipped: expense decided at an earlier step"
+            ))
+
+    @staticmethod
+    def _active(company_id: int):
+        return select(ApprovalWorkflow).where(
+            ApprovalWorkflow.company_id == company_id,
+            ApprovalWorkflow.is_active.is_(True)
+        )
+
+    def _lookup(self, company_id: int) -> Tuple[Optional[CompiledWorkflows], int]:
+        with self._lock:
+            entry = self._entries.get(company_id)
+            if entry is not None and time.time() - entry[0] <= self.ttl:
+                self.hits += 1
+                return entry[1], 0
+            self.misses += 1
+            return None, self._generations.get(company_id, 0)
+
+    def _store(self, company_id: int, generation: int, rows) -> CompiledWorkflows:
+        compiled = CompiledWorkflows([CompiledWorkflow.from_workflow(row) for row in rows])
+        with self._lock:
+            # Only store if the company's workflows didn't change while we loaded
+            if self._generations.get(company_id, 0) == generation:
+                self._entries[company_id] = (time.time(), compiled)
+        return compiled
+
+
+_workflow_engine = WorkflowEngine()
+
+
+def get_workflow_engine() -> WorkflowEngine:
+    return _workflow_engine
@@ -0,0 +1,260 @@
+"""Throughput of the sync and async database paths under concurrent load.
+
+Runs the expense create and list handlers in one event loop, the way a
+single uvicorn worker does, in three modes:
+
+- ``sync``: sync Session work inside an ``async def`` handler, the shape
+  create_expense had before the async engine; every query blocks the loop
+- ``threadpool``: the same sync work on the anyio thread pool, where
+  FastAPI runs plain ``def`` routes
+- ``async``: the async routes on AsyncSession
+
+Besides throughput and latency it reports event loop lag: how late a 10 ms
+heartbeat wakes up, i.e. how long every other request on the worker waits.
+
+Run from backend/ against a scratch database (it adds a benchmark company):
+
+    python -m benchmarks.async_db --concurrency 50 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+from anyio import to_thread
+from fastapi import Response
+from sqlalchemy.orm import joinedload, selectinload
+from app.database import SessionLocal, AsyncSessionLocal, DATABASE_URL, dispose_async_engines, pool_stats
+from app.migrate import upgrade_database
+from app.models.company import Company
+from app.models.user import User, UserRole
+from app.models.expense import Expense, ExpenseStatus, ExpenseCategory
+from app.models.approval import Approval
+from app.routers import expenses
+from app.services.principal_cache import Principal
+from app.services.risk_service import RiskService
+from app.services.rollup_service import RollupService
+from app.services.duplicate_index import DuplicateIndex
+from app.services.enrichment_service import get_enrichment_queue
+from app.services.dashboard_cache import get_dashboard_cache
+
+BENCHMARK_COMPANY = "Async DB Benchmark"
+HEARTBEAT_SECONDS = 0.01
+MODES = ("sync", "threadpool", "async")
+WORKLOADS = ("create", "list")
+
+
+def setup_company(employees: int) -> List[Principal]:
+    """Benchmark company with a manager and ``employees`` reports; returns the employees"""
+    db = SessionLocal()
+    try:
+        company = db.query(Company).filter(Company.name == BENCHMARK_COMPANY).first()
+        if company is None:
+            company = Company(name=BENCHMARK_COMPANY, country="United States", currency="USD")
+            db.add(company)
+            db.flush()
+            manager = User(
+                email="manager@async-benchmark.test", hashed_password="!", full_name="Benchmark Manager",
+                role=UserRole.MANAGER, company_id=company.id
+            )
+            db.add(manager)
+            db.flush()
+            db.add_all([
+                User(
+                    email=f"employee{i}@async-benchmark.test", hashed_password="!",
+                    full_name=f"Benchmark Employee {i}", role=UserRole.EMPLOYEE,
+                    company_id=company.id, manager_id=manager.id
+                )
+                for i in range(employees)
+            ])
+            db.commit()
+
+        users = db.query(User).options(
+            joinedload(User.company), selectinload(User.subordinates)
+        ).filter(User.company_id == company.id, User.role == UserRole.EMPLOYEE).order_by(User.id).all()
+        return [Principal.from_user(user) for user in users]
+    finally:
+        db.close()
+
+
+def _expense_fields(i: int) -> Dict:
+    return {
+        "amount": 20 + i % 500,
+        "currency": "USD",
+        "category": ExpenseCategory.MEALS,
+        "description": f"Benchmark lunch {i}",
+        "expense_date": (datetime(2024, 1, 1) + timedelta(days=i % 365)).isoformat(),
+        "vendor": f"Vendor {i % 50}",
+    }
+
+
+def create_expense_sync(principal: Principal, i: int):
+    """create_expense as it ran on a sync Session"""
+    fields = _expense_fields(i)
+    db = SessionLocal()
+    try:
+        expense = Expense(
+            user_id=principal.id,
+            company_id=principal.company_id,
+            amount=fields["amount"],
+            currency=fields["currency"],
+            converted_amount=fields["amount"],
+            category=fields["category"],
+            description=fields["description"],
+            expense_date=datetime.fromisoformat(fields["expense_date"]),
+            vendor=fields["vendor"],
+            status=ExpenseStatus.PENDING
+        )
+        db.add(expense)
+        db.flush()
+        RollupService.record_expense(expense, db)
+        DuplicateIndex.record(expense, db)
+        RiskService.apply_risk_score(expense, db)
+        if principal.manager_id:
+            db.add(Approval(expense_id=expense.id, approver_id=principal.manager_id, workflow_step=1))
+        get_enrichment_queue().enqueue(expense, db)
+        db.commit()
+        db.refresh(expense)
+        get_dashboard_cache().invalidate_expense_writes(expense.company_id, expense.user_id)
+    finally:
+        db.close()
+
+
+def list_expenses_sync(principal: Principal, i: int):
+    db = SessionLocal()
+    try:
+        db.scalars(expenses.visible_expenses(principal).order_by(
+            Expense.created_at.desc(), Expense.id.desc()
+        ).limit(expenses.DEFAULT_PAGE_SIZE + 1)).all()
+    finally:
+        db.close()
+
+
+async def create_expense_async(principal: Principal, i: int):
+    async with AsyncSessionLocal() as db:
+        await expenses.create_expense(
+            **_expense_fields(i), receipt=None, current_user=principal, db=db
+        )
+
+
+async def list_expenses_async(principal: Principal, i: int):
+    async with AsyncSessionLocal() as db:
+        await expenses.get_expenses(
+            response=Response(), filters=expenses.ExpenseFilters(), cursor=None,
+            limit=expenses.DEFAULT_PAGE_SIZE, include_total=False, current_user=principal, db=db
+        )
+
+
+def handler(mode: str, workload: str) -> Callable:
+    """An async request handler running ``workload`` in ``mode``"""
+    if mode == "async":
+        return create_expense_async if workload == "create" else list_expenses_async
+
+    sync_fn = create_expense_sync if workload == "create" else list_expenses_sync
+    if mode == "threadpool":
+        async def run(principal, i):
+            await to_thread.run_sync(sync_fn, principal, i)
+    else:
+        async def run(principal, i):
+            sync_fn(principal, i)
+    return run
+
+
+def _percentile(samples: List[float], p: float) -> float:
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 2)
+
+
+async def run_load(mode: str, workload: str, principals: List[Principal], requests: int, concurrency: int) -> Dict:
+    run = handler(mode, workload)
+    latencies: List[float] = []
+    lags: List[float] = []
+    errors = 0
+    next_request = 0
+    done = asyncio.Event()
+
+    async def heartbeat():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            lags.append(max(0.0, time.perf_counter() - started - HEARTBEAT_SECONDS))
+
+    async def client():
+        nonlocal next_request, errors
+        while next_request < requests:
+            i = next_request
+            next_request += 1
+            started = time.perf_counter()
+            try:
+                await run(principals[i % len(principals)], i)
+            except Exception as e:
+                errors += 1
+                if errors == 1:
+                    print(f"Error in {mode}/{workload}: {e}")
+            latencies.append(time.perf_counter() - started)
+
+    beat = asyncio.create_task(heartbeat())
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await beat
+
+    return {
+        "mode": mode,
+        "workload": workload,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "latency_ms": {
+            "p50": _percentile(latencies, 0.50),
+            "p95": _percentile(latencies, 0.95),
+            "p99": _percentile(latencies, 0.99),
+        },
+        "loop_lag_ms": {
+            "p95": _percentile(lags, 0.95),
+            "max": _percentile(lags, 1.0),
+        },
+    }
+
+
+async def main(args):
+    principals = setup_company(args.employees)
+    results = []
+    for workload in args.workloads:
+        for mode in args.modes:
+            # Warm the pools, caches and compiled statements outside the measurement
+            await run_load(mode, workload, principals, min(args.concurrency, args.requests), args.concurrency)
+            result = await run_load(mode, workload, principals, args.requests, args.concurrency)
+            results.append(result)
+            if not args.json:
+                print(
+                    f"{workload:<7} {mode:<11} {result['throughput_rps']:>8.1f} req/s  "
+                    f"p50 {result['latency_ms']['p50']:>8.2f} ms  p95 {result['latency_ms']['p95']:>8.2f} ms  "
+                    f"loop lag max {result['loop_lag_ms']['max']:>8.2f} ms  errors {result['errors']}"
+                )
+    if args.json:
+        print(json.dumps({"database": args.database, "results": results, "pools": pool_stats()}, indent=2))
+    # aiosqlite connections each hold a thread that would keep the process alive
+    await dispose_async_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare sync and async database paths under concurrent load")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per mode and workload")
+    parser.add_argument("--concurrency", type=int, default=50, help="Requests in flight at once")
+    parser.add_argument("--employees", type=int, default=20, help="Submitters to spread the load over")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument("--no-migrate", action="store_true", help="Skip upgrading the schema first")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+    args.database = DATABASE_URL.split("@")[-1]
+    if not args.no_migrate:
+        upgrade_database()
+    asyncio.run(main(args))
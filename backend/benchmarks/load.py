@@ -0,0 +1,498 @@
+"""End-to-end load benchmark: the real app, a seeded database and local upstreams.
+
+Starts benchmarks.stubs in place of exchangerate-api, REST Countries and
+Hugging Face, seeds the benchmark company (benchmarks.seed), starts the app
+under uvicorn pointed at both, and drives a weighted mix of requests from
+``--concurrency`` closed-loop clients. Each client's request sequence comes
+from ``--seed``, so two runs with the same arguments send the same mix.
+
+Per operation it reports throughput, latency p50/p95/p99 and SQL queries per
+request, read from the app's Server-Timing header, plus outbound calls from
+/metrics and the pool stats. ``--output`` writes the results as JSON;
+``--baseline`` compares against an earlier file and ``--max-regression``
+fails the run if p95 latency or queries per request got worse by more than
+that percentage:
+
+    python -m benchmarks.load --duration 30 --output before.json
+    python -m benchmarks.load --duration 30 --baseline before.json --max-regression 10
+
+Without ``--database-url`` every run starts from a fresh SQLite file; give
+it a scratch PostgreSQL database to benchmark what production runs. Runs
+against the same database are only comparable when it is reset in between.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import re
+import secrets
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Optional
+import httpx
+from .tenant import BENCHMARK_PASSWORD, benchmark_email
+from .stubs import DEFAULT_LATENCY_MS
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+RESULTS_VERSION = 1
+
+# Operation -> weight; weights are relative
+DEFAULT_MIX = {
+    "list_expenses": 30,
+    "pending_approvals": 20,
+    "dashboard": 15,
+    "create_expense": 20,
+    "create_with_receipt": 5,
+    "approve": 10,
+}
+# Settings two runs must share for their numbers to be compared
+COMPARABLE_CONFIG = ("database", "concurrency", "workers", "mix", "upstream_latency_ms", "upstream_jitter_ms")
+PAGE_SIZE = 50
+RECEIPT_VARIANTS = 200
+
+SERVER_TIMING_DB = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+EXTERNAL_COUNT = re.compile(
+    r'spendsense_external_call_duration_seconds_count\{target="([^"]+)",outcome="([^"]+)"\} (\d+)'
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown operation {name!r}; choose from {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def _percentile(samples: List[float], p: float) -> float:
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _receipts(count: int) -> List[bytes]:
+    """Distinct small PNGs, so the content-addressed store and OCR cache see new files"""
+    from PIL import Image, ImageDraw
+
+    receipts = []
+    for i in range(count):
+        image = Image.new("L", (240, 120), color=255)
+        ImageDraw.Draw(image).text((10, 10), f"CORNER BISTRO\nReceipt {i}\nTotal $ {10 + i}.50", fill=0)
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        receipts.append(buffer.getvalue())
+    return receipts
+
+
+class Sample:
+    __slots__ = ("operation", "seconds", "ok", "queries", "db_ms")
+
+    def __init__(self, operation: str, seconds: float, ok: bool, queries: Optional[int], db_ms: Optional[float]):
+        self.operation = operation
+        self.seconds = seconds
+        self.ok = ok
+        self.queries = queries
+        self.db_ms = db_ms
+
+
+class Workload:
+    """Who sends what: tokens per role, receipts and the managers' approval queues"""
+
+    def __init__(self, client: httpx.AsyncClient, mix: Dict[str, float], seed: int):
+        self.client = client
+        self.mix = mix
+        self.seed = seed
+        self.admin: Dict[str, str] = {}
+        self.managers: List[Dict[str, str]] = []
+        self.employees: List[Dict[str, str]] = []
+        self.approval_queues: List[Deque[int]] = []
+        self.receipts: List[bytes] = []
+
+    async def _login(self, email: str) -> Dict[str, str]:
+        response = await self.client.post("/auth/login", json={"email": email, "password": BENCHMARK_PASSWORD})
+        response.raise_for_status()
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def prepare(self, managers: int, employees: int):
+        # One at a time: bcrypt runs in a bounded pool that sheds a burst of logins with 503s
+        self.admin = await self._login(benchmark_email("admin"))
+        self.managers = [await self._login(benchmark_email("manager", i)) for i in range(managers)]
+        self.employees = [await self._login(benchmark_email("employee", i)) for i in range(employees)]
+        for headers in self.managers:
+            response = await self.client.get("/approvals/pending", params={"limit": 1000}, headers=headers)
+            response.raise_for_status()
+            self.approval_queues.append(deque(item["approval"]["id"] for item in response.json()))
+        if self.mix.get("create_with_receipt"):
+            self.receipts = await asyncio.to_thread(_receipts, RECEIPT_VARIANTS)
+
+    def _expense_form(self, rng: random.Random) -> Dict[str, str]:
+        return {
+            "amount": f"{rng.uniform(5, 500):.2f}",
+            "currency": "USD" if rng.random() < 0.9 else rng.choice(["EUR", "GBP", "INR"]),
+            "category": rng.choice(["meals", "travel", "transportation", "office_supplies"]),
+            "description": rng.choice(["Client lunch", "Taxi to office", "Train ticket", "Team snacks", "Misc"]),
+            "expense_date": (datetime.utcnow() - timedelta(days=rng.randrange(30))).date().isoformat(),
+            "vendor": rng.choice(["Corner Bistro", "MetroCab", "RailLink", "OfficeHub"]),
+        }
+
+    async def request(self, operation: str, rng: random.Random) -> httpx.Response:
+        client = self.client
+        if operation == "list_expenses":
+            headers = rng.choice(self.employees + self.managers)
+            return await client.get("/expenses/", params={"limit": PAGE_SIZE}, headers=headers)
+        if operation == "pending_approvals":
+            return await client.get("/approvals/pending", params={"limit": PAGE_SIZE}, headers=rng.choice(self.managers))
+        if operation == "dashboard":
+            return await client.get("/analytics/dashboard", headers=self.admin)
+        if operation == "create_expense":
+            return await client.post("/expenses/", data=self._expense_form(rng), headers=rng.choice(self.employees))
+        if operation == "create_with_receipt":
+            receipt = rng.choice(self.receipts)
+            return await client.post(
+                "/expenses/", data=self._expense_form(rng), files={"receipt": ("receipt.png", receipt, "image/png")},
+                headers=rng.choice(self.employees)
+            )
+        if operation == "approve":
+            i = rng.randrange(len(self.managers))
+            queue = self.approval_queues[i]
+            if not queue:
+                # Inbox drained: measure reading it instead of failing
+                return await client.get("/approvals/pending", params={"limit": PAGE_SIZE}, headers=self.managers[i])
+            return await client.put(
+                f"/approvals/{queue.popleft()}", json={"status": "approved", "comments": "Benchmark"},
+                headers=self.managers[i]
+            )
+        raise ValueError(f"Unknown operation {operation}")
+
+    async def run(self, concurrency: int, seconds: float, phase: int) -> List[Sample]:
+        operations = list(self.mix)
+        weights = [self.mix[name] for name in operations]
+        deadline = time.perf_counter() + seconds
+        samples: List[Sample] = []
+
+        async def client_loop(index: int):
+            rng = random.Random(f"{self.seed}:{phase}:{index}")
+            while time.perf_counter() < deadline:
+                operation = rng.choices(operations, weights)[0]
+                started = time.perf_counter()
+                queries = db_ms = None
+                try:
+                    response = await self.request(operation, rng)
+                    ok = response.status_code < 400
+                    match = SERVER_TIMING_DB.search(response.headers.get("server-timing", ""))
+                    if match:
+                        db_ms, queries = float(match.group(1)), int(match.group(2))
+                except httpx.HTTPError as e:
+                    ok = False
+                    print(f"Error in {operation}: {e!r}")
+                samples.append(Sample(operation, time.perf_counter() - started, ok, queries, db_ms))
+
+        await asyncio.gather(*(client_loop(i) for i in range(concurrency)))
+        return samples
+
+
+def summarize(samples: List[Sample], seconds: float) -> Dict:
+    latencies = [s.seconds for s in samples]
+    queries = [s.queries for s in samples if s.queries is not None]
+    db_ms = [s.db_ms for s in samples if s.db_ms is not None]
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if not s.ok),
+        "throughput_rps": round(len(samples) / seconds, 2) if seconds else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+            "p50": round(_percentile(latencies, 0.50) * 1000, 2),
+            "p95": round(_percentile(latencies, 0.95) * 1000, 2),
+            "p99": round(_percentile(latencies, 0.99) * 1000, 2),
+            "max": round(max(latencies) * 1000, 2) if latencies else 0.0,
+        },
+        "queries_per_request": {
+            "mean": round(sum(queries) / len(queries), 2) if queries else None,
+            "p95": _percentile(queries, 0.95) if queries else None,
+            "max": max(queries) if queries else None,
+        },
+        "db_ms_per_request": round(sum(db_ms) / len(db_ms), 2) if db_ms else None,
+    }
+
+
+def compare(results: Dict, baseline: Dict, max_regression: Optional[float]) -> List[str]:
+    """Print per-operation changes against a baseline; returns the regressions over the limit"""
+    regressions = []
+
+    def change(new, old) -> Optional[float]:
+        if new is None or not old:
+            return None
+        return (new - old) / old * 100
+
+    print(f"\nCompared with {baseline.get('git_commit') or 'baseline'} ({baseline.get('started_at', '?')}):")
+    config, baseline_config = results["config"], baseline.get("config", {})
+    differing = [key for key in COMPARABLE_CONFIG if config.get(key) != baseline_config.get(key)]
+    if config["seeded"]["expenses"] != baseline_config.get("seeded", {}).get("expenses"):
+        differing.append("seeded expenses")
+    if differing:
+        print(f"Warning: runs differ in {', '.join(differing)}; the changes below are not like for like")
+    print(f"{'operation':<20} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>9}")
+    for name, current in [("overall", results["overall"]), *results["operations"].items()]:
+        previous = baseline["overall"] if name == "overall" else baseline.get("operations", {}).get(name)
+        if previous is None:
+            continue
+        deltas = {
+            "rps": change(current["throughput_rps"], previous["throughput_rps"]),
+            "p50": change(current["latency_ms"]["p50"], previous["latency_ms"]["p50"]),
+            "p95": change(current["latency_ms"]["p95"], previous["latency_ms"]["p95"]),
+            "p99": change(current["latency_ms"]["p99"], previous["latency_ms"]["p99"]),
+            "queries": change(current["queries_per_request"]["mean"], previous["queries_per_request"]["mean"]),
+        }
+        print(f"{name:<20} " + " ".join(
+            f"{'n/a':>9}" if delta is None else f"{delta:>+8.1f}%" for delta in deltas.values()
+        ))
+        if max_regression is not None:
+            for metric in ("p95", "queries"):
+                if deltas[metric] is not None and deltas[metric] > max_regression:
+                    regressions.append(f"{name} {metric} {deltas[metric]:+.1f}%")
+    return regressions
+
+
+def _start(args: List[str], env: Dict[str, str], log_path: str) -> subprocess.Popen:
+    log = open(log_path, "w")
+    return subprocess.Popen([sys.executable, *args], cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def _wait_for(url: str, process: subprocess.Popen, log_path: str, timeout: float = 60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            with open(log_path) as f:
+                raise RuntimeError(f"{url} exited early:\n{f.read()[-2000:]}")
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def _stop(process: Optional[subprocess.Popen]):
+    if process is None or process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def app_environment(args, workdir: str, stub_url: str, metrics_token: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(workdir, 'benchmark.db')}",
+        "SECRET_KEY": env.get("SECRET_KEY") or secrets.token_hex(16),
+        "ALGORITHM": env.get("ALGORITHM") or "HS256",
+        # Upstreams: all three go to the stand-ins; nothing is read from local files or snapshots
+        "FX_RATES_URL": f"{stub_url}/fx/v4/latest/{{base}}",
+        "FX_RATES_SOURCE_FILE": "",
+        "FX_RATES_SNAPSHOT_PATH": "",
+        "COUNTRIES_URL": f"{stub_url}/countries/v3.1/all",
+        "HUGGINGFACE_API_URL": f"{stub_url}/hf/models",
+        "HUGGINGFACE_API_KEY": "benchmark",
+        "RECEIPT_STORAGE_BACKEND": "local",
+        "RECEIPT_STORAGE_DIR": os.path.join(workdir, "receipts"),
+        "AI_CACHE_PERSISTENT": "false",
+        "SERVER_TIMING_ENABLED": "true",
+        "METRICS_TOKEN": metrics_token,
+        "AUTO_MIGRATE": "false",
+    })
+    # A replica would make runs depend on its lag; benchmark one database
+    env.pop("DATABASE_READ_URL", None)
+    return env
+
+
+async def drive(args, base_url: str, metrics_token: str) -> Dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        workload = Workload(client, args.mix, args.seed)
+        await workload.prepare(args.managers, min(args.employees, args.logins))
+
+        if args.warmup > 0:
+            await workload.run(args.concurrency, args.warmup, phase=0)
+        started = time.perf_counter()
+        samples = await workload.run(args.concurrency, args.duration, phase=1)
+        elapsed = time.perf_counter() - started
+
+        metrics = await client.get("/metrics", headers={"Authorization": f"Bearer {metrics_token}"})
+        pools = await client.get("/analytics/db-pool", headers=workload.admin)
+
+    external = {}
+    for target, outcome, count in EXTERNAL_COUNT.findall(metrics.text):
+        external.setdefault(target, {})[outcome] = int(count)
+
+    by_operation: Dict[str, List[Sample]] = {}
+    for sample in samples:
+        by_operation.setdefault(sample.operation, []).append(sample)
+    return {
+        "seconds": round(elapsed, 2),
+        "overall": summarize(samples, elapsed),
+        "operations": {name: summarize(by_operation[name], elapsed) for name in sorted(by_operation)},
+        "external_calls": external,
+        "pools": pools.json() if pools.status_code == 200 else None,
+    }
+
+
+def run(args) -> Dict:
+    workdir = tempfile.mkdtemp(prefix="spendsense-benchmark-")
+    stub_port, app_port = _free_port(), _free_port()
+    stub_url, base_url = f"http://127.0.0.1:{stub_port}", f"http://127.0.0.1:{app_port}"
+    metrics_token = secrets.token_hex(16)
+    env = app_environment(args, workdir, stub_url, metrics_token)
+    latency = {"fx": args.fx_latency_ms, "countries": args.countries_latency_ms, "hf": args.hf_latency_ms}
+
+    stubs = app = None
+    try:
+        stubs_log = os.path.join(workdir, "stubs.log")
+        stubs = _start([
+            "-m", "benchmarks.stubs", "--port", str(stub_port), "--seed", str(args.seed),
+            "--fx-latency-ms", str(latency["fx"]), "--countries-latency-ms", str(latency["countries"]),
+            "--hf-latency-ms", str(latency["hf"]), "--jitter-ms", str(args.jitter_ms),
+        ], env, stubs_log)
+        _wait_for(f"{stub_url}/stats", stubs, stubs_log)
+
+        print(f"Seeding {args.expenses} expenses...", file=sys.stderr)
+        seeded = subprocess.run(
+            [sys.executable, "-m", "benchmarks.seed", "--json", "--managers", str(args.managers),
+             "--employees", str(args.employees), "--expenses", str(args.expenses), "--seed", str(args.seed)],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+        )
+        if seeded.returncode != 0:
+            raise RuntimeError(f"Seeding failed:\n{seeded.stdout[-2000:]}{seeded.stderr[-2000:]}")
+        seed_info = json.loads(seeded.stdout.strip().splitlines()[-1])
+
+        app_log = os.path.join(workdir, "app.log")
+        app = _start([
+            "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(app_port),
+            "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+        ], env, app_log)
+        _wait_for(f"{base_url}/health", app, app_log)
+
+        print(f"Running {args.duration}s at concurrency {args.concurrency}...", file=sys.stderr)
+        measured = asyncio.run(drive(args, base_url, metrics_token))
+    finally:
+        _stop(app)
+        _stop(stubs)
+        if args.keep_workdir:
+            print(f"Logs and database kept in {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "version": RESULTS_VERSION,
+        "started_at": datetime.utcnow().replace(microsecond=0).isoformat() + "Z",
+        "git_commit": _git_commit(),
+        "config": {
+            "database": env["DATABASE_URL"].split("://")[0],
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "warmup_seconds": args.warmup,
+            "workers": args.workers,
+            "seed": args.seed,
+            "mix": args.mix,
+            "upstream_latency_ms": latency,
+            "upstream_jitter_ms": args.jitter_ms,
+            "seeded": seed_info,
+        },
+        **measured,
+    }
+
+
+def print_table(results: Dict):
+    print(f"{'operation':<20} {'requests':>8} {'errors':>6} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}")
+    for name, stats in [*results["operations"].items(), ("overall", results["overall"])]:
+        queries = stats["queries_per_request"]["mean"]
+        print(
+            f"{name:<20} {stats['requests']:>8} {stats['errors']:>6} {stats['throughput_rps']:>8.1f} "
+            f"{stats['latency_ms']['p50']:>8.1f} {stats['latency_ms']['p95']:>8.1f} {stats['latency_ms']['p99']:>8.1f} "
+            f"{'n/a' if queries is None else f'{queries:.1f}':>8}"
+        )
+    if results["external_calls"]:
+        calls = ", ".join(
+            f"{target} {sum(outcomes.values())}" for target, outcomes in sorted(results["external_calls"].items())
+        )
+        print(f"outbound calls: {calls}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the app against a seeded database and local upstream stand-ins")
+    parser.add_argument("--concurrency", type=int, default=20, help="Clients with one request in flight each")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Unmeasured seconds before the measurement")
+    parser.add_argument("--mix", type=_parse_mix, default=dict(DEFAULT_MIX),
+                        help="Weighted operations, e.g. list_expenses=3,dashboard=1")
+    parser.add_argument("--seed", type=int, default=42, help="Seeds the data and every client's request sequence")
+    parser.add_argument("--database-url", help="Scratch database to seed and run against (default: fresh SQLite)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--managers", type=int, default=5)
+    parser.add_argument("--employees", type=int, default=50)
+    parser.add_argument("--expenses", type=int, default=20000, help="Expense history to seed")
+    parser.add_argument("--logins", type=int, default=20, help="Employees that send requests")
+    parser.add_argument("--fx-latency-ms", type=float, default=DEFAULT_LATENCY_MS["fx"])
+    parser.add_argument("--countries-latency-ms", type=float, default=DEFAULT_LATENCY_MS["countries"])
+    parser.add_argument("--hf-latency-ms", type=float, default=DEFAULT_LATENCY_MS["hf"])
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Extra random upstream delay, up to this much")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-request client timeout in seconds")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Results JSON from an earlier run to compare with")
+    parser.add_argument("--max-regression", type=float,
+                        help="With --baseline: exit non-zero if p95 or queries per request grew by more than this %%")
+    parser.add_argument("--keep-workdir", action="store_true", help="Keep the database and server logs")
+    parser.add_argument("--json", action="store_true", help="Print results JSON instead of the table")
+    args = parser.parse_args()
+
+    try:
+        results = run(args)
+    except Exception as e:
+        print(f"❌ Benchmark failed: {e}")
+        sys.exit(1)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print(f"❌ Regressed beyond {args.max_regression}%: {', '.join(regressions)}")
+            sys.exit(1)
+        if args.max_regression is not None:
+            print(f"✅ No regression beyond {args.max_regression}%")
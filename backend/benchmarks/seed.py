@@ -0,0 +1,177 @@
+"""Deterministic benchmark tenant: one company, its managers and employees,
+and a year of expense history imported through ImportService, so rollups,
+duplicate fingerprints, risk scores and approvals match what the app writes.
+
+About 70% of expenses older than a month end up approved; the rest stay in
+the managers' inboxes. Every seeded user logs in with BENCHMARK_PASSWORD.
+
+    python -m benchmarks.seed --employees 50 --expenses 20000
+"""
+import argparse
+import io
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+from sqlalchemy import update
+from sqlalchemy.orm import joinedload, selectinload
+from app.database import SessionLocal
+from app.migrate import upgrade_database
+from app.core.security import get_password_hash
+from app.models.company import Company
+from app.models.user import User, UserRole
+from app.models.expense import Expense, ExpenseStatus
+from app.models.approval import Approval, ApprovalStatus
+from app.services.import_service import ImportService, IMPORT_MAX_ROWS
+from app.services.principal_cache import Principal
+from app.services.rollup_service import RollupService
+from .tenant import BENCHMARK_COMPANY, BENCHMARK_PASSWORD, benchmark_email
+
+HISTORY_DAYS = 365
+APPROVED_SHARE = 0.7
+
+# Description, vendor, typical amount; the same pairs recur like real spend does
+SPEND_PROFILES = [
+    ("Client lunch", "Corner Bistro", 60), ("Team dinner", "Harbor Grill", 240),
+    ("Flight to customer site", "SkyWays", 450), ("Hotel stay", "City Inn", 320),
+    ("Taxi to airport", "MetroCab", 45), ("Train ticket", "RailLink", 80),
+    ("Printer paper and toner", "OfficeHub", 90), ("Monthly IDE licence", "CodeTools", 30),
+    ("Conference registration", "DevSummit", 900), ("Internet bill", "FiberNet", 70),
+    ("Coffee with candidate", "Bean There", 15), ("Online course", "LearnFast", 200),
+]
+FOREIGN_CURRENCIES = ["EUR", "GBP", "INR"]
+
+
+def _setup_users(db, managers: int, employees: int) -> Company:
+    company = db.query(Company).filter(Company.name == BENCHMARK_COMPANY).first()
+    if company is not None:
+        return company
+
+    company = Company(name=BENCHMARK_COMPANY, country="United States", currency="USD")
+    db.add(company)
+    db.flush()
+
+    # One bcrypt hash for everyone: seeding thousands of users should not take minutes
+    hashed_password = get_password_hash(BENCHMARK_PASSWORD)
+    admin = User(
+        email=benchmark_email("admin"), hashed_password=hashed_password, full_name="Benchmark Admin",
+        role=UserRole.ADMIN, company_id=company.id
+    )
+    db.add(admin)
+    db.flush()
+    manager_users = [
+        User(
+            email=benchmark_email("manager", i), hashed_password=hashed_password,
+            full_name=f"Benchmark Manager {i}", role=UserRole.MANAGER,
+            company_id=company.id, manager_id=admin.id
+        )
+        for i in range(managers)
+    ]
+    db.add_all(manager_users)
+    db.flush()
+    db.add_all([
+        User(
+            email=benchmark_email("employee", i), hashed_password=hashed_password,
+            full_name=f"Benchmark Employee {i}", role=UserRole.EMPLOYEE,
+            company_id=company.id, manager_id=manager_users[i % managers].id
+        )
+        for i in range(employees)
+    ])
+    db.commit()
+    return company
+
+
+def expense_rows(count: int, employees: int, seed: int, now: datetime) -> List[Dict]:
+    """Import rows for ``count`` expenses spread over the last year"""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        description, vendor, typical = rng.choice(SPEND_PROFILES)
+        foreign = rng.random() < 0.1
+        rows.append({
+            "amount": round(typical * rng.lognormvariate(0, 0.4), 2),
+            "currency": rng.choice(FOREIGN_CURRENCIES) if foreign else "USD",
+            "description": description,
+            "vendor": vendor,
+            "expense_date": (now - timedelta(days=rng.randrange(HISTORY_DAYS))).date().isoformat(),
+            "submitter_email": benchmark_email("employee", rng.randrange(employees)),
+        })
+    return rows
+
+
+def _decide_history(db, company_id: int, now: datetime, seed: int):
+    """Approve a fixed share of last month's and older expenses, then rebuild rollups"""
+    rng = random.Random(seed + 1)
+    old_ids = db.query(Expense.id).filter(
+        Expense.company_id == company_id,
+        Expense.status == ExpenseStatus.PENDING,
+        Expense.expense_date < now - timedelta(days=30)
+    ).order_by(Expense.id).all()
+    approved = [expense_id for (expense_id,) in old_ids if rng.random() < APPROVED_SHARE]
+    for start in range(0, len(approved), 1000):
+        batch = approved[start:start + 1000]
+        db.execute(update(Expense).where(Expense.id.in_(batch)).values(status=ExpenseStatus.APPROVED))
+        db.execute(
+            update(Approval).where(Approval.expense_id.in_(batch)).values(
+                status=ApprovalStatus.APPROVED, approved_at=now
+            )
+        )
+    RollupService.rebuild(db, company_id)
+    db.commit()
+
+
+def seed_tenant(managers: int = 5, employees: int = 50, expenses: int = 20000, seed: int = 42) -> Dict:
+    """Create the benchmark tenant unless it exists; returns what was seeded"""
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        existing = db.query(Company.id).filter(Company.name == BENCHMARK_COMPANY).first()
+        company = _setup_users(db, managers, employees)
+        if existing is None:
+            admin = db.query(User).options(
+                joinedload(User.company), selectinload(User.subordinates)
+            ).filter(User.email == benchmark_email("admin")).one()
+            principal = Principal.from_user(admin)
+            now = datetime.utcnow()
+            rows = expense_rows(expenses, employees, seed, now)
+            for start in range(0, len(rows), IMPORT_MAX_ROWS):
+                ndjson = "\n".join(json.dumps(row) for row in rows[start:start + IMPORT_MAX_ROWS])
+                result = ImportService.import_expenses(io.BytesIO(ndjson.encode()), "ndjson", principal, db)
+                if result.failed:
+                    raise RuntimeError(f"{result.failed} seed rows failed to import: {result.errors[:3]}")
+            _decide_history(db, company.id, now, seed)
+
+        counts = {
+            "managers": db.query(User).filter(User.company_id == company.id, User.role == UserRole.MANAGER).count(),
+            "employees": db.query(User).filter(User.company_id == company.id, User.role == UserRole.EMPLOYEE).count(),
+            "expenses": db.query(Expense).filter(Expense.company_id == company.id).count(),
+        }
+        return {"company_id": company.id, "created": existing is None,
+                "seconds": round(time.perf_counter() - started, 1), **counts}
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the benchmark company into a scratch database")
+    parser.add_argument("--managers", type=int, default=5)
+    parser.add_argument("--employees", type=int, default=50)
+    parser.add_argument("--expenses", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42, help="Random seed; the same seed gives the same data")
+    parser.add_argument("--no-migrate", action="store_true", help="Skip upgrading the schema first")
+    parser.add_argument("--json", action="store_true", help="Print what was seeded as JSON")
+    args = parser.parse_args()
+    if not args.no_migrate:
+        upgrade_database()
+    try:
+        result = seed_tenant(args.managers, args.employees, args.expenses, args.seed)
+    except Exception as e:
+        print(f"❌ Error seeding benchmark data: {e}")
+        raise
+    if args.json:
+        print(json.dumps(result))
+    else:
+        verb = "Seeded" if result["created"] else "Benchmark company already exists:"
+        print(f"✅ {verb} {result['managers']} managers, {result['employees']} employees, "
+              f"{result['expenses']} expenses (company {result['company_id']}) in {result['seconds']}s")
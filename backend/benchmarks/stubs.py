@@ -0,0 +1,117 @@
+"""Local stand-ins for the APIs the backend calls out to.
+
+One server answers for all three upstreams, each under its own prefix:
+
+- ``/fx/v4/latest/{base}``: exchangerate-api.com, from a fixed USD table
+- ``/countries/v3.1/all``: REST Countries, from the bundled snapshot
+- ``/hf/models/{owner}/{model}``: Hugging Face inference for the TrOCR and
+  zero-shot models the backend uses, with deterministic answers
+
+Every response waits ``latency`` (plus up to ``jitter``) first, so runs can
+model a slow upstream without depending on the real one. Point the backend
+at it with FX_RATES_URL, COUNTRIES_URL and HUGGINGFACE_API_URL:
+
+    python -m benchmarks.stubs --port 8900 --hf-latency-ms 400
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+from typing import Dict, Optional
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+
+COUNTRIES_SNAPSHOT = os.path.join(
+    os.path.dirname(__file__), os.pardir, "app", "services", "data", "countries.json"
+)
+
+# Units per US dollar; other bases are derived from these
+USD_RATES = {
+    "USD": 1.0, "EUR": 0.92, "GBP": 0.79, "INR": 83.2, "JPY": 149.5, "CAD": 1.36,
+    "AUD": 1.52, "CHF": 0.88, "CNY": 7.24, "SGD": 1.34, "AED": 3.67, "BRL": 4.97,
+    "MXN": 17.1, "ZAR": 18.6, "SEK": 10.4, "NZD": 1.63, "HKD": 7.82, "KRW": 1320.0,
+}
+
+RECEIPT_TEXT = "CORNER BISTRO\n2024-03-14\nLunch for two\nTotal $ 48.50"
+
+DEFAULT_LATENCY_MS = {"fx": 50.0, "countries": 100.0, "hf": 300.0}
+
+
+def fx_rates(base: str) -> Optional[Dict[str, float]]:
+    base = base.upper()
+    if base not in USD_RATES:
+        return None
+    return {code: round(rate / USD_RATES[base], 6) for code, rate in USD_RATES.items()}
+
+
+def zero_shot(text: str, labels) -> Dict:
+    """A stable ranking of ``labels`` for ``text``, shaped like bart-large-mnli's"""
+    ranked = sorted(labels, key=lambda label: hashlib.sha1(f"{text}|{label}".encode()).hexdigest())
+    scores = [round(0.6 / (i + 1), 4) for i in range(len(ranked))]
+    return {"sequence": text, "labels": ranked, "scores": scores}
+
+
+def create_app(latency_ms: Dict[str, float], jitter_ms: float = 0.0, seed: int = 0) -> FastAPI:
+    app = FastAPI(title="SpendSense upstream stand-ins")
+    rng = random.Random(seed)
+    calls = {target: 0 for target in DEFAULT_LATENCY_MS}
+
+    with open(COUNTRIES_SNAPSHOT, encoding="utf-8") as f:
+        countries = json.load(f)
+
+    async def upstream(target: str):
+        calls[target] += 1
+        delay = latency_ms.get(target, 0.0) + (rng.uniform(0, jitter_ms) if jitter_ms else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+    @app.get("/fx/v4/latest/{base}")
+    async def latest_rates(base: str):
+        await upstream("fx")
+        rates = fx_rates(base)
+        if rates is None:
+            raise HTTPException(status_code=404, detail="Unsupported base currency")
+        return {"base": base.upper(), "rates": rates}
+
+    @app.get("/countries/v3.1/all")
+    async def all_countries():
+        await upstream("countries")
+        return countries
+
+    @app.post("/hf/models/{owner}/{model}")
+    async def inference(owner: str, model: str, request: Request):
+        await upstream("hf")
+        if model.startswith("trocr"):
+            await request.body()
+            return [{"generated_text": RECEIPT_TEXT}]
+        if model.endswith("mnli"):
+            payload = await request.json()
+            return zero_shot(payload.get("inputs", ""), payload.get("parameters", {}).get("candidate_labels", []))
+        raise HTTPException(status_code=404, detail=f"Model {owner}/{model} is not stubbed")
+
+    @app.get("/stats")
+    def stats():
+        """Calls served per upstream since start"""
+        return calls
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve local stand-ins for the FX, REST Countries and Hugging Face APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--fx-latency-ms", type=float, default=DEFAULT_LATENCY_MS["fx"])
+    parser.add_argument("--countries-latency-ms", type=float, default=DEFAULT_LATENCY_MS["countries"])
+    parser.add_argument("--hf-latency-ms", type=float, default=DEFAULT_LATENCY_MS["hf"])
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Extra random delay, up to this much")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the jitter")
+    args = parser.parse_args()
+    app = create_app(
+        {"fx": args.fx_latency_ms, "countries": args.countries_latency_ms, "hf": args.hf_latency_ms},
+        jitter_ms=args.jitter_ms,
+        seed=args.seed,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
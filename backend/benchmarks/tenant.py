@@ -0,0 +1,11 @@
+"""Who the benchmark tenant is; shared by the seeder and the load driver,
+which must not import the app (its settings are read at import time).
+EmailStr rejects special-use domains such as .test, hence example.com."""
+
+BENCHMARK_COMPANY = "Load Benchmark"
+BENCHMARK_DOMAIN = "load-benchmark.example.com"
+BENCHMARK_PASSWORD = "Benchmark@123"
+
+
+def benchmark_email(role: str, i: int = 0) -> str:
+    return f"{role}{i}@{BENCHMARK_DOMAIN}"